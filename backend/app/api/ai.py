@@ -1,30 +1,97 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
+from typing import AsyncIterator, List, Optional
+import asyncio
+import json
 
+from ..core.config import settings
 from ..security import get_current_user
+from ..services.ai_service import SUMMARY_TYPES
+from ..services import chat_sessions
+from ..services.literature_review import literature_review, load_papers, stream_literature_review
+from ..services.llm_client import BULK, INTERACTIVE, complete, llm_configured, stream
+from ..services.model_router import CHAT, SYNTHESIS
+from ..services.paper_chunks import load_chunks
+from ..services.paper_summaries import generate, get_summary, summarize_batch, summary_input
+from .workspaces import listed_papers
 
 router = APIRouter(prefix="/ai", tags=["ai"])
 
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-
-if GROQ_API_KEY:
-    try:
-        from groq import Groq
-        groq_client = Groq(api_key=GROQ_API_KEY)
-    except:
-        groq_client = None
-else:
-    groq_client = None
-
 class ChatRequest(BaseModel):
     context: str = ""
     question: str
 
+class ChatSessionCreate(BaseModel):
+    paper_ids: List[str] = []
+
+class SessionQuestion(BaseModel):
+    question: str
+    token_budget: Optional[int] = None  # passage tokens; defaults to CHAT_CONTEXT_TOKENS
+
+class SummaryBatchRequest(BaseModel):
+    paper_ids: List[str]
+    summary_type: str = "short"
+    refresh: bool = False
+
+# Prompt and sampling settings per endpoint, shared by the plain and /stream variants
+
+def _chat_call(request: ChatRequest) -> dict:
+    return {
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a helpful research assistant. Provide clear, detailed answers about research papers."
+            },
+            {
+                "role": "user",
+                "content": f"Context: {request.context}\n\nQuestion: {request.question}"
+            }
+        ],
+        "task": CHAT,
+        "temperature": 0.7,
+        "max_tokens": 1024
+    }
+
+def _insights_call(paper_ids: list) -> dict:
+    return {
+        "messages": [{
+            "role": "user",
+            "content": f"Extract key insights, trends, and findings from {len(paper_ids)} research papers. Provide actionable insights."
+        }],
+        "task": SYNTHESIS,
+        "temperature": 0.6,
+        "max_tokens": 1024
+    }
+
+def _sse(http_request: Request, tokens: AsyncIterator[str]) -> StreamingResponse:
+    """Server-Sent Events: one `data` event per token, then `done` (or `error`).
+
+    Closing `tokens` when the client goes away closes the upstream stream,
+    so generation stops instead of running on for nobody.
+    """
+    async def events():
+        try:
+            async for token in tokens:
+                if await http_request.is_disconnected():
+                    return
+                yield f"data: {json.dumps({'token': token})}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            await tokens.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _not_configured() -> AsyncIterator[str]:
+    raise RuntimeError("AI not configured")
+    yield
+
 @router.post("/chat")
 async def chat_with_ai(
     request: ChatRequest,
@@ -32,88 +99,202 @@ async def chat_with_ai(
 ):
     """Chat with Groq AI"""
     
-    if not groq_client:
+    if not llm_configured():
         return {"answer": "AI service not configured. Add GROQ_API_KEY to .env"}
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a helpful research assistant. Provide clear, detailed answers about research papers."
-                },
-                {
-                    "role": "user",
-                    "content": f"Context: {request.context}\n\nQuestion: {request.question}"
-                }
-            ],
-            model="llama-3.3-70b-versatile",  # WORKING MODEL
-            temperature=0.7,
-            max_tokens=1024
-        )
-        
-        answer = chat_completion.choices[0].message.content
+        answer = await complete(**_chat_call(request), user_id=current_user.id)
         return {"answer": answer}
     
     except Exception as e:
         return {"answer": f"Error: {str(e)}"}
 
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    request: ChatRequest,
+    http_request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Chat with Groq AI, streaming the answer token by token (SSE)"""
+    if not llm_configured():
+        return _sse(http_request, _not_configured())
+    return _sse(http_request, stream(**_chat_call(request), user_id=current_user.id, lane=INTERACTIVE))
+
+@router.post("/chat/sessions")
+async def create_chat_session(
+    request: ChatSessionCreate,
+    current_user = Depends(get_current_user)
+):
+    """Start a server-side chat about some papers; later turns send only the new question"""
+    try:
+        session = await asyncio.to_thread(chat_sessions.create_session, current_user.id, request.paper_ids)
+    except chat_sessions.PapersNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"session_id": session.id, "paper_ids": json.loads(session.paper_ids)}
+
+async def _own_session(session_id: str, current_user):
+    session = await asyncio.to_thread(chat_sessions.get_session, session_id, current_user.id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return session
+
+@router.get("/chat/sessions/{session_id}")
+async def get_chat_session(
+    session_id: str,
+    current_user = Depends(get_current_user)
+):
+    """A chat session's messages and the rolling summary of its older turns"""
+    session = await _own_session(session_id, current_user)
+    messages = await asyncio.to_thread(chat_sessions.session_messages, session_id)
+    return {
+        "session_id": session.id,
+        "paper_ids": json.loads(session.paper_ids),
+        "summary": session.summary,
+        "summarized_count": session.summarized_count or 0,
+        "messages": [
+            {
+                "role": message.role,
+                "content": message.content,
+                "citations": json.loads(message.citations) if message.citations else [],
+                "created_at": message.created_at
+            }
+            for message in messages
+        ]
+    }
+
+@router.post("/chat/sessions/{session_id}/messages")
+async def ask_in_chat_session(
+    session_id: str,
+    request: SessionQuestion,
+    current_user = Depends(get_current_user)
+):
+    """Ask the next question; the prompt is the rolling summary, recent turns and retrieved passages"""
+    session = await _own_session(session_id, current_user)
+    if not llm_configured():
+        return {"answer": "AI service not configured. Add GROQ_API_KEY to .env", "citations": []}
+    
+    try:
+        return await chat_sessions.ask(session, request.question, user_id=current_user.id,
+                                       token_budget=request.token_budget)
+    
+    except Exception as e:
+        return {"answer": f"Error: {str(e)}", "citations": []}
+
+# Declared before /summarize/{paper_id} so "batch" is not taken for a paper id
+@router.post("/summarize/batch")
+async def summarize_papers_batch(
+    request: SummaryBatchRequest,
+    http_request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Summarize many papers concurrently, streaming NDJSON events: start, one per paper as it finishes, done"""
+    if request.summary_type not in SUMMARY_TYPES:
+        raise HTTPException(status_code=400, detail=f"summary_type must be one of {', '.join(SUMMARY_TYPES)}")
+    if len(request.paper_ids) > settings.SUMMARY_BATCH_MAX_PAPERS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.SUMMARY_BATCH_MAX_PAPERS} papers per batch")
+    
+    async def events():
+        results = summarize_batch(request.paper_ids, request.summary_type, user_id=current_user.id,
+                                  refresh=request.refresh, listed=listed_papers(request.paper_ids))
+        try:
+            async for event in results:
+                if await http_request.is_disconnected():
+                    return
+                yield json.dumps(event) + "\n"
+        finally:
+            await results.aclose()  # cancels summaries still being generated
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @router.post("/summarize/{paper_id}")
 async def summarize_paper(
     paper_id: str,
+    summary_type: str = Query("short", description="short, full or methods"),
+    refresh: bool = Query(False, description="Skip the stored summary and response cache and generate a fresh one"),
     current_user = Depends(get_current_user)
 ):
-    """Summarize a paper"""
+    """Summarize a paper (precomputed summaries are served straight from the database)"""
+    if summary_type not in SUMMARY_TYPES:
+        raise HTTPException(status_code=400, detail=f"summary_type must be one of {', '.join(SUMMARY_TYPES)}")
     
-    if not groq_client:
+    if not refresh:
+        stored = await asyncio.to_thread(get_summary, paper_id, summary_type)
+        if stored:
+            return {"paper_id": paper_id, "summary_type": summary_type, "summary": stored.summary, "precomputed": True}
+    
+    if not llm_configured():
         return {"paper_id": paper_id, "summary": "AI not configured"}
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[{
-                "role": "user",
-                "content": f"Provide a concise summary of research paper ID: {paper_id} in 3-5 bullet points."
-            }],
-            model="llama3-8b-8192",
-            temperature=0.5,
-            max_tokens=512
-        )
-        
-        summary = chat_completion.choices[0].message.content
-        return {"paper_id": paper_id, "summary": summary}
+        # Same local data the precompute on ingest / workspace add hashes; upstream only for unknown papers
+        papers = await load_papers([paper_id], listed_papers([paper_id]))
+        if not papers:
+            raise HTTPException(status_code=404, detail="Paper not found")
+        paper = {**papers[0], "id": paper_id}
+        chunks = await asyncio.to_thread(load_chunks, [paper_id])
+        text = summary_input(paper, summary_type, chunks)
+        summary = await generate(paper, summary_type, text, user_id=current_user.id, lane=INTERACTIVE,
+                                 bypass_cache=refresh)
+        return {"paper_id": paper_id, "summary_type": summary_type, "summary": summary, "precomputed": False}
     
+    except HTTPException:
+        raise
     except Exception as e:
         return {"paper_id": paper_id, "summary": f"Error: {str(e)}"}
 
+def _review_paper_ids(request: dict) -> List[str]:
+    paper_ids = [str(paper_id) for paper_id in request.get("paper_ids", [])]
+    if len(paper_ids) > settings.REVIEW_MAX_PAPERS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.REVIEW_MAX_PAPERS} papers per review")
+    return paper_ids
+
 @router.post("/literature-review")
 async def generate_review(
     request: dict,
     current_user = Depends(get_current_user)
 ):
-    """Generate literature review"""
+    """Generate literature review (map-reduce over cached per-paper digests)"""
     
-    if not groq_client:
+    if not llm_configured():
         return {"literature_review": "AI not configured"}
     
-    paper_ids = request.get("paper_ids", [])
+    paper_ids = _review_paper_ids(request)
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[{
-                "role": "user",
-                "content": f"Generate a comprehensive literature review for {len(paper_ids)} research papers. Include: 1) Overview, 2) Key findings, 3) Research gaps, 4) Conclusions."
-            }],
-            model="llama-3.3-70b-versatile",
-            temperature=0.6,
-            max_tokens=2048
-        )
-        
-        review = chat_completion.choices[0].message.content
-        return {"literature_review": review}
+        papers = await load_papers(paper_ids)
+        if not papers:
+            return {"literature_review": "None of the selected papers could be found."}
+        review = await literature_review(papers, user_id=current_user.id,
+                                         bypass_cache=bool(request.get("refresh")))
+        return {"literature_review": review, "paper_count": len(papers)}
     
     except Exception as e:
         return {"literature_review": f"Error: {str(e)}"}
 
+@router.post("/literature-review/stream")
+async def generate_review_stream(
+    request: dict,
+    http_request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Generate literature review, streaming the final write-up token by token (SSE)"""
+    if not llm_configured():
+        return _sse(http_request, _not_configured())
+    paper_ids = _review_paper_ids(request)
+    
+    async def tokens():
+        papers = await load_papers(paper_ids)
+        if not papers:
+            raise LookupError("None of the selected papers could be found.")
+        review = stream_literature_review(papers, user_id=current_user.id)
+        try:
+            async for token in review:
+                yield token
+        finally:
+            await review.aclose()
+    
+    return _sse(http_request, tokens())
+
 @router.post("/insights")
 async def extract_insights(
     request: dict,
@@ -121,26 +302,26 @@ async def extract_insights(
 ):
     """Extract insights from papers"""
     
-    if not groq_client:
+    if not llm_configured():
         return {"insights": "AI not configured"}
     
     paper_ids = request.get("paper_ids", [])
     
     try:
-        chat_completion = groq_client.chat.completions.create(
-            messages=[{
-                "role": "user",
-                "content": f"Extract key insights, trends, and findings from {len(paper_ids)} research papers. Provide actionable insights."
-            }],
-            model="llama-3.3-70b-versatile",
-            temperature=0.6,
-            max_tokens=1024
-        )
-        
-        insights = chat_completion.choices[0].message.content
+        insights = await complete(**_insights_call(paper_ids), user_id=current_user.id, lane=BULK)
         return {"insights": insights}
     
     except Exception as e:
         return {"insights": f"Error: {str(e)}"}
 
-
+@router.post("/insights/stream")
+async def extract_insights_stream(
+    request: dict,
+    http_request: Request,
+    current_user = Depends(get_current_user)
+):
+    """Extract insights from papers, streamed token by token (SSE)"""
+    if not llm_configured():
+        return _sse(http_request, _not_configured())
+    paper_ids = request.get("paper_ids", [])
+    return _sse(http_request, stream(**_insights_call(paper_ids), user_id=current_user.id, lane=BULK))
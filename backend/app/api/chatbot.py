@@ -1,51 +1,47 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session
-from app.database import get_session
-from app.models import User, Paper
-from backend.app.security import get_current_user
+from sqlalchemy.orm import Session
+from app.database import get_db
+from app.models import User
+from app.security import get_current_user
 from app.services.ai_service import AIService
+from app.services.paper_chunks import build_passages, owned_papers
+from app.services.retrieval import estimate_tokens, select_passages
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
 
-router = APIRouter()
+router = APIRouter(prefix="/chatbot", tags=["chatbot"])
+
+ai_service = AIService()
 
 class ChatRequest(BaseModel):
-    paper_ids: List[int]
+    paper_ids: List[str]
     question: str
+    token_budget: Optional[int] = None  # context tokens; defaults to CHAT_CONTEXT_TOKENS
 
 @router.post("/chat")
 async def chat_with_papers(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_db)
 ):
     """Ask questions about selected papers using AI"""
     
     if not request.paper_ids:
         raise HTTPException(status_code=400, detail="No papers selected")
     
-    # Get papers content
-    papers = []
-    for paper_id in request.paper_ids:
-        paper = session.get(Paper, paper_id)
-        if paper:
-            papers.append({
-                "title": paper.title,
-                "abstract": paper.abstract,
-                "full_text": paper.full_text
-            })
-    
-    if not papers:
+    # Only papers in the caller's own workspaces; anything else is reported as missing
+    papers = owned_papers(session, current_user.id, request.paper_ids)
+    if len(papers) < len(set(request.paper_ids)):
         raise HTTPException(status_code=404, detail="Papers not found")
     
-    # Create context from papers
-    context = "\n\n".join([
-        f"Paper: {p['title']}\n{p['abstract'] or p['full_text'] or ''}"
-        for p in papers
-    ])
+    # Only the passages most relevant to the question, packed into the token budget
+    context, citations = select_passages(request.question, build_passages(papers), request.token_budget)
     
     # Ask AI
-    ai_service = AIService()
-    response = await ai_service.chat_with_context(context, request.question)
+    response = await ai_service.chat_with_context(context, request.question, user_id=current_user.id)
     
-    return {"answer": response}
+    return {
+        "answer": response,
+        "citations": citations,
+        "context_tokens": estimate_tokens(context) if context else 0
+    }
@@ -0,0 +1,62 @@
+import asyncio
+
+from fastapi import APIRouter, Depends
+
+from ..security import get_current_user
+from ..services.llm_client import governor
+from ..services.paper_details import detail_cache
+from ..services import llm_cache, model_router, pdf_store
+from ..services.pdf_pool import queue_stats
+from ..services.search_cache import search_cache
+from ..services.source_health import health_report
+from ..services.upstream import rate_limiters, single_flight
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+@router.get("/search-cache")
+async def search_cache_stats(current_user = Depends(get_current_user)):
+    """Hit/miss/eviction counters for the search result cache"""
+    return search_cache.stats()
+
+@router.get("/detail-cache")
+async def detail_cache_stats(current_user = Depends(get_current_user)):
+    """Hit/miss/eviction counters for the paper detail cache"""
+    return detail_cache.stats()
+
+@router.get("/upstream")
+async def upstream_stats(current_user = Depends(get_current_user)):
+    """Rate-limiter and request-coalescing counters per upstream source"""
+    return {
+        "rate_limits": {source: bucket.stats() for source, bucket in rate_limiters.items()},
+        "single_flight": single_flight.stats(),
+    }
+
+@router.get("/sources")
+async def source_health(current_user = Depends(get_current_user)):
+    """Circuit-breaker state, error rate and latency percentiles per upstream source"""
+    return health_report()
+
+@router.get("/pdf-extraction")
+async def pdf_extraction_stats(current_user = Depends(get_current_user)):
+    """Process-pool size and documents currently being extracted"""
+    return queue_stats()
+
+@router.get("/pdf-cache")
+async def pdf_cache_stats(current_user = Depends(get_current_user)):
+    """Stored PDFs, bytes used and extraction cache hit rate"""
+    return await asyncio.to_thread(pdf_store.stats)
+
+@router.get("/llm")
+async def llm_stats(current_user = Depends(get_current_user)):
+    """LLM calls active and waiting per lane, grants and worst queueing delay"""
+    return governor.stats()
+
+@router.get("/llm-cache")
+async def llm_cache_stats(current_user = Depends(get_current_user)):
+    """LLM response cache entries, hit rate and tokens saved"""
+    return await asyncio.to_thread(llm_cache.stats)
+
+@router.get("/llm-router")
+async def llm_router_stats(current_user = Depends(get_current_user)):
+    """Per-model latency and breaker state, calls served per task and recent routing decisions"""
+    return model_router.stats()
@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+
+from ..security import get_current_user
+from ..services.ingestion import get_job
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+@router.get("/{job_id}")
+async def get_job_status(job_id: str, current_user = Depends(get_current_user)):
+    """Progress of a PDF ingestion job"""
+    job = await asyncio.to_thread(get_job, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        "job_id": job.id,
+        "paper_id": job.paper_id,
+        "filename": job.filename,
+        "status": job.status,
+        "pages_done": job.pages_done,
+        "page_count": job.page_count,
+        "error": job.error
+    }
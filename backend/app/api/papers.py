@@ -1,16 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query,UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query,UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from io import BytesIO
-import PyPDF2
 from typing import List, Optional
-import requests
+import json
 from pydantic import BaseModel
-import arxiv
 from datetime import datetime
+import asyncio
+import time
 
+from ..core.config import settings
 from ..database import get_db
 from ..security import get_current_user
-from ..models import Paper
+from ..models import Paper, Workspace
+from ..services.paper_merge import merge_results
+from ..services.harvester import HARVEST_SOURCES, create_harvest, get_harvest
+from ..services.harvester import start_in_background as start_harvest_in_background
+from ..services.ingestion import IngestionQueueFull, create_job
+from ..services.ingestion import start_in_background as start_ingestion_in_background
+from ..services.paper_details import get_paper_details, get_semantic_scholar_detail
+from ..services.paper_index import index_in_background, search_local
+from ..services.pdf_pool import ExtractionBusy, ExtractionTimeout, summarize_pages
+from ..services.pdf_store import extract_stored, iter_stored, store_upload
+from ..services.paper_sources import SOURCE_LABELS, iter_sources, resolve_sources, search_sources
+from ..services.source_health import CircuitOpen
+from ..services.upstream import RateLimited
 router = APIRouter(prefix="/papers", tags=["papers"])
 
 class PaperResponse(BaseModel):
@@ -24,142 +37,144 @@ class PaperResponse(BaseModel):
     citation_count: int = 0
     source: str = ""  # arXiv, OpenAlex, or Semantic Scholar
 
+class BatchPaperRequest(BaseModel):
+    ids: List[str]
+
+MAX_BATCH_IDS = 500
+SEARCH_MODES = ("remote", "local_first", "offline")
+
+async def _search_local_index(query: str, source: str, limit: int):
+    """Search the local paper index; returns (papers, age in seconds of the oldest hit)"""
+    hits = await asyncio.to_thread(search_local, query, limit, SOURCE_LABELS.get(source))
+    papers = merge_results([[paper for paper, _ in hits]])
+    oldest = min((fetched_at for _, fetched_at in hits), default=None)
+    return papers, (time.time() - oldest) if oldest is not None else None
+
 @router.get("/search")
 async def search_papers(
     query: str = Query(..., description="Search query"),
     source: str = Query("all", description="Source: arxiv, openalex, semantic_scholar, or all"),
     limit: int = Query(10, ge=1, le=50),
+    mode: str = Query("remote", description="remote, local_first, or offline"),
     current_user = Depends(get_current_user)
 ):
     """Search papers from multiple sources"""
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of: {', '.join(SEARCH_MODES)}")
     
-    all_papers = []
+    # Every paper fetched before is kept in a local full-text index, which
+    # can answer on its own (offline) or ahead of the upstreams (local_first)
+    if mode in ["offline", "local_first"]:
+        local_papers, age = await _search_local_index(query, source, limit)
+        fresh = age is not None and age <= settings.LOCAL_INDEX_MAX_AGE
+        if mode == "offline" or (len(local_papers) >= limit * settings.LOCAL_FIRST_MIN_RATIO and fresh):
+            return {"papers": local_papers[:limit], "sources": {"local": "ok"}}
     
-    # 1. Search arXiv
-    if source in ["all", "arxiv"]:
-        try:
-            arxiv_papers = search_arxiv(query, limit)
-            all_papers.extend(arxiv_papers)
-        except Exception as e:
-            print(f"arXiv search failed: {e}")
+    # All selected sources are queried at once; a source that misses its
+    # deadline is reported in "sources" and simply contributes no papers
+    sources = resolve_sources(source)
+    results, statuses = await search_sources(query, sources, limit)
     
-    # 2. Search OpenAlex
-    if source in ["all", "openalex"]:
-        try:
-            openalex_papers = search_openalex(query, limit)
-            all_papers.extend(openalex_papers)
-        except Exception as e:
-            print(f"OpenAlex search failed: {e}")
+    # Collapse cross-source duplicates and interleave sources by rank fusion
+    all_papers = merge_results(results.get(name, []) for name in sources)
+    index_in_background(all_papers)
     
-    # 3. Search Semantic Scholar
-    if source in ["all", "semantic_scholar"]:
-        try:
-            semantic_papers = search_semantic_scholar(query, limit)
-            all_papers.extend(semantic_papers)
-        except Exception as e:
-            print(f"Semantic Scholar search failed: {e}")
+    # Fall back to the local index when no upstream answered at all
+    if sources and "ok" not in statuses.values():
+        local_papers, _ = await _search_local_index(query, source, limit)
+        if local_papers:
+            statuses["local"] = "ok"
+            return {"papers": local_papers[:limit], "sources": statuses}
     
     # Return limited results
-    return {"papers": all_papers[:limit]}
+    return {"papers": all_papers[:limit], "sources": statuses}
 
-def search_arxiv(query: str, limit: int) -> List[dict]:
-    """Search arXiv papers"""
-    try:
-        search = arxiv.Search(
-            query=query,
-            max_results=limit,
-            sort_by=arxiv.SortCriterion.Relevance
-        )
-        
-        papers = []
-        for result in search.results():
-            papers.append({
-                "id": result.entry_id.split('/')[-1],
-                "title": result.title,
-                "authors": ", ".join([author.name for author in result.authors]),
-                "abstract": result.summary,
-                "url": result.entry_id,
-                "publication_date": result.published.strftime("%Y-%m-%d"),
-                "venue": "arXiv",
-                "citation_count": 0,
-                "source": "arXiv"
-            })
+@router.get("/search/stream")
+async def search_papers_stream(
+    query: str = Query(..., description="Search query"),
+    source: str = Query("all", description="Source: arxiv, openalex, semantic_scholar, or all"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user = Depends(get_current_user)
+):
+    """Stream search results as NDJSON: one line per source as it answers, then the merged list"""
+    
+    sources = resolve_sources(source)
+    
+    async def events():
+        results = {}
+        statuses = {}
+        async for name, papers, status in iter_sources(query, sources, limit):
+            results[name] = papers
+            statuses[name] = status
+            yield json.dumps({"event": "source", "source": name, "status": status, "papers": papers}) + "\n"
         
-        return papers
-    except Exception as e:
-        print(f"arXiv error: {e}")
-        return []
+        merged = merge_results(results.get(name, []) for name in sources)
+        index_in_background(merged)
+        yield json.dumps({"event": "done", "papers": merged[:limit], "sources": statuses}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
 
-def search_openalex(query: str, limit: int) -> List[dict]:
-    """Search OpenAlex papers"""
-    try:
-        url = "https://api.openalex.org/works"
-        params = {
-            "search": query,
-            "per_page": limit,
-            "mailto": "your-email@example.com"  # Replace with your email
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        papers = []
-        for work in data.get("results", []):
-            authors = [authorship.get("author", {}).get("display_name", "") 
-                      for authorship in work.get("authorships", [])]
-            
-            papers.append({
-                "id": work.get("id", "").split('/')[-1],
-                "title": work.get("title", "Untitled"),
-                "authors": ", ".join(authors[:3]) if authors else "Unknown",
-                "abstract": work.get("abstract", "") or work.get("abstract_inverted_index", "") or "No abstract available",
-                "url": work.get("doi", "") or work.get("id", ""),
-                "publication_date": work.get("publication_date", ""),
-                "venue": work.get("primary_location", {}).get("source", {}).get("display_name", "Unknown"),
-                "citation_count": work.get("cited_by_count", 0),
-                "source": "OpenAlex"
-            })
-        
-        return papers
-    except Exception as e:
-        print(f"OpenAlex error: {e}")
-        return []
+@router.post("/batch")
+async def get_papers_batch(
+    request: BatchPaperRequest,
+    current_user = Depends(get_current_user)
+):
+    """Get many papers in one round-trip (Semantic Scholar ids, DOIs, arXiv ids or OpenAlex ids)"""
+    if not request.ids:
+        raise HTTPException(status_code=400, detail="No paper ids given")
+    if len(request.ids) > MAX_BATCH_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per request")
+    
+    details = await get_paper_details(request.ids)
+    return {
+        "papers": [details[paper_id] for paper_id in request.ids if details[paper_id]],
+        "missing": [paper_id for paper_id in request.ids if not details[paper_id]]
+    }
 
-def search_semantic_scholar(query: str, limit: int) -> List[dict]:
-    """Search Semantic Scholar papers"""
-    try:
-        url = "https://api.semanticscholar.org/graph/v1/paper/search"
-        params = {
-            "query": query,
-            "limit": limit,
-            "fields": "paperId,title,authors,abstract,year,venue,citationCount,url,publicationDate"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        papers = []
-        for item in data.get("data", []):
-            authors_list = [a.get("name", "") for a in item.get("authors", [])]
-            
-            papers.append({
-                "id": item.get("paperId", ""),
-                "title": item.get("title", "Untitled"),
-                "authors": ", ".join(authors_list[:3]) if authors_list else "Unknown",
-                "abstract": item.get("abstract") or "No abstract available",
-                "url": item.get("url", ""),
-                "publication_date": item.get("publicationDate", ""),
-                "venue": item.get("venue", "Unknown"),
-                "citation_count": item.get("citationCount", 0),
-                "source": "Semantic Scholar"
-            })
-        
-        return papers
-    except Exception as e:
-        print(f"Semantic Scholar error: {e}")
-        return []
+class HarvestRequest(BaseModel):
+    source: str  # openalex or arxiv
+    query: str
+    max_records: int = 1000
+
+MAX_HARVEST_RECORDS = 100000
+
+def _harvest_status(job) -> dict:
+    return {
+        "job_id": job.id,
+        "source": job.source,
+        "query": job.query,
+        "status": job.status,
+        "harvested": job.harvested,
+        "max_records": job.max_records,
+        "total_available": job.total_available,
+        "error": job.error
+    }
+
+@router.post("/harvest")
+async def start_harvest(
+    request: HarvestRequest,
+    current_user = Depends(get_current_user)
+):
+    """Start a bulk harvest of a source into the local paper index"""
+    if request.source not in HARVEST_SOURCES:
+        raise HTTPException(status_code=400, detail=f"Source must be one of: {', '.join(HARVEST_SOURCES)}")
+    if not 1 <= request.max_records <= MAX_HARVEST_RECORDS:
+        raise HTTPException(status_code=400, detail=f"max_records must be between 1 and {MAX_HARVEST_RECORDS}")
+    
+    job = await asyncio.to_thread(create_harvest, request.source, request.query, request.max_records, current_user.id)
+    start_harvest_in_background(job.id)
+    return _harvest_status(job)
+
+@router.get("/harvest/{job_id}")
+async def get_harvest_status(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Progress of a bulk harvest"""
+    job = await asyncio.to_thread(get_harvest, job_id)
+    if not job or job.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Harvest job not found")
+    return _harvest_status(job)
 
 @router.get("/{paper_id}")
 async def get_paper(
@@ -169,20 +184,11 @@ async def get_paper(
     """Get specific paper"""
     # Try to fetch from Semantic Scholar
     try:
-        url = f"https://api.semanticscholar.org/graph/v1/paper/{paper_id}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
-        
-        return {
-            "id": data.get("paperId", ""),
-            "title": data.get("title", ""),
-            "authors": ", ".join([a.get("name", "") for a in data.get("authors", [])]),
-            "abstract": data.get("abstract", ""),
-            "url": data.get("url", ""),
-            "publication_date": data.get("publicationDate", ""),
-            "venue": data.get("venue", ""),
-            "citation_count": data.get("citationCount", 0)
-        }
+        return await get_semantic_scholar_detail(paper_id)
+    except RateLimited:
+        raise HTTPException(status_code=429, detail="Paper lookup is rate limited, try again shortly")
+    except CircuitOpen:
+        raise HTTPException(status_code=503, detail="Semantic Scholar is currently unavailable")
     except:
         raise HTTPException(status_code=404, detail="Paper not found")
     
@@ -196,30 +202,37 @@ async def extract_pdf(
         if not file.filename or not file.filename.endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are supported")
         
-        # Read the PDF
-        pdf_content = await file.read()
-        if not pdf_content:
+        # Spooled to disk in chunks and stored by SHA-256: a PDF seen before
+        # returns its cached extraction straight away
+        try:
+            digest, path = await store_upload(file, file.filename)
+        except ValueError:
             raise HTTPException(status_code=400, detail="Empty file")
         
-        pdf_file = BytesIO(pdf_content)
-        
         try:
-            # Extract text using PyPDF2
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text = ""
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                try:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += f"\n--- Page {page_num} ---\n{page_text}\n"
-                except:
-                    pass
+            started = time.perf_counter()
+            result = await extract_stored(digest, path)
+            pages = result["pages"]
+            summary = summarize_pages(pages, 0 if result["cached"] else time.perf_counter() - started)
+            text = "".join(
+                f"\n--- Page {page['page']} ---\n{page['text']}\n"
+                for page in pages if page["text"]
+            )
             
             if not text.strip():
                 text = "No readable text found in PDF. The PDF might be scanned or contain only images."
             
-            return {"text": text}
+            return {
+                "text": text,
+                **summary,
+                "metadata": result["metadata"],
+                "sha256": result["sha256"],
+                "cached": result["cached"],
+            }
+        except ExtractionBusy:
+            raise HTTPException(status_code=503, detail="PDF extraction is busy, try again shortly")
+        except ExtractionTimeout as timeout_error:
+            raise HTTPException(status_code=504, detail=str(timeout_error))
         except Exception as pdf_error:
             print(f"PyPDF2 error: {pdf_error}")
             raise HTTPException(status_code=500, detail=f"PDF parsing error: {str(pdf_error)}")
@@ -229,3 +242,88 @@ async def extract_pdf(
     except Exception as e:
         print(f"PDF extraction error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to extract PDF: {str(e)}")
+
+@router.post("/extract-pdf/stream")
+async def extract_pdf_stream(
+    file: UploadFile = File(...),
+    current_user = Depends(get_current_user)
+):
+    """Extract text from an uploaded PDF as NDJSON: one line per page as it is extracted, then a summary"""
+    if not file.filename or not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    try:
+        digest, path = await store_upload(file, file.filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Empty file")
+    
+    async def events():
+        started = time.perf_counter()
+        methods = {}
+        page_count = 0
+        cached = False
+        try:
+            async for page, cached in iter_stored(digest, path):
+                page_count += 1
+                methods[page["method"]] = methods.get(page["method"], 0) + 1
+                yield json.dumps({"event": "page", **page}) + "\n"
+        except ExtractionBusy:
+            yield json.dumps({"event": "error", "status": 503, "detail": "PDF extraction is busy, try again shortly"}) + "\n"
+            return
+        except ExtractionTimeout as timeout_error:
+            yield json.dumps({"event": "error", "status": 504, "detail": str(timeout_error)}) + "\n"
+            return
+        except Exception as pdf_error:
+            print(f"PDF extraction error: {pdf_error}")
+            yield json.dumps({"event": "error", "status": 500, "detail": f"PDF parsing error: {str(pdf_error)}"}) + "\n"
+            return
+        
+        seconds = time.perf_counter() - started
+        yield json.dumps({
+            "event": "done",
+            "sha256": digest,
+            "cached": cached,
+            "page_count": page_count,
+            "methods": methods,
+            "pages_per_second": round(page_count / seconds, 1) if page_count and not cached else None,
+        }) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.post("/ingest-pdf")
+async def ingest_pdf(
+    file: UploadFile = File(...),
+    paper_id: Optional[str] = Form(None),
+    workspace_id: Optional[int] = Form(None),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Queue a PDF for background extraction into a paper's full text; poll GET /jobs/{job_id}"""
+    if not file.filename or not file.filename.endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are supported")
+    
+    def owns(owned_id: Optional[int]) -> bool:
+        return owned_id is not None and db.query(Workspace).filter(
+            Workspace.id == owned_id, Workspace.user_id == current_user.id
+        ).first() is not None
+    
+    if workspace_id is not None and not owns(workspace_id):
+        raise HTTPException(status_code=404, detail="Workspace not found")
+    if paper_id:
+        # An existing paper's text may only be replaced by the owner of its workspace;
+        # papers outside any workspace cannot be overwritten, only new ids created
+        paper = db.query(Paper).filter(Paper.id == paper_id).first()
+        if paper is not None and not owns(paper.workspace_id):
+            raise HTTPException(status_code=403, detail="Not allowed to replace this paper's text")
+    
+    try:
+        digest, path = await store_upload(file, file.filename)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Empty file")
+    
+    try:
+        job = await asyncio.to_thread(create_job, current_user.id, digest, path, file.filename,
+                                      paper_id, workspace_id)
+    except IngestionQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    start_ingestion_in_background(job.id)
+    return {"job_id": job.id, "paper_id": job.paper_id, "status": job.status}
@@ -8,12 +8,26 @@ from ..database import get_db
 from ..models import Workspace, User
 from ..schemas import WorkspaceCreate, WorkspaceResponse
 from ..security import get_current_user
+from ..services.paper_summaries import summarize_in_background
 
 router = APIRouter(prefix="/workspaces", tags=["workspaces"])
 
 # Simple in-memory storage for papers (replace with DB later if needed)
 workspace_papers = {}
 
+def summary_source(entry: dict) -> dict:
+    """The fields of a workspace entry its summaries are written from"""
+    return {"id": entry["id"], "title": entry["title"], "abstract": entry["abstract"]}
+
+def listed_papers(paper_ids: List[str]) -> dict:
+    """Summary sources of the workspace entries for `paper_ids`, so summaries generated on demand
+    hash the same data as the ones precomputed when the paper was added"""
+    wanted = set(paper_ids)
+    return {
+        entry["id"]: summary_source(entry)
+        for entries in workspace_papers.values() for entry in entries if entry["id"] in wanted
+    }
+
 class AddPaperRequest(BaseModel):
     paper_id: str
     title: str = ""
@@ -72,13 +86,17 @@ async def add_paper_to_workspace(
         return {"message": "Paper already in workspace", "success": True}
     
     # Add paper
-    workspace_papers[workspace_id].append({
+    entry = {
         "id": paper.paper_id,
         "title": paper.title,
         "authors": paper.authors,
         "abstract": paper.abstract,
         "url": paper.url
-    })
+    }
+    workspace_papers[workspace_id].append(entry)
+    
+    # Summaries are generated in the background so later summarize clicks are a single read
+    summarize_in_background(summary_source(entry))
     
     print(f"Added paper {paper.paper_id} to workspace {workspace_id}")
     print(f"Workspace now has {len(workspace_papers[workspace_id])} papers")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 class Settings(BaseSettings):
     APP_NAME: str = "ResearchHub AI"
@@ -13,6 +13,102 @@ class Settings(BaseSettings):
     GROQ_API_KEY: Optional[str] = None  # Add this line
     CORS_ORIGINS: list[str] = ["http://localhost:3000", "http://localhost:5173"]
 
+    # Upstream paper sources
+    OPENALEX_API_KEY: Optional[str] = None
+    OPENALEX_MAILTO: Optional[str] = None
+    SEMANTIC_SCHOLAR_API_KEY: Optional[str] = None
+    HTTP_POOL_SIZE: int = 100
+    HTTP_POOL_SIZE_PER_HOST: int = 20
+    SEARCH_SOURCE_TIMEOUT: float = 8.0  # seconds each source gets before it is dropped
+    SOURCE_RATE_LIMITS: dict[str, float] = {"arxiv": 1.0, "openalex": 10.0, "semantic_scholar": 1.0}  # requests/second
+    SOURCE_RATE_BURSTS: dict[str, int] = {"arxiv": 3, "openalex": 10, "semantic_scholar": 5}
+    RATE_LIMIT_MAX_WAIT: float = 5.0  # queue at most this long for a token, otherwise shed
+    UPSTREAM_TIMEOUT: float = 10.0  # ceiling for the adaptive per-source timeout
+    ADAPTIVE_TIMEOUT_MIN: float = 1.0
+    ADAPTIVE_TIMEOUT_MULTIPLIER: float = 3.0  # timeout = p99 of recent successes x this
+    LATENCY_MIN_SAMPLES: int = 20  # successes needed before timeouts adapt or hedging starts
+    HEDGING_ENABLED: bool = True
+    HEDGE_MAX_RATIO: float = 0.05  # at most this share of requests get a hedge
+
+    # Per-source circuit breakers
+    BREAKER_WINDOW: int = 100  # rolling window of recent calls
+    BREAKER_MIN_CALLS: int = 10
+    BREAKER_FAILURE_THRESHOLD: int = 5  # consecutive failures that open the breaker
+    BREAKER_ERROR_RATE: float = 0.5
+    BREAKER_OPEN_SECONDS: float = 30.0
+
+    # Search result cache
+    SEARCH_CACHE_MAX_ENTRIES: int = 5000
+    SEARCH_CACHE_DEFAULT_TTL: int = 1800
+    SEARCH_CACHE_TTLS: dict[str, int] = {"arxiv": 6 * 3600, "openalex": 3600, "semantic_scholar": 3600}
+    SEARCH_CACHE_STALE_SECONDS: int = 24 * 3600  # stale results served while refreshing
+    DETAIL_CACHE_MAX_ENTRIES: int = 20000
+    DETAIL_CACHE_TTL: int = 24 * 3600
+
+    # Local full-text index of fetched papers
+    LOCAL_INDEX_MAX_AGE: int = 7 * 24 * 3600  # older hits send local_first searches upstream
+    LOCAL_FIRST_MIN_RATIO: float = 1.0  # local hits needed, as a share of `limit`
+    HARVEST_ARXIV_DELAY: float = 3.0  # seconds between arXiv harvest pages (arXiv's guidance)
+    HARVEST_LEASE_SECONDS: int = 300  # a worker's claim on a running harvest, renewed every page
+
+    # PDF extraction process pool
+    PDF_POOL_SIZE: int = 4
+    PDF_QUEUE_DEPTH: int = 16  # documents admitted at once; more get a 503
+    PDF_EXTRACT_TIMEOUT: float = 120.0  # per document, seconds
+    PDF_PAGES_PER_TASK: int = 20
+    PDF_MAX_PARALLEL_PER_DOC: int = 2  # page ranges of one document running at once
+
+    # Content-addressed PDF store (files + cached extraction, keyed by SHA-256)
+    PDF_STORE_DIR: str = "uploads"
+    PDF_STORE_MAX_BYTES: int = 2 * 1024 ** 3  # PDFs plus cached text; least recently used evicted first
+
+    # Background PDF ingestion jobs
+    INGEST_CONCURRENCY: int = 2  # jobs extracting at once
+    INGEST_MAX_QUEUED_PER_USER: int = 10  # queued + running jobs per user
+    INGEST_PROGRESS_PAGES: int = 10  # pages between progress writes
+    CHUNK_SIZE_CHARS: int = 1500  # target size of stored paper chunks
+
+    # Shared LLM client and concurrency governor
+    LLM_TIMEOUT: float = 60.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_MAX_CONCURRENCY: int = 8  # LLM calls in flight across all users
+    LLM_MAX_PER_USER: int = 2  # interactive calls per user
+    LLM_MAX_PER_USER_BULK: int = 6  # bulk calls per user (batch summaries, review digests)
+    LLM_RESERVED_INTERACTIVE: int = 2  # slots bulk calls (reviews, insights) may never take
+    LLM_CACHE_TTL: int = 7 * 24 * 3600
+    LLM_CACHE_MAX_ENTRIES: int = 20000  # least recently used evicted beyond this
+
+    # Paper chat retrieval
+    CHAT_CONTEXT_TOKENS: int = 3000  # budget for retrieved passages in the prompt
+    CHAT_MAX_PASSAGES: int = 12
+
+    # Server-side chat sessions with a rolling summary
+    CHAT_RECENT_MESSAGES: int = 6  # latest messages sent verbatim with each question
+    CHAT_SUMMARIZE_BATCH: int = 6  # older messages that build up before being folded into the summary
+    CHAT_HISTORY_MESSAGE_TOKENS: int = 500  # each verbatim message is clipped to this
+    CHAT_SUMMARY_TOKENS: int = 400
+
+    # Map-reduce literature reviews
+    REVIEW_MAX_PAPERS: int = 200
+    REVIEW_DIGEST_CONCURRENCY: int = 4  # per review; the LLM governor still applies
+    REVIEW_DIGEST_INPUT_TOKENS: int = 1500  # paper text read per digest
+    REVIEW_REDUCE_TOKENS: int = 6000  # digests merged hierarchically until they fit
+
+    # Precomputed paper summaries
+    SUMMARY_CONCURRENCY: int = 2  # background summary generations at once
+    SUMMARY_INPUT_TOKENS: int = 3000  # paper text read per summary
+    SUMMARY_BATCH_MAX_PAPERS: int = 50
+    SUMMARY_BATCH_CONCURRENCY: int = 6  # per batch request; capped by LLM_MAX_PER_USER_BULK
+    SUMMARY_BATCH_RETRIES: int = 3  # extra attempts per paper after a rate limit
+
+    # LLM model routing
+    LLM_FAST_MODEL: str = "llama-3.1-8b-instant"  # chat turns, summaries, digests
+    LLM_LARGE_MODEL: str = "llama-3.3-70b-versatile"  # syntheses and long prompts
+    LLM_FAST_MAX_PROMPT_TOKENS: int = 4000  # larger prompts go to the large model
+    # p90 latency (seconds) per task type; a model over it is demoted while the other is within it
+    LLM_LATENCY_BUDGETS: Dict[str, float] = {"chat": 8.0, "summary": 15.0, "digest": 15.0, "synthesis": 60.0}
+    LLM_ROUTER_LOG_SIZE: int = 200  # recent routing decisions kept for /internal/llm-router
+
     class Config:
         env_file = ".env"
 
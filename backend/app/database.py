@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -25,6 +25,21 @@ def get_db():
 # Create all tables
 def create_tables():
     from . import models  # Import models here to avoid circular imports
+    from .services.paper_index import create_index
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    create_index()
+
+# create_all never alters existing tables, so columns added to a model later
+# are added here (nullable, no default) to databases created before them
+def add_missing_columns():
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {column_type}'))
 
 
@@ -2,7 +2,12 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .database import create_tables
-from .api import auth, papers, workspaces, ai
+from .api import auth, papers, workspaces, ai, internal, jobs, chatbot
+from .services.harvester import resume_unfinished as resume_harvests
+from .services.http_client import close_session
+from .services.ingestion import resume_unfinished as resume_ingestion
+from .services.llm_client import close_client as close_llm_client
+from .services.pdf_pool import shutdown_pool
 
 app = FastAPI(title="ResearchHub AI API", version="1.0.0")
 
@@ -23,6 +28,20 @@ app.include_router(auth.router)
 app.include_router(papers.router) 
 app.include_router(workspaces.router)
 app.include_router(ai.router)
+app.include_router(chatbot.router)
+app.include_router(internal.router)
+app.include_router(jobs.router)
+
+@app.on_event("startup")
+async def startup():
+    resume_harvests()
+    resume_ingestion()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_session()
+    await close_llm_client()
+    shutdown_pool()
 
 @app.get("/")
 async def root():
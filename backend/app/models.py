@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey, Float, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -43,7 +43,135 @@ class Paper(Base):
     publication_date = Column(String, nullable=True)
     venue = Column(String, nullable=True)
     citation_count = Column(Integer, default=0)
+    full_text = Column(Text, nullable=True)  # filled by PDF ingestion jobs
+    pdf_sha256 = Column(String, nullable=True)  # stored_pdfs key of the ingested PDF
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     workspace = relationship("Workspace", back_populates="papers")
 
+class IndexedPaper(Base):
+    """A normalized search result kept for the local full-text index (see services/paper_index.py)"""
+    __tablename__ = "indexed_papers"
+
+    id = Column(Integer, primary_key=True)
+    paper_key = Column(String, unique=True, index=True, nullable=False)
+    sources = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)
+    fetched_at = Column(Float, nullable=False)
+
+class HarvestJob(Base):
+    """A resumable bulk harvest of one source into the local paper index"""
+    __tablename__ = "harvest_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    source = Column(String, nullable=False)  # openalex or arxiv
+    query = Column(String, nullable=False)
+    max_records = Column(Integer, nullable=False)
+    cursor = Column(String, nullable=True)  # OpenAlex cursor or next arXiv offset
+    harvested = Column(Integer, default=0)
+    total_available = Column(Integer, nullable=True)
+    status = Column(String, default="pending")  # pending, running, completed, failed
+    error = Column(Text, nullable=True)
+    claimed_by = Column(String, nullable=True)  # worker running the job (see harvester.WORKER_ID)
+    lease_until = Column(Float, nullable=True)  # claim expiry; another worker may take over after it
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class StoredPdf(Base):
+    """An uploaded PDF stored once by content hash, with its cached extraction (see services/pdf_store.py)"""
+    __tablename__ = "stored_pdfs"
+
+    sha256 = Column(String, primary_key=True)
+    file_path = Column(String, nullable=False)
+    filename = Column(String, nullable=True)  # name it was first uploaded under
+    size_bytes = Column(Integer, nullable=False)  # PDF plus cached text
+    page_count = Column(Integer, nullable=True)  # null until extracted; pages live in <sha256>.pages.ndjson
+    pdf_metadata = Column(Text, nullable=True)  # JSON document info dict
+    hits = Column(Integer, default=0)
+    last_used_at = Column(Float, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IngestionJob(Base):
+    """Background extraction of an uploaded PDF into a Paper row (see services/ingestion.py)"""
+    __tablename__ = "ingestion_jobs"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    paper_id = Column(String, ForeignKey("papers.id"), nullable=False)
+    sha256 = Column(String, nullable=False)
+    file_path = Column(String, nullable=False)
+    filename = Column(String, nullable=True)
+    status = Column(String, default="queued", index=True)  # queued, running, completed, failed
+    pages_done = Column(Integer, default=0)
+    page_count = Column(Integer, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class PaperChunk(Base):
+    """A section-aware slice of a paper's full_text (see services/paper_chunks.py)"""
+    __tablename__ = "paper_chunks"
+
+    id = Column(Integer, primary_key=True)
+    paper_id = Column(String, ForeignKey("papers.id"), nullable=False)
+    ordinal = Column(Integer, nullable=False)  # position within the paper
+    section = Column(String, nullable=False)  # abstract, introduction, methods, results, ..., body
+    char_start = Column(Integer, nullable=False)  # offsets into Paper.full_text
+    char_end = Column(Integer, nullable=False)
+    page_start = Column(Integer, nullable=True)
+    page_end = Column(Integer, nullable=True)
+    text = Column(Text, nullable=False)
+
+    __table_args__ = (Index("ix_paper_chunks_paper_section", "paper_id", "section"),)
+
+class LLMResponse(Base):
+    """A cached LLM completion keyed by model parameters and prompt hash (see services/llm_cache.py)"""
+    __tablename__ = "llm_responses"
+
+    key = Column(String, primary_key=True)  # SHA-256 of model, temperature, max_tokens and normalized prompt
+    model = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    prompt_tokens = Column(Integer, default=0)
+    completion_tokens = Column(Integer, default=0)
+    hits = Column(Integer, default=0)
+    created_at = Column(Float, nullable=False, index=True)
+    last_used_at = Column(Float, nullable=False, index=True)
+
+class PaperSummary(Base):
+    """A precomputed summary of one paper, regenerated when its source text changes (see services/paper_summaries.py)"""
+    __tablename__ = "paper_summaries"
+
+    id = Column(Integer, primary_key=True)
+    paper_id = Column(String, nullable=False)  # Paper.id or the search-result id a workspace stores
+    summary_type = Column(String, nullable=False)  # short, full, methods
+    source_hash = Column(String, nullable=False)  # SHA-256 of the text the summary was generated from
+    model = Column(String, nullable=True)
+    summary = Column(Text, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+    __table_args__ = (UniqueConstraint("paper_id", "summary_type", name="uq_paper_summaries_paper_type"),)
+
+class ChatSession(Base):
+    """A server-side paper chat: recent messages verbatim, older ones folded into `summary` (see services/chat_sessions.py)"""
+    __tablename__ = "chat_sessions"
+
+    id = Column(String, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    paper_ids = Column(Text, nullable=False, default="[]")  # JSON list of Paper ids the chat is about
+    summary = Column(Text, nullable=True)  # rolling summary of the messages folded so far
+    summarized_count = Column(Integer, default=0)  # messages covered by `summary`, oldest first
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class ChatMessage(Base):
+    """One user question or assistant answer in a ChatSession"""
+    __tablename__ = "chat_messages"
+
+    id = Column(Integer, primary_key=True)
+    session_id = Column(String, ForeignKey("chat_sessions.id"), nullable=False, index=True)
+    role = Column(String, nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+    citations = Column(Text, nullable=True)  # JSON list, assistant messages only
+    prompt_tokens = Column(Integer, nullable=True)  # estimated size of the prompt that produced this answer
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,43 +1,46 @@
-from groq import Groq
 from typing import Optional
-from app.core.config import settings
+from app.services.literature_review import literature_review
+from app.services.llm_client import BULK, INTERACTIVE, NOT_CONFIGURED, complete, llm_configured
+from app.services.model_router import CHAT, SUMMARY, SYNTHESIS
 
-class AIService:
-    def __init__(self):
-        if hasattr(settings, 'GROQ_API_KEY') and settings.GROQ_API_KEY:
-            self.client = Groq(api_key=settings.GROQ_API_KEY)
-            self.model = "llama-3.3-70b-versatile"  # Fast, free model
-        else:
-            self.client = None
-            self.model = None
-
-    async def summarize_paper(self, paper_content: str, summary_type: str = "full") -> str:
-        """Generate AI summary of a paper"""
-        if not self.client:
-            return "AI service not configured. Please add GROQ_API_KEY to .env file."
-        
-        try:
-            prompt = f"""Summarize the following research paper with focus on {summary_type}:
+SUMMARY_TYPES = ("short", "full", "methods")
+
+def summary_prompt(paper_content: str, summary_type: str = "full") -> str:
+    return f"""Summarize the following research paper with focus on {summary_type}:
 
 {paper_content}
 
 Provide a clear, concise summary."""
+
+class AIService:
+    """Prompt builders over the shared LLM client (cheap to construct; holds no connection)"""
+
+    async def summarize_paper(self, paper_content: str, summary_type: str = "full", user_id: Optional[int] = None, bypass_cache: bool = False, lane: str = INTERACTIVE) -> str:
+        """Generate AI summary of a paper"""
+        if not llm_configured():
+            return NOT_CONFIGURED
+        
+        try:
+            prompt = summary_prompt(paper_content, summary_type)
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return await complete(
                 messages=[{"role": "user", "content": prompt}],
+                task=SUMMARY,
                 temperature=0.5,
-                max_tokens=1024
+                max_tokens=1024,
+                user_id=user_id,
+                lane=lane,
+                cache=True,
+                bypass_cache=bypass_cache
             )
-            return response.choices[0].message.content
         
         except Exception as e:
             return f"Error: {str(e)}"
 
-    async def compare_papers(self, papers: list) -> str:
+    async def compare_papers(self, papers: list, user_id: Optional[int] = None, bypass_cache: bool = False) -> str:
         """Compare multiple research papers"""
-        if not self.client:
-            return "AI service not configured. Please add GROQ_API_KEY to .env file."
+        if not llm_configured():
+            return NOT_CONFIGURED
         
         try:
             paper_texts = []
@@ -58,54 +61,39 @@ Provide:
 4. Similarities and differences
 5. Overall contribution"""
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return await complete(
                 messages=[{"role": "user", "content": prompt}],
+                task=SYNTHESIS,
                 temperature=0.7,
-                max_tokens=2048
+                max_tokens=2048,
+                user_id=user_id,
+                lane=BULK,
+                cache=True,
+                bypass_cache=bypass_cache
             )
-            return response.choices[0].message.content
         
         except Exception as e:
             return f"Error: {str(e)}"
 
-    async def generate_literature_review(self, papers: list) -> str:
-        """Generate a literature review from papers"""
-        if not self.client:
-            return "AI service not configured. Please add GROQ_API_KEY to .env file."
+    async def generate_literature_review(self, papers: list, user_id: Optional[int] = None, bypass_cache: bool = False) -> str:
+        """Generate a literature review from papers (map-reduce over per-paper digests)"""
+        if not llm_configured():
+            return NOT_CONFIGURED
         
         try:
-            paper_texts = []
-            for paper in papers:
-                paper_text = f"{paper.title}\n{paper.abstract or ''}"
-                paper_texts.append(paper_text)
-            
-            prompt = f"""Write a comprehensive literature review based on these papers:
-
-{chr(10).join(paper_texts)}
-
-Include:
-- Introduction to the research area
-- Summary of each paper's contribution
-- Common themes and patterns
-- Gaps in current research
-- Future directions"""
-            
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=3000
-            )
-            return response.choices[0].message.content
+            paper_dicts = [
+                {"id": getattr(paper, "id", None), "title": paper.title, "abstract": paper.abstract}
+                for paper in papers
+            ]
+            return await literature_review(paper_dicts, user_id=user_id, bypass_cache=bypass_cache)
         
         except Exception as e:
             return f"Error: {str(e)}"
 
-    async def chat_with_context(self, context: str, question: str) -> str:
+    async def chat_with_context(self, context: str, question: str, user_id: Optional[int] = None) -> str:
         """Chat with AI about papers"""
-        if not self.client:
-            return "AI service not configured. Please add GROQ_API_KEY to .env file."
+        if not llm_configured():
+            return NOT_CONFIGURED
         
         try:
             prompt = f"""You are a helpful research assistant. Answer questions based on the following research papers:
@@ -114,15 +102,17 @@ Include:
 
 Question: {question}
 
-Please provide a detailed, accurate answer based only on the information in the papers above. If the information is not in the papers, say so."""
+Please provide a detailed, accurate answer based only on the information in the papers above. If the information is not in the papers, say so.
+When the passages are numbered like [1], cite the ones you use by number."""
             
-            response = self.client.chat.completions.create(
-                model=self.model,
+            return await complete(
                 messages=[{"role": "user", "content": prompt}],
+                task=CHAT,
                 temperature=0.5,
-                max_tokens=1500
+                max_tokens=1500,
+                user_id=user_id,
+                lane=INTERACTIVE
             )
-            return response.choices[0].message.content
         
         except Exception as e:
             return f"Error: {str(e)}"
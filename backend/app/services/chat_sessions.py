@@ -0,0 +1,192 @@
+import asyncio
+import json
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import ChatMessage, ChatSession
+from app.services.llm_client import BULK, INTERACTIVE, complete
+from app.services.model_router import CHAT, SUMMARY
+from app.services.paper_chunks import build_passages, owned_papers
+from app.services.retrieval import estimate_tokens, select_passages
+
+SYSTEM_PROMPT = (
+    "You are a helpful research assistant in an ongoing conversation about research papers. "
+    "Answer from the paper passages given with each question; if they do not contain the answer, say so. "
+    "When the passages are numbered like [1], cite the ones you use by number."
+)
+
+
+class PapersNotFound(Exception):
+    """Raised when a session is asked for papers outside the user's workspaces"""
+
+
+_compacting: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def create_session(user_id: int, paper_ids: List[str]) -> ChatSession:
+    """New session about `paper_ids`, all of which must be in the user's workspaces"""
+    paper_ids = list(dict.fromkeys(paper_ids))
+    db = SessionLocal()
+    try:
+        if paper_ids and len(owned_papers(db, user_id, paper_ids)) < len(paper_ids):
+            raise PapersNotFound("Papers not found")
+        session = ChatSession(id=str(uuid.uuid4()), user_id=user_id,
+                              paper_ids=json.dumps(paper_ids), summarized_count=0)
+        db.add(session)
+        db.commit()
+        db.refresh(session)
+        return session
+    finally:
+        db.close()
+
+
+def get_session(session_id: str, user_id: int) -> Optional[ChatSession]:
+    db = SessionLocal()
+    try:
+        return db.query(ChatSession).filter(ChatSession.id == session_id, ChatSession.user_id == user_id).first()
+    finally:
+        db.close()
+
+
+def session_messages(session_id: str, offset: int = 0) -> List[ChatMessage]:
+    """Messages of a session oldest first, skipping the first `offset`"""
+    db = SessionLocal()
+    try:
+        return db.query(ChatMessage).filter(ChatMessage.session_id == session_id).order_by(
+            ChatMessage.id
+        ).offset(offset).all()
+    finally:
+        db.close()
+
+
+def _clip(text: str) -> str:
+    limit = settings.CHAT_HISTORY_MESSAGE_TOKENS * 4  # characters
+    return text if len(text) <= limit else text[:limit] + " ..."
+
+
+def prepare_turn(session: ChatSession, question: str, token_budget: Optional[int] = None) -> Tuple[List[Dict[str, str]], List[Dict]]:
+    """Prompt for the next answer: rolling summary, recent messages, then passages retrieved for the question.
+
+    Only messages not yet folded into the summary are sent, at most
+    CHAT_RECENT_MESSAGES + 2 * CHAT_SUMMARIZE_BATCH of them (more only pile
+    up while a compaction is failing), each clipped, so the prompt stays
+    about the same size however long the session runs.
+    """
+    recent = session_messages(session.id, session.summarized_count or 0)
+    recent = recent[-(settings.CHAT_RECENT_MESSAGES + 2 * settings.CHAT_SUMMARIZE_BATCH):]
+
+    context, citations = "", []
+    paper_ids = json.loads(session.paper_ids or "[]")
+    if paper_ids:
+        db = SessionLocal()
+        try:
+            # Checked again per turn: a paper may have left the owner's workspaces since
+            papers = owned_papers(db, session.user_id, paper_ids)
+        finally:
+            db.close()
+        # Follow-ups ("what dataset did they use?") lean on the previous question for their topic
+        previous = next((m.content for m in reversed(recent) if m.role == "user"), "")
+        context, citations = select_passages(f"{question} {previous}", build_passages(papers), token_budget)
+
+    system = SYSTEM_PROMPT
+    if session.summary:
+        system += f"\n\nSummary of the conversation so far:\n{session.summary}"
+    messages = [{"role": "system", "content": system}]
+    messages += [{"role": m.role, "content": _clip(m.content)} for m in recent]
+    question_block = f"Paper passages:\n{context}\n\nQuestion: {question}" if context else question
+    messages.append({"role": "user", "content": question_block})
+    return messages, citations
+
+
+def record_turn(session_id: str, question: str, answer: str, citations: List[Dict], prompt_tokens: int) -> None:
+    db = SessionLocal()
+    try:
+        db.add(ChatMessage(session_id=session_id, role="user", content=question))
+        db.add(ChatMessage(session_id=session_id, role="assistant", content=answer,
+                           citations=json.dumps(citations), prompt_tokens=prompt_tokens))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def ask(session: ChatSession, question: str, user_id=None, token_budget: Optional[int] = None) -> Dict:
+    """Answer one question in a session, store the turn and compact older turns in the background"""
+    messages, citations = await asyncio.to_thread(prepare_turn, session, question, token_budget)
+    prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+    answer = await complete(
+        messages=messages,
+        task=CHAT,
+        temperature=0.5,
+        max_tokens=1500,
+        user_id=user_id,
+        lane=INTERACTIVE,
+    )
+    await asyncio.to_thread(record_turn, session.id, question, answer, citations, prompt_tokens)
+    compact_in_background(session.id, user_id)
+    return {"answer": answer, "citations": citations, "prompt_tokens": prompt_tokens}
+
+
+def _save_summary(session_id: str, summary: str, folded_from: int, folded: int) -> None:
+    db = SessionLocal()
+    try:
+        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        if session is not None and (session.summarized_count or 0) == folded_from:
+            session.summary = summary
+            session.summarized_count = folded_from + folded
+            db.commit()
+    finally:
+        db.close()
+
+
+async def compact(session_id: str, user_id=None) -> bool:
+    """Fold the messages older than the last CHAT_RECENT_MESSAGES into the rolling summary,
+    once at least CHAT_SUMMARIZE_BATCH of them have built up. Returns whether it did."""
+    session = await asyncio.to_thread(get_session, session_id, user_id)
+    if session is None:
+        return False
+    folded_from = session.summarized_count or 0
+    pending = await asyncio.to_thread(session_messages, session_id, folded_from)
+    older = pending[:-settings.CHAT_RECENT_MESSAGES] if settings.CHAT_RECENT_MESSAGES else pending
+    if len(older) < settings.CHAT_SUMMARIZE_BATCH:
+        return False
+
+    transcript = "\n".join(f"{m.role.capitalize()}: {_clip(m.content)}" for m in older)
+    words = settings.CHAT_SUMMARY_TOKENS * 3 // 4
+    summary = await complete(
+        messages=[{
+            "role": "user",
+            "content": "Update the running summary of a conversation between a researcher and an assistant about "
+                       "research papers. Keep the researcher's goals, the papers and findings discussed, conclusions "
+                       f"reached and open questions, in at most {words} words.\n\n"
+                       f"Summary so far:\n{session.summary or '(none)'}\n\nNew messages:\n{transcript}"
+        }],
+        task=SUMMARY,
+        temperature=0.2,
+        max_tokens=settings.CHAT_SUMMARY_TOKENS,
+        user_id=user_id,
+        lane=BULK,
+    )
+    await asyncio.to_thread(_save_summary, session_id, summary, folded_from, len(older))
+    return True
+
+
+async def _compact_once(session_id: str, user_id) -> None:
+    if session_id in _compacting:
+        return
+    _compacting.add(session_id)
+    try:
+        await compact(session_id, user_id)
+    except Exception as e:
+        print(f"Compacting chat session {session_id} failed: {e}")
+    finally:
+        _compacting.discard(session_id)
+
+
+def compact_in_background(session_id: str, user_id=None) -> None:
+    """Summarize older turns after the answer has been sent, so no chat turn waits for it"""
+    task = asyncio.create_task(_compact_once(session_id, user_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,231 @@
+import asyncio
+import os
+import re
+import socket
+import time
+import uuid
+from typing import Callable, List, Optional, Set
+
+from sqlalchemy import or_
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import HarvestJob
+from app.services.paper_index import upsert_papers
+from app.services.paper_sources import (
+    ARXIV_URL,
+    OPENALEX_URL,
+    fetch_json,
+    fetch_text,
+    parse_arxiv_feed,
+    parse_openalex_work,
+)
+
+HARVEST_SOURCES = ("openalex", "arxiv")
+
+# Only the fields parse_openalex_work reads; full work objects are ~10x larger
+OPENALEX_SELECT = "id,doi,title,publication_date,cited_by_count,authorships,primary_location,abstract_inverted_index,ids"
+OPENALEX_PAGE_SIZE = 200  # OpenAlex maximum
+ARXIV_PAGE_SIZE = 100
+
+_ARXIV_TOTAL = re.compile(r"<opensearch:totalResults[^>]*>(\d+)<")
+ACTIVE_STATUSES = ["pending", "running"]
+
+# Identifies this process when claiming jobs, so with several workers each
+# unfinished harvest is resumed by exactly one of them
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaseLost(Exception):
+    """Raised when another worker has taken over a harvest this one was running"""
+
+_running: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+ProgressCallback = Callable[[HarvestJob], None]
+
+
+def create_harvest(source: str, query: str, max_records: int, user_id: Optional[int] = None) -> HarvestJob:
+    """Persist a new harvest job"""
+    db = SessionLocal()
+    try:
+        job = HarvestJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            source=source,
+            query=query,
+            max_records=max_records,
+            harvested=0,
+            status="pending",
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    finally:
+        db.close()
+
+
+def get_harvest(job_id: str) -> Optional[HarvestJob]:
+    db = SessionLocal()
+    try:
+        return db.query(HarvestJob).filter(HarvestJob.id == job_id).first()
+    finally:
+        db.close()
+
+
+def _claim(job_id: str) -> bool:
+    """Take the lease on an unfinished (or failed) job unless another live worker holds it, in one atomic UPDATE"""
+    now = time.time()
+    db = SessionLocal()
+    try:
+        claimed = db.query(HarvestJob).filter(
+            HarvestJob.id == job_id,
+            HarvestJob.status != "completed",
+            or_(HarvestJob.lease_until.is_(None), HarvestJob.lease_until < now,
+                HarvestJob.claimed_by == WORKER_ID),
+        ).update({
+            "claimed_by": WORKER_ID,
+            "lease_until": now + settings.HARVEST_LEASE_SECONDS,
+            "status": "running",
+            "error": None,
+        }, synchronize_session=False)
+        db.commit()
+        return claimed == 1
+    finally:
+        db.close()
+
+
+def _save(job_id: str, **fields) -> HarvestJob:
+    """Update a job this worker holds, renewing its lease"""
+    db = SessionLocal()
+    try:
+        job = db.query(HarvestJob).filter(HarvestJob.id == job_id).first()
+        if job.claimed_by != WORKER_ID:
+            raise LeaseLost(f"Harvest {job_id} is now run by {job.claimed_by}")
+        job.lease_until = time.time() + settings.HARVEST_LEASE_SECONDS
+        for name, value in fields.items():
+            setattr(job, name, value)
+        db.commit()
+        db.refresh(job)
+        return job
+    finally:
+        db.close()
+
+
+async def _store_page(job: HarvestJob, papers: List[dict], cursor: Optional[str], total: Optional[int]) -> HarvestJob:
+    """Write one page to the index, then advance the job's cursor"""
+    room = job.max_records - job.harvested
+    papers = papers[:room]
+    await asyncio.to_thread(upsert_papers, papers)
+    fields = {"cursor": cursor, "harvested": job.harvested + len(papers)}
+    if total is not None:
+        fields["total_available"] = total
+    return await asyncio.to_thread(_save, job.id, **fields)
+
+
+async def _harvest_openalex(job: HarvestJob, progress: Optional[ProgressCallback]) -> HarvestJob:
+    cursor = job.cursor or "*"
+    while cursor and job.harvested < job.max_records:
+        params = {
+            "search": job.query,
+            "per_page": OPENALEX_PAGE_SIZE,
+            "cursor": cursor,
+            "select": OPENALEX_SELECT,
+        }
+        if settings.OPENALEX_MAILTO:
+            params["mailto"] = settings.OPENALEX_MAILTO
+        data = await fetch_json("openalex", OPENALEX_URL, params)
+        works = data.get("results", [])
+        next_cursor = (data.get("meta") or {}).get("next_cursor") if works else None
+        job = await _store_page(job, [parse_openalex_work(work) for work in works], next_cursor,
+                                (data.get("meta") or {}).get("count"))
+        if progress:
+            progress(job)
+        cursor = next_cursor
+    return job
+
+
+async def _harvest_arxiv(job: HarvestJob, progress: Optional[ProgressCallback]) -> HarvestJob:
+    # Oldest first: new submissions land at the end, so saved offsets stay valid
+    # and a resumed harvest neither skips nor re-counts records. Pages are
+    # fetched one at a time, HARVEST_ARXIV_DELAY apart, as arXiv asks.
+    start = int(job.cursor or 0)
+    while job.harvested < job.max_records:
+        if start:
+            await asyncio.sleep(settings.HARVEST_ARXIV_DELAY)
+        feed = await fetch_text("arxiv", ARXIV_URL, {
+            "search_query": job.query,
+            "start": start,
+            "max_results": ARXIV_PAGE_SIZE,
+            "sortBy": "submittedDate",
+            "sortOrder": "ascending",
+        })
+        papers = parse_arxiv_feed(feed)
+        match = _ARXIV_TOTAL.search(feed)
+        start += len(papers)
+        job = await _store_page(job, papers, str(start), int(match.group(1)) if match else None)
+        if progress:
+            progress(job)
+        if len(papers) < ARXIV_PAGE_SIZE:
+            break
+    return job
+
+
+async def _run(job_id: str, progress: Optional[ProgressCallback]) -> Optional[HarvestJob]:
+    _running.add(job_id)
+    try:
+        job = await asyncio.to_thread(get_harvest, job_id)
+        if job.source == "openalex":
+            job = await _harvest_openalex(job, progress)
+        else:
+            job = await _harvest_arxiv(job, progress)
+        return await asyncio.to_thread(_save, job_id, status="completed", lease_until=None)
+    except LeaseLost as e:
+        print(e)
+        return await asyncio.to_thread(get_harvest, job_id)
+    except Exception as e:
+        print(f"Harvest {job_id} failed: {e}")
+        return await asyncio.to_thread(_save, job_id, status="failed", error=str(e), lease_until=None)
+    finally:
+        _running.discard(job_id)
+
+
+async def run_harvest(job_id: str, progress: Optional[ProgressCallback] = None) -> Optional[HarvestJob]:
+    """Run (or resume) a harvest job from its saved cursor until done, unless another worker is running it"""
+    if job_id in _running or not await asyncio.to_thread(_claim, job_id):
+        return await asyncio.to_thread(get_harvest, job_id)
+    return await _run(job_id, progress)
+
+
+def start_in_background(job_id: str) -> None:
+    task = asyncio.create_task(run_harvest(job_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _resume(job_id: str) -> None:
+    """Resume a job once its lease is free; a lease left by a stopped process expires on its own"""
+    while True:
+        if job_id in _running:
+            return
+        if await asyncio.to_thread(_claim, job_id):
+            await _run(job_id, None)
+            return
+        job = await asyncio.to_thread(get_harvest, job_id)
+        if job is None or job.status not in ACTIVE_STATUSES:
+            return
+        await asyncio.sleep(max((job.lease_until or 0) - time.time(), 0) + 1)
+
+
+def resume_unfinished() -> None:
+    """Restart jobs that were pending or running when the process stopped (each by one worker only)"""
+    db = SessionLocal()
+    try:
+        job_ids = [job.id for job in db.query(HarvestJob).filter(HarvestJob.status.in_(ACTIVE_STATUSES))]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        task = asyncio.create_task(_resume(job_id))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
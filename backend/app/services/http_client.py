@@ -0,0 +1,30 @@
+import aiohttp
+from typing import Optional
+
+from app.core.config import settings
+
+_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Return the process-wide pooled HTTP session, creating it on first use"""
+    global _session
+    if _session is None or _session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=settings.HTTP_POOL_SIZE,
+            limit_per_host=settings.HTTP_POOL_SIZE_PER_HOST,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": f"{settings.APP_NAME}/{settings.VERSION}"},
+        )
+    return _session
+
+
+async def close_session() -> None:
+    """Close the shared HTTP session (called on application shutdown)"""
+    global _session
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
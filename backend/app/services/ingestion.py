@@ -0,0 +1,163 @@
+import asyncio
+import os
+import uuid
+from typing import List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import IngestionJob, Paper
+from app.services.paper_chunks import chunk_text, join_pages, replace_chunks
+from app.services.paper_summaries import summarize_in_background
+from app.services.pdf_pool import ExtractionBusy, count_pages
+from app.services.pdf_store import iter_stored
+
+ACTIVE_STATUSES = ["queued", "running"]
+BUSY_RETRY_SECONDS = 2.0
+
+
+class IngestionQueueFull(Exception):
+    """Raised when a user already has INGEST_MAX_QUEUED_PER_USER jobs queued or running"""
+
+
+_slots: Optional[asyncio.Semaphore] = None
+_running: Set[str] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.INGEST_CONCURRENCY)
+    return _slots
+
+
+def create_job(user_id: int, digest: str, file_path: str, filename: str,
+               paper_id: Optional[str] = None, workspace_id: Optional[int] = None) -> IngestionJob:
+    """Queue a job for a stored PDF, creating its Paper row unless `paper_id` names an existing one"""
+    db = SessionLocal()
+    try:
+        active = db.query(IngestionJob).filter(
+            IngestionJob.user_id == user_id, IngestionJob.status.in_(ACTIVE_STATUSES)
+        ).count()
+        if active >= settings.INGEST_MAX_QUEUED_PER_USER:
+            raise IngestionQueueFull(f"At most {settings.INGEST_MAX_QUEUED_PER_USER} ingestion jobs per user")
+
+        paper = db.query(Paper).filter(Paper.id == paper_id).first() if paper_id else None
+        if paper is None:
+            paper = Paper(
+                id=paper_id or f"pdf:{digest[:16]}:{uuid.uuid4().hex[:8]}",
+                workspace_id=workspace_id,
+                title=os.path.splitext(filename)[0] or "Untitled PDF",
+            )
+            db.add(paper)
+        job = IngestionJob(
+            id=str(uuid.uuid4()),
+            user_id=user_id,
+            paper_id=paper.id,
+            sha256=digest,
+            file_path=file_path,
+            filename=filename,
+            pages_done=0,
+            status="queued",
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+        return job
+    finally:
+        db.close()
+
+
+def get_job(job_id: str) -> Optional[IngestionJob]:
+    db = SessionLocal()
+    try:
+        return db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+    finally:
+        db.close()
+
+
+def _save(job_id: str, **fields) -> IngestionJob:
+    db = SessionLocal()
+    try:
+        job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+        for name, value in fields.items():
+            setattr(job, name, value)
+        db.commit()
+        db.refresh(job)
+        return job
+    finally:
+        db.close()
+
+
+def _store_text(job_id: str, paper_id: str, digest: str, pages: List[dict]) -> Tuple[IngestionJob, dict]:
+    """Write the text and its chunks to the paper and complete the job in one transaction"""
+    text, page_starts = join_pages(pages)
+    chunks = chunk_text(text, page_starts)
+    db = SessionLocal()
+    try:
+        paper = db.query(Paper).filter(Paper.id == paper_id).first()
+        paper.full_text = text
+        paper.pdf_sha256 = digest
+        replace_chunks(db, paper_id, chunks)
+        job = db.query(IngestionJob).filter(IngestionJob.id == job_id).first()
+        job.status = "completed"
+        job.pages_done = job.page_count
+        db.commit()
+        db.refresh(job)
+        return job, {"id": paper.id, "title": paper.title, "abstract": paper.abstract}
+    finally:
+        db.close()
+
+
+async def _extract(job: IngestionJob) -> List[dict]:
+    pages: List[dict] = []
+    async for page, _ in iter_stored(job.sha256, job.file_path):
+        pages.append(page)
+        if page["page"] % settings.INGEST_PROGRESS_PAGES == 0:
+            await asyncio.to_thread(_save, job.id, pages_done=page["page"])
+    return pages
+
+
+async def run_job(job_id: str) -> Optional[IngestionJob]:
+    """Extract a queued job's PDF and store the text on its paper"""
+    if job_id in _running:
+        return get_job(job_id)
+    _running.add(job_id)
+    try:
+        async with _get_slots():
+            job = await asyncio.to_thread(_save, job_id, status="running", pages_done=0, error=None)
+            page_count = await asyncio.to_thread(count_pages, job.file_path)
+            job = await asyncio.to_thread(_save, job_id, page_count=page_count)
+            while True:
+                try:
+                    pages = await _extract(job)
+                    break
+                except ExtractionBusy:
+                    # The process pool is shared with interactive uploads; wait our turn
+                    await asyncio.sleep(BUSY_RETRY_SECONDS)
+            job, paper = await asyncio.to_thread(_store_text, job_id, job.paper_id, job.sha256, pages)
+        # Precompute summaries now that the full text and its chunks are stored
+        summarize_in_background(paper)
+        return job
+    except Exception as e:
+        print(f"Ingestion job {job_id} failed: {e}")
+        return await asyncio.to_thread(_save, job_id, status="failed", error=str(e))
+    finally:
+        _running.discard(job_id)
+
+
+def start_in_background(job_id: str) -> None:
+    task = asyncio.create_task(run_job(job_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def resume_unfinished() -> None:
+    """Requeue jobs that were queued or running when the process stopped"""
+    db = SessionLocal()
+    try:
+        job_ids = [job.id for job in db.query(IngestionJob).filter(IngestionJob.status.in_(ACTIVE_STATUSES))]
+    finally:
+        db.close()
+    for job_id in job_ids:
+        start_in_background(job_id)
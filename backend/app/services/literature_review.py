@@ -0,0 +1,173 @@
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import Paper
+from app.services.llm_client import BULK, complete, stream
+from app.services.model_router import DIGEST, SYNTHESIS
+from app.services.paper_details import get_paper_details
+from app.services.paper_chunks import load_chunks
+from app.services.retrieval import estimate_tokens
+
+# Chunks worth reading when a paper has full text stored
+DIGEST_SECTIONS = ["abstract", "introduction", "results", "conclusion"]
+
+
+def _stored_papers(paper_ids: List[str]) -> Dict[str, dict]:
+    db = SessionLocal()
+    try:
+        rows = db.query(Paper).filter(Paper.id.in_(paper_ids)).all()
+        return {row.id: {"id": row.id, "title": row.title, "abstract": row.abstract} for row in rows}
+    finally:
+        db.close()
+
+
+async def load_papers(paper_ids: List[str], listed: Optional[Dict[str, dict]] = None) -> List[dict]:
+    """Papers behind `paper_ids` in the given order: stored rows first, then the entries in
+    `listed` (papers known locally without a row), the rest via batch lookup"""
+    paper_ids = list(dict.fromkeys(paper_ids))
+    found = await asyncio.to_thread(_stored_papers, paper_ids)
+    for paper_id in paper_ids:
+        if paper_id not in found and listed and paper_id in listed:
+            found[paper_id] = listed[paper_id]
+    missing = [paper_id for paper_id in paper_ids if paper_id not in found]
+    if missing:
+        for paper_id, paper in (await get_paper_details(missing)).items():
+            if paper:
+                found[paper_id] = paper
+    return [found[paper_id] for paper_id in paper_ids if paper_id in found]
+
+
+def _digest_input(paper: dict, chunks: List[str]) -> str:
+    """Title, abstract and overview chunks, cut to REVIEW_DIGEST_INPUT_TOKENS"""
+    parts = [paper.get("abstract") or ""] + chunks
+    budget = settings.REVIEW_DIGEST_INPUT_TOKENS * 4  # characters
+    text = "\n".join(part for part in parts if part)[:budget]
+    return f"Title: {paper.get('title') or 'Untitled'}\n{text}"
+
+
+async def _digest(paper: dict, chunks: List[str], user_id, slots: asyncio.Semaphore) -> str:
+    if not (paper.get("abstract") or chunks):
+        return f"{paper.get('title') or 'Untitled'}: no abstract or full text available."
+    # The prompt depends only on the paper, so the response cache turns reruns into lookups
+    async with slots:
+        return await complete(
+            messages=[{
+                "role": "user",
+                "content": "Write a digest of this research paper in at most 150 words covering: research question, "
+                           f"method, key findings, limitations.\n\n{_digest_input(paper, chunks)}"
+            }],
+            task=DIGEST,
+            temperature=0.2,
+            max_tokens=300,
+            user_id=user_id,
+            lane=BULK,
+            cache=True
+        )
+
+
+async def digest_papers(papers: List[dict], user_id=None) -> List[str]:
+    """Map step: one cached digest per paper, REVIEW_DIGEST_CONCURRENCY at a time"""
+    chunks: Dict[str, List[str]] = {}
+    ids = [paper["id"] for paper in papers if paper.get("id")]
+    for chunk in await asyncio.to_thread(load_chunks, ids, DIGEST_SECTIONS):
+        chunks.setdefault(chunk.paper_id, []).append(chunk.text)
+    slots = asyncio.Semaphore(settings.REVIEW_DIGEST_CONCURRENCY)
+    digests = await asyncio.gather(*[
+        _digest(paper, chunks.get(paper.get("id"), []), user_id, slots) for paper in papers
+    ])
+    return [f"[{n}] {paper.get('title') or 'Untitled'}\n{digest}" for n, (paper, digest) in
+            enumerate(zip(papers, digests), 1)]
+
+
+def _groups(parts: List[str], budget: int) -> List[List[str]]:
+    groups: List[List[str]] = [[]]
+    used = 0
+    for part in parts:
+        cost = estimate_tokens(part)
+        if groups[-1] and used + cost > budget:
+            groups.append([])
+            used = 0
+        groups[-1].append(part)
+        used += cost
+    return groups
+
+
+async def reduce_digests(parts: List[str], user_id=None) -> List[str]:
+    """Merge digests into thematic summaries, level by level, until they fit REVIEW_REDUCE_TOKENS.
+
+    Groups are consecutive runs of digests, so appending a paper only
+    changes the last group; the other groups' summaries come from the cache.
+    """
+    budget = settings.REVIEW_REDUCE_TOKENS
+    while sum(estimate_tokens(part) for part in parts) > budget:
+        groups = _groups(parts, budget)
+        if len(groups) == len(parts):
+            if len(parts) == 1:
+                break
+            # Parts too large to share a group: merge them pairwise instead
+            groups = [parts[i:i + 2] for i in range(0, len(parts), 2)]
+        slots = asyncio.Semaphore(settings.REVIEW_DIGEST_CONCURRENCY)
+
+        async def merge(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            async with slots:
+                return await complete(
+                    messages=[{
+                        "role": "user",
+                        "content": "Synthesize these paper digests into a thematic summary of at most 400 words. "
+                                   "Keep the [n] paper numbers when attributing findings.\n\n" + "\n\n".join(group)
+                    }],
+                    task=SYNTHESIS,
+                    temperature=0.3,
+                    max_tokens=700,
+                    user_id=user_id,
+                    lane=BULK,
+                    cache=True
+                )
+
+        parts = await asyncio.gather(*[merge(group) for group in groups])
+    return parts
+
+
+def review_call(parts: List[str]) -> dict:
+    """Final reduce: the review prompt over digests (or merged summaries)"""
+    return {
+        "messages": [{
+            "role": "user",
+            "content": f"""Write a comprehensive literature review based on these paper digests:
+
+{chr(10).join(parts)}
+
+Include:
+- Introduction to the research area
+- Summary of each paper's contribution
+- Common themes and patterns
+- Gaps in current research
+- Future directions
+
+Cite papers by their [n] numbers."""
+        }],
+        "task": SYNTHESIS,
+        "temperature": 0.7,
+        "max_tokens": 3000
+    }
+
+
+async def literature_review(papers: List[dict], user_id=None, bypass_cache: bool = False) -> str:
+    """Map-reduce literature review over any number of papers"""
+    parts = await reduce_digests(await digest_papers(papers, user_id), user_id)
+    return await complete(**review_call(parts), user_id=user_id, lane=BULK, cache=True, bypass_cache=bypass_cache)
+
+
+async def stream_literature_review(papers: List[dict], user_id=None) -> AsyncIterator[str]:
+    """As literature_review, streaming the final step token by token"""
+    parts = await reduce_digests(await digest_papers(papers, user_id), user_id)
+    tokens = stream(**review_call(parts), user_id=user_id, lane=BULK)
+    try:
+        async for token in tokens:
+            yield token
+    finally:
+        await tokens.aclose()
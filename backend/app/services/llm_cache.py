@@ -0,0 +1,87 @@
+import hashlib
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import LLMResponse
+
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "stores": 0, "evictions": 0, "tokens_saved": 0}
+
+
+def cache_key(messages: List[Dict[str, str]], model: str, temperature: float, max_tokens: int) -> str:
+    """SHA-256 over the model parameters and the rendered prompt, whitespace-normalized"""
+    prompt = [(message["role"], " ".join(message["content"].split())) for message in messages]
+    payload = json.dumps([model, round(temperature, 3), max_tokens, prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def lookup(key: str) -> Optional[Tuple[str, str]]:
+    """(response, model that wrote it) for `key` if present and younger than LLM_CACHE_TTL"""
+    db = SessionLocal()
+    try:
+        row = db.query(LLMResponse).filter(LLMResponse.key == key).first()
+        if row is None or time.time() - row.created_at > settings.LLM_CACHE_TTL:
+            _stats["misses"] += 1
+            return None
+        row.hits = (row.hits or 0) + 1
+        row.last_used_at = time.time()
+        db.commit()
+        _stats["hits"] += 1
+        _stats["tokens_saved"] += (row.prompt_tokens or 0) + (row.completion_tokens or 0)
+        return row.response, row.model
+    finally:
+        db.close()
+
+
+def store(key: str, model: str, response: str, prompt_tokens: int, completion_tokens: int) -> None:
+    now = time.time()
+    db = SessionLocal()
+    try:
+        db.merge(LLMResponse(key=key, model=model, response=response, prompt_tokens=prompt_tokens,
+                             completion_tokens=completion_tokens, hits=0, created_at=now, last_used_at=now))
+        db.commit()
+        _stats["stores"] += 1
+    finally:
+        db.close()
+    evict()
+
+
+def evict() -> int:
+    """Delete expired responses, then the least recently used beyond LLM_CACHE_MAX_ENTRIES"""
+    db = SessionLocal()
+    try:
+        removed = db.query(LLMResponse).filter(
+            LLMResponse.created_at < time.time() - settings.LLM_CACHE_TTL
+        ).delete(synchronize_session=False)
+        excess = db.query(func.count(LLMResponse.key)).scalar() - settings.LLM_CACHE_MAX_ENTRIES
+        if excess > 0:
+            oldest = select(LLMResponse.key).order_by(LLMResponse.last_used_at).limit(excess)
+            removed += db.query(LLMResponse).filter(LLMResponse.key.in_(oldest)).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+    _stats["evictions"] += removed
+    return removed
+
+
+def record_bypass() -> None:
+    _stats["bypassed"] += 1
+
+
+def stats() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        entries = db.query(func.count(LLMResponse.key)).scalar()
+    finally:
+        db.close()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "entries": entries,
+        "max_entries": settings.LLM_CACHE_MAX_ENTRIES,
+        **_stats,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -0,0 +1,288 @@
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Hashable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services import llm_cache, model_router
+from app.services.model_router import CHAT
+from app.services.retrieval import estimate_tokens
+
+# Lanes: short interactive calls (chat, single summaries) and long bulk ones
+# (literature reviews, insights, batch summaries)
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+NOT_CONFIGURED = "AI service not configured. Please add GROQ_API_KEY to .env file."
+
+_client = None
+
+
+def llm_configured() -> bool:
+    return bool(settings.GROQ_API_KEY)
+
+
+def get_client():
+    """Shared AsyncGroq client; its httpx pool keeps connections open between calls"""
+    global _client
+    if _client is None:
+        from groq import AsyncGroq
+        _client = AsyncGroq(
+            api_key=settings.GROQ_API_KEY,
+            timeout=settings.LLM_TIMEOUT,
+            max_retries=settings.LLM_MAX_RETRIES,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.close()
+    _client = None
+
+
+class LLMGovernor:
+    """Global and per-user concurrency limits for LLM calls, with fair queuing.
+
+    Waiters queue per lane and per user. Whenever a slot frees up, the
+    interactive lane is served first, except that every BULK_TURN-th grant
+    goes to a waiting bulk call so bulk work still progresses. Within a lane
+    users are served round-robin, and bulk calls can never hold the slots
+    reserved for interactive ones. Each user has a separate allowance per
+    lane, so a user's batch work neither blocks their own chat nor is held
+    to the interactive per-user limit.
+    """
+
+    BULK_TURN = 4
+
+    def __init__(self, max_concurrency: int, per_user: int, reserved_interactive: int,
+                 per_user_bulk: Optional[int] = None):
+        self.max_concurrency = max_concurrency
+        self.bulk_limit = max(max_concurrency - reserved_interactive, 1)
+        self.per_user = {INTERACTIVE: per_user, BULK: per_user_bulk or per_user}
+        self._active = 0
+        self._active_by_lane = {lane: 0 for lane in LANES}
+        self._active_by_user: Dict[Tuple[Hashable, str], int] = {}
+        self._queues: Dict[str, "OrderedDict[Hashable, Deque[asyncio.Future]]"] = {
+            lane: OrderedDict() for lane in LANES
+        }
+        self._grants = 0
+        self.granted = {lane: 0 for lane in LANES}
+        self.max_wait = {lane: 0.0 for lane in LANES}
+
+    def _can_run(self, user: Hashable, lane: str) -> bool:
+        if self._active >= self.max_concurrency:
+            return False
+        if self._active_by_user.get((user, lane), 0) >= self.per_user[lane]:
+            return False
+        return lane == INTERACTIVE or self._active_by_lane[BULK] < self.bulk_limit
+
+    def _grant_from(self, lane: str) -> bool:
+        queue = self._queues[lane]
+        for user in list(queue):
+            if not self._can_run(user, lane):
+                continue
+            waiter = queue[user].popleft()
+            if queue[user]:
+                queue.move_to_end(user)  # round-robin between users
+            else:
+                del queue[user]
+            self._active += 1
+            self._active_by_lane[lane] += 1
+            self._active_by_user[user, lane] = self._active_by_user.get((user, lane), 0) + 1
+            self._grants += 1
+            self.granted[lane] += 1
+            waiter.set_result(None)
+            return True
+        return False
+
+    def _dispatch(self) -> None:
+        while self._active < self.max_concurrency:
+            order = (BULK, INTERACTIVE) if self._grants % self.BULK_TURN == self.BULK_TURN - 1 else LANES
+            if not any(self._grant_from(lane) for lane in order):
+                return
+
+    def _release(self, user: Hashable, lane: str) -> None:
+        self._active -= 1
+        self._active_by_lane[lane] -= 1
+        self._active_by_user[user, lane] -= 1
+        if not self._active_by_user[user, lane]:
+            del self._active_by_user[user, lane]
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, user: Optional[Hashable] = None, lane: str = INTERACTIVE):
+        """Hold one LLM call slot for `user` in `lane` for the duration of the block"""
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[lane].setdefault(user, deque()).append(waiter)
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self._release(user, lane)  # granted just as we were cancelled
+            else:
+                queue = self._queues[lane].get(user)
+                if queue and waiter in queue:
+                    queue.remove(waiter)
+                    if not queue:
+                        del self._queues[lane][user]
+            raise
+        self.max_wait[lane] = max(self.max_wait[lane], time.monotonic() - started)
+        try:
+            yield
+        finally:
+            self._release(user, lane)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "per_user": dict(self.per_user),
+            "bulk_limit": self.bulk_limit,
+            "active": dict(self._active_by_lane),
+            "waiting": {lane: sum(len(q) for q in self._queues[lane].values()) for lane in LANES},
+            "granted": dict(self.granted),
+            "max_wait_seconds": {lane: round(wait, 3) for lane, wait in self.max_wait.items()},
+        }
+
+
+governor = LLMGovernor(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    per_user=settings.LLM_MAX_PER_USER,
+    reserved_interactive=settings.LLM_RESERVED_INTERACTIVE,
+    per_user_bulk=settings.LLM_MAX_PER_USER_BULK,
+)
+
+
+def _prompt_tokens(messages: List[Dict[str, str]]) -> int:
+    return sum(estimate_tokens(message.get("content") or "") for message in messages)
+
+
+def _client_for(last: bool):
+    # While another model is left to fall back to, a rate limit or timeout should
+    # move on to it at once rather than sit through the SDK's retry backoff
+    return get_client() if last else get_client().with_options(max_retries=0)
+
+
+async def complete_with_model(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 1024,
+    user_id: Optional[Hashable] = None,
+    lane: str = INTERACTIVE,
+    cache: bool = False,
+    bypass_cache: bool = False,
+    task: str = CHAT,
+) -> Tuple[str, str]:
+    """One chat completion through the shared client, inside a governor slot, and the model that wrote it.
+
+    Without an explicit `model` the model router picks one for `task` and
+    falls back to the other model if it fails. With `cache`, identical
+    requests (same model or task, parameters and normalized prompt) are
+    answered from the persistent response cache; `bypass_cache` skips the
+    lookup but still stores the fresh answer.
+    """
+    key = llm_cache.cache_key(messages, model or f"auto:{task}", temperature, max_tokens) if cache else None
+    if key is not None:
+        if bypass_cache:
+            llm_cache.record_bypass()
+        else:
+            cached = await asyncio.to_thread(llm_cache.lookup, key)
+            if cached is not None:
+                return cached
+
+    async def create(chosen: str, last: bool = True):
+        return await _client_for(last).chat.completions.create(
+            messages=messages,
+            model=chosen,
+            temperature=temperature,
+            max_tokens=max_tokens,
+        )
+
+    async with governor.slot(user_id, lane):
+        if model:
+            response = await create(model)
+        else:
+            response, model = await model_router.run(task, _prompt_tokens(messages), create)
+    content = response.choices[0].message.content
+    if key is not None and content:
+        usage = response.usage
+        await asyncio.to_thread(llm_cache.store, key, model, content,
+                                getattr(usage, "prompt_tokens", 0) or 0,
+                                getattr(usage, "completion_tokens", 0) or 0)
+    return content, model
+
+
+async def complete(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 1024,
+    user_id: Optional[Hashable] = None,
+    lane: str = INTERACTIVE,
+    cache: bool = False,
+    bypass_cache: bool = False,
+    task: str = CHAT,
+) -> str:
+    """Completion text of complete_with_model"""
+    content, _ = await complete_with_model(messages, model, temperature, max_tokens, user_id, lane,
+                                           cache, bypass_cache, task)
+    return content
+
+
+async def stream(
+    messages: List[Dict[str, str]],
+    model: Optional[str] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 1024,
+    user_id: Optional[Hashable] = None,
+    lane: str = INTERACTIVE,
+    task: str = CHAT,
+) -> AsyncIterator[str]:
+    """Yield completion text as the model produces it.
+
+    Routing works as in complete(), with time to first token as the latency
+    sample; once a token has been sent there is no falling back. The
+    governor slot is held until the stream ends. If the consumer stops
+    early (e.g. the HTTP client disconnected) the upstream response is
+    closed, which ends generation instead of paying for unread tokens.
+    """
+    async def open_stream(chosen: str, last: bool = True):
+        response = await _client_for(last).chat.completions.create(
+            messages=messages,
+            model=chosen,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+        )
+        try:
+            return response, await response.__anext__()
+        except StopAsyncIteration:
+            return response, None
+        except BaseException:
+            await response.close()
+            raise
+
+    async with governor.slot(user_id, lane):
+        if model:
+            response, first = await open_stream(model)
+        else:
+            (response, first), model = await model_router.run(task, _prompt_tokens(messages), open_stream)
+        try:
+            if first is not None:
+                async for chunk in _prepend(first, response):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        finally:
+            await response.close()
+
+
+async def _prepend(first, rest) -> AsyncIterator[Any]:
+    yield first
+    async for item in rest:
+        yield item
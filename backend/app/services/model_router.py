@@ -0,0 +1,127 @@
+import asyncio
+import time
+from collections import Counter, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.source_health import OPEN, CircuitOpen, get_health, percentile
+
+# Task types callers route by; the first three are short and latency-sensitive
+CHAT = "chat"
+SUMMARY = "summary"
+DIGEST = "digest"
+SYNTHESIS = "synthesis"  # literature reviews, insights, comparisons, digest merges
+FAST_TASKS = (CHAT, SUMMARY, DIGEST)
+
+_RETRYABLE = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+_decisions: Deque[Dict[str, Any]] = deque(maxlen=settings.LLM_ROUTER_LOG_SIZE)
+_served: Counter = Counter()
+# Successful-call latencies per (model, task): a chat turn and a 3000-token review
+# take very different times on the same model, so each task is judged on its own
+_latencies: Dict[Tuple[str, str], Deque[float]] = {}
+
+
+def _health_key(model: str) -> str:
+    return f"llm:{model}"
+
+
+def _record_latency(model: str, task: str, latency: float) -> None:
+    samples = _latencies.get((model, task))
+    if samples is None:
+        samples = _latencies[model, task] = deque(maxlen=settings.BREAKER_WINDOW)
+    samples.append(latency)
+
+
+def _p90(model: str, task: str) -> Optional[float]:
+    samples = _latencies.get((model, task))
+    if not samples or len(samples) < settings.LATENCY_MIN_SAMPLES:
+        return None
+    return percentile(sorted(samples), 90)
+
+
+def _over_budget(model: str, task: str) -> bool:
+    """Breaker open, or p90 latency of `task` on `model` over that task's budget once enough calls have been seen"""
+    if get_health(_health_key(model)).state == OPEN:
+        return True
+    budget = settings.LLM_LATENCY_BUDGETS.get(task)
+    p90 = _p90(model, task)
+    return budget is not None and p90 is not None and p90 > budget
+
+
+def candidates(task: str, prompt_tokens: int) -> Tuple[List[str], str]:
+    """Models to try for a request, best first, and why"""
+    fast, large = settings.LLM_FAST_MODEL, settings.LLM_LARGE_MODEL
+    if task in FAST_TASKS and prompt_tokens <= settings.LLM_FAST_MAX_PROMPT_TOKENS:
+        order, reason = [fast, large], "short task"
+    else:
+        order, reason = [large, fast], "long prompt" if task in FAST_TASKS else "synthesis"
+    if _over_budget(order[0], task) and not _over_budget(order[1], task):
+        order.reverse()
+        reason += f"; {order[1]} over latency/error budget"
+    return order, reason
+
+
+def _retryable(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError) or type(error).__name__ in _RETRYABLE:
+        return True
+    return (getattr(error, "status_code", None) or 0) >= 500
+
+
+async def run(task: str, prompt_tokens: int, call: Callable[[str, bool], Awaitable[Any]]) -> Tuple[Any, str]:
+    """Call `call(model, last)` on the routed model, falling back to the next one when it is
+    unavailable, rate limited, timing out or erroring. `last` is true when no fallback is
+    left, so the caller can retry in place rather than fail fast. Returns (result, model used).
+    """
+    order, reason = candidates(task, prompt_tokens)
+    decision = {
+        "at": time.time(),
+        "task": task,
+        "prompt_tokens": prompt_tokens,
+        "candidates": order,
+        "reason": reason,
+        "attempts": [],
+    }
+    _decisions.append(decision)
+    last_error: Optional[Exception] = None
+    for position, model in enumerate(order):
+        health = get_health(_health_key(model))
+        if not health.allow():
+            decision["attempts"].append({"model": model, "outcome": "circuit_open"})
+            continue
+        started = time.monotonic()
+        try:
+            result = await call(model, position == len(order) - 1)
+        except asyncio.CancelledError:
+            health.release()
+            raise
+        except Exception as e:
+            elapsed = time.monotonic() - started
+            if not _retryable(e):
+                health.release()
+                decision["attempts"].append({"model": model, "outcome": "error", "error": str(e)[:200]})
+                raise
+            health.record_failure(elapsed, str(e)[:200])
+            decision["attempts"].append({"model": model, "outcome": type(e).__name__,
+                                         "latency_ms": round(elapsed * 1000)})
+            last_error = e
+            continue
+        elapsed = time.monotonic() - started
+        health.record_success(elapsed)
+        _record_latency(model, task, elapsed)
+        decision["attempts"].append({"model": model, "outcome": "ok", "latency_ms": round(elapsed * 1000)})
+        decision["model"] = model
+        _served[(task, model)] += 1
+        return result, model
+    raise last_error or CircuitOpen(f"No model available for {task}")
+
+
+def stats() -> Dict[str, Any]:
+    models = (settings.LLM_FAST_MODEL, settings.LLM_LARGE_MODEL)
+    return {
+        "models": {model: get_health(_health_key(model)).snapshot() for model in models},
+        "served": {f"{task}/{model}": count for (task, model), count in _served.items()},
+        "p90_ms": {f"{task}/{model}": round(_p90(model, task) * 1000) for (model, task) in _latencies
+                   if _p90(model, task) is not None},
+        "recent_decisions": list(_decisions)[-50:],
+    }
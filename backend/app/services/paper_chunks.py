@@ -0,0 +1,161 @@
+import bisect
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import Paper, PaperChunk, Workspace
+
+# Canonical section names, with the headings that map onto them
+SECTION_HEADINGS: Dict[str, Tuple[str, ...]] = {
+    "abstract": ("abstract", "summary"),
+    "introduction": ("introduction", "background", "related work", "motivation"),
+    "methods": ("methods", "method", "methodology", "materials and methods", "approach", "experimental setup",
+                "proposed method", "data and methods"),
+    "results": ("results", "experiments", "evaluation", "experimental results", "results and discussion",
+                "findings"),
+    "discussion": ("discussion", "limitations"),
+    "conclusion": ("conclusion", "conclusions", "concluding remarks", "future work", "conclusion and future work"),
+    "references": ("references", "bibliography", "works cited", "literature cited"),
+}
+BODY = "body"  # text before the first recognised heading, or under headings we do not map
+
+_HEADING_NAMES = {name: section for section, names in SECTION_HEADINGS.items() for name in names}
+_NUMBERING = r"(?:(?:\d+(?:\.\d+)*|[IVX]+|[A-H])[.)]?\s+)?"
+_HEADING = re.compile(
+    rf"^\s*{_NUMBERING}({'|'.join(sorted(map(re.escape, _HEADING_NAMES), key=len, reverse=True))})\s*[:.]?\s*$",
+    re.IGNORECASE,
+)
+# "Abstract—We propose ..." / "Abstract: We propose ..." on one line
+_INLINE_ABSTRACT = re.compile(r"^\s*abstract\s*[:.—–-]\s*\S", re.IGNORECASE)
+_BREAK = re.compile(r"\n\s*\n|(?<=[.!?])\s+")
+
+
+def heading_section(line: str) -> Optional[str]:
+    """Canonical section a heading line opens, or None if it is not a known heading"""
+    if len(line) > 60:
+        return None
+    match = _HEADING.match(line)
+    if match:
+        return _HEADING_NAMES[" ".join(match.group(1).lower().split())]
+    return None
+
+
+def join_pages(pages: Iterable[dict]) -> Tuple[str, List[Tuple[int, int]]]:
+    """Full text as stored on Paper.full_text, plus (offset, page number) where each page starts"""
+    parts: List[str] = []
+    starts: List[Tuple[int, int]] = []
+    offset = 0
+    for page in pages:
+        if not page["text"]:
+            continue
+        if parts:
+            offset += 1  # the "\n" joining pages
+        starts.append((offset, page["page"]))
+        parts.append(page["text"])
+        offset += len(page["text"])
+    return "\n".join(parts), starts
+
+
+def _sections(text: str) -> List[Tuple[str, int, int]]:
+    """(section, start, end) spans covering the whole text"""
+    spans: List[Tuple[str, int, int]] = []
+    current, start = BODY, 0
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        section = heading_section(line.strip())
+        if section is None and current == BODY and _INLINE_ABSTRACT.match(line):
+            section = "abstract"
+        if section is not None and section != current:
+            if offset > start:
+                spans.append((current, start, offset))
+            current, start = section, offset
+        offset += len(line)
+    if offset > start:
+        spans.append((current, start, offset))
+    return spans
+
+
+def _split(text: str, start: int, end: int, size: int) -> List[Tuple[int, int]]:
+    """Break [start, end) into pieces of about `size` characters at paragraph or sentence boundaries"""
+    pieces = []
+    while end - start > size:
+        cut = None
+        for match in _BREAK.finditer(text, start + size // 2, start + size):
+            cut = match.end()
+        cut = cut or start + size
+        pieces.append((start, cut))
+        start = cut
+    if end > start:
+        pieces.append((start, end))
+    return pieces
+
+
+def chunk_text(text: str, page_starts: List[Tuple[int, int]]) -> List[dict]:
+    """Split extracted text into section-aware chunks with character offsets and page numbers"""
+    offsets = [offset for offset, _ in page_starts]
+
+    def page_at(position: int) -> Optional[int]:
+        index = bisect.bisect_right(offsets, position) - 1
+        return page_starts[index][1] if index >= 0 else None
+
+    chunks = []
+    for section, start, end in _sections(text):
+        for chunk_start, chunk_end in _split(text, start, end, settings.CHUNK_SIZE_CHARS):
+            body = text[chunk_start:chunk_end]
+            if not body.strip():
+                continue
+            chunks.append({
+                "ordinal": len(chunks),
+                "section": section,
+                "char_start": chunk_start,
+                "char_end": chunk_end,
+                "page_start": page_at(chunk_start),
+                "page_end": page_at(max(chunk_end - 1, chunk_start)),
+                "text": body,
+            })
+    return chunks
+
+
+def replace_chunks(db, paper_id: str, chunks: List[dict]) -> None:
+    """Swap a paper's chunks for `chunks` inside the caller's transaction"""
+    db.query(PaperChunk).filter(PaperChunk.paper_id == paper_id).delete()
+    db.add_all([PaperChunk(paper_id=paper_id, **chunk) for chunk in chunks])
+
+
+def load_chunks(paper_ids: List[str], sections: Optional[List[str]] = None) -> List[PaperChunk]:
+    """Chunks for the given papers in document order, optionally only some sections"""
+    db = SessionLocal()
+    try:
+        query = db.query(PaperChunk).filter(PaperChunk.paper_id.in_(paper_ids))
+        if sections:
+            query = query.filter(PaperChunk.section.in_(sections))
+        return query.order_by(PaperChunk.paper_id, PaperChunk.ordinal).all()
+    finally:
+        db.close()
+
+
+def owned_papers(db, user_id: int, paper_ids: List[str]) -> List[Paper]:
+    """Papers among `paper_ids` that sit in one of `user_id`'s workspaces"""
+    return db.query(Paper).join(Workspace, Paper.workspace_id == Workspace.id).filter(
+        Paper.id.in_(paper_ids), Workspace.user_id == user_id
+    ).all()
+
+
+def build_passages(papers: List) -> List[dict]:
+    """Candidate passages for retrieval: each paper's stored chunks, plus its abstract"""
+    titles = {paper.id: paper.title for paper in papers}
+    passages = []
+    for paper in papers:
+        if paper.abstract:
+            passages.append({"paper_id": paper.id, "title": paper.title, "section": "abstract", "text": paper.abstract})
+    for chunk in load_chunks(list(titles)):
+        passages.append({
+            "paper_id": chunk.paper_id,
+            "title": titles[chunk.paper_id],
+            "section": chunk.section,
+            "page_start": chunk.page_start,
+            "page_end": chunk.page_end,
+            "text": chunk.text,
+        })
+    return passages
@@ -0,0 +1,184 @@
+import asyncio
+import re
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.paper_merge import normalize_arxiv_id, normalize_doi
+from app.services.paper_sources import (
+    ARXIV_URL,
+    OPENALEX_URL,
+    SEMANTIC_SCHOLAR_FIELDS,
+    SEMANTIC_SCHOLAR_URL,
+    fetch_json,
+    fetch_text,
+    parse_arxiv_feed,
+    parse_openalex_work,
+    semantic_scholar_headers,
+)
+from app.services.search_cache import SearchCache
+
+S2_BATCH_SIZE = 500  # Semantic Scholar's /paper/batch limit
+OPENALEX_FILTER_SIZE = 50  # OR-ed values per OpenAlex filter
+ARXIV_ID_LIST_SIZE = 100
+
+_OPENALEX_ID = re.compile(r"^(https?://openalex\.org/)?(W\d+)$", re.IGNORECASE)
+_ARXIV_PREFIX = re.compile(r"^arxiv:", re.IGNORECASE)
+
+# (kind, value) where kind is one of "s2", "doi", "arxiv", "openalex"
+PaperRef = Tuple[str, str]
+
+detail_cache = SearchCache(max_entries=settings.DETAIL_CACHE_MAX_ENTRIES, stale_seconds=0)
+
+
+def classify_paper_id(raw: str) -> PaperRef:
+    """Work out which kind of identifier `raw` is"""
+    value = raw.strip()
+    if value.upper().startswith("DOI:"):
+        value = value[4:]
+    doi = normalize_doi(value)
+    if doi.startswith("10.48550/arxiv."):
+        return ("arxiv", normalize_arxiv_id(doi))
+    if doi:
+        return ("doi", doi)
+    openalex = _OPENALEX_ID.match(value)
+    if openalex:
+        return ("openalex", openalex.group(2).upper())
+    arxiv_id = normalize_arxiv_id(_ARXIV_PREFIX.sub("", value))
+    if arxiv_id and ("." in value or "/" in value):
+        return ("arxiv", arxiv_id)
+    return ("s2", value)
+
+
+def semantic_scholar_detail(data: dict) -> dict:
+    """Shape a Semantic Scholar paper object like GET /papers/{paper_id}"""
+    external_ids = data.get("externalIds") or {}
+    return {
+        "id": data.get("paperId", ""),
+        "title": data.get("title", ""),
+        "authors": ", ".join([a.get("name", "") for a in data.get("authors") or []]),
+        "abstract": data.get("abstract", ""),
+        "url": data.get("url", ""),
+        "publication_date": data.get("publicationDate", ""),
+        "venue": data.get("venue", ""),
+        "citation_count": data.get("citationCount", 0),
+        "source": "Semantic Scholar",
+        "doi": normalize_doi(external_ids.get("DOI")),
+        "arxiv_id": normalize_arxiv_id(external_ids.get("ArXiv")),
+    }
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _s2_lookup_id(ref: PaperRef) -> str:
+    kind, value = ref
+    if kind == "doi":
+        return f"DOI:{value}"
+    if kind == "arxiv":
+        return f"ARXIV:{value}"
+    return value
+
+
+async def get_semantic_scholar_detail(paper_id: str) -> dict:
+    """Single Semantic Scholar lookup through the detail cache"""
+    params = {"fields": SEMANTIC_SCHOLAR_FIELDS}
+
+    async def fetch():
+        data = await fetch_json("semantic_scholar", f"{SEMANTIC_SCHOLAR_URL}/{paper_id}", params,
+                                headers=semantic_scholar_headers())
+        return semantic_scholar_detail(data)
+
+    return await detail_cache.get_or_fetch(("s2", paper_id), fetch, settings.DETAIL_CACHE_TTL)
+
+
+async def _semantic_scholar_batch(refs: List[PaperRef]) -> Dict[PaperRef, dict]:
+    found: Dict[PaperRef, dict] = {}
+    for chunk in _chunks(refs, S2_BATCH_SIZE):
+        data = await fetch_json(
+            "semantic_scholar",
+            f"{SEMANTIC_SCHOLAR_URL}/batch",
+            {"fields": SEMANTIC_SCHOLAR_FIELDS},
+            headers=semantic_scholar_headers(),
+            body={"ids": [_s2_lookup_id(ref) for ref in chunk]},
+        )
+        # The batch response is aligned with the request, with null for unknown ids
+        for ref, item in zip(chunk, data or []):
+            if item:
+                found[ref] = semantic_scholar_detail(item)
+    return found
+
+
+async def _arxiv_batch(refs: List[PaperRef]) -> Dict[PaperRef, dict]:
+    found: Dict[PaperRef, dict] = {}
+    for chunk in _chunks(refs, ARXIV_ID_LIST_SIZE):
+        params = {"id_list": ",".join(value for _, value in chunk), "max_results": len(chunk)}
+        feed = await fetch_text("arxiv", ARXIV_URL, params)
+        by_id = {paper["arxiv_id"]: paper for paper in parse_arxiv_feed(feed)}
+        for ref in chunk:
+            if ref[1] in by_id:
+                found[ref] = by_id[ref[1]]
+    return found
+
+
+async def _openalex_batch(refs: List[PaperRef]) -> Dict[PaperRef, dict]:
+    found: Dict[PaperRef, dict] = {}
+    for kind, field in (("openalex", "openalex"), ("doi", "doi")):
+        values = [value for ref_kind, value in refs if ref_kind == kind]
+        for chunk in _chunks(values, OPENALEX_FILTER_SIZE):
+            params = {"filter": f"{field}:{'|'.join(chunk)}", "per_page": len(chunk)}
+            if settings.OPENALEX_MAILTO:
+                params["mailto"] = settings.OPENALEX_MAILTO
+            data = await fetch_json("openalex", OPENALEX_URL, params)
+            for work in data.get("results", []):
+                paper = parse_openalex_work(work)
+                key = (kind, paper["id"].upper() if kind == "openalex" else paper["doi"])
+                found[key] = paper
+    return found
+
+
+async def _safe(name: str, lookup, refs: List[PaperRef]) -> Dict[PaperRef, dict]:
+    if not refs:
+        return {}
+    try:
+        return await lookup(refs)
+    except Exception as e:
+        print(f"{name} batch lookup failed: {e}")
+        return {}
+
+
+async def get_paper_details(ids: List[str]) -> Dict[str, Optional[dict]]:
+    """Resolve many paper ids at once: detail cache first, then one batch call per upstream.
+
+    Semantic Scholar ids, DOIs and arXiv ids go to S2's /paper/batch and
+    OpenAlex work ids to an OpenAlex `filter`. Whatever S2 does not know is
+    retried against arXiv `id_list` (arXiv ids) or OpenAlex (DOIs).
+    """
+    refs = {raw: classify_paper_id(raw) for raw in ids}
+    found: Dict[PaperRef, dict] = {}
+    for ref in set(refs.values()):
+        cached = detail_cache.lookup(ref)
+        if cached is not None:
+            found[ref] = cached
+
+    misses = [ref for ref in dict.fromkeys(refs.values()) if ref not in found]
+    s2_refs = [ref for ref in misses if ref[0] != "openalex"]
+    openalex_refs = [ref for ref in misses if ref[0] == "openalex"]
+    for results in await asyncio.gather(
+        _safe("Semantic Scholar", _semantic_scholar_batch, s2_refs),
+        _safe("OpenAlex", _openalex_batch, openalex_refs),
+    ):
+        found.update(results)
+
+    fallback = [ref for ref in s2_refs if ref not in found]
+    for results in await asyncio.gather(
+        _safe("arXiv", _arxiv_batch, [ref for ref in fallback if ref[0] == "arxiv"]),
+        _safe("OpenAlex", _openalex_batch, [ref for ref in fallback if ref[0] == "doi"]),
+    ):
+        found.update(results)
+
+    for ref in misses:
+        if ref in found:
+            detail_cache.set(ref, found[ref], settings.DETAIL_CACHE_TTL)
+    return {raw: found.get(ref) for raw, ref in refs.items()}
@@ -0,0 +1,120 @@
+import asyncio
+import json
+import re
+import time
+from typing import List, Optional, Set, Tuple
+
+from sqlalchemy import text
+
+from app.database import engine
+from app.services.paper_merge import paper_keys
+
+# FTS5 shadow of indexed_papers: rowid == indexed_papers.id
+FTS_TABLE = "paper_index_fts"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_tasks: Set[asyncio.Task] = set()
+
+
+def create_index() -> None:
+    """Create the FTS5 table next to indexed_papers (idempotent)"""
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(title, authors, abstract, tokenize='porter unicode61')"
+        ))
+
+
+def index_key(paper: dict) -> str:
+    """Stable identity for a paper: DOI, then arXiv id, then source-specific id"""
+    keys = paper_keys(paper)
+    if keys["doi"]:
+        return f"doi:{keys['doi']}"
+    if keys["arxiv_id"]:
+        return f"arxiv:{keys['arxiv_id']}"
+    return f"{paper.get('source', '')}:{paper.get('id', '')}"
+
+
+# One statement, so concurrent background upserts of the same paper cannot race
+# into a UNIQUE violation. A row merged from more sources is not overwritten by
+# a payload from fewer (RETURNING then yields nothing and the FTS row is kept).
+_UPSERT = text(
+    "INSERT INTO indexed_papers (paper_key, sources, payload, fetched_at) "
+    "VALUES (:key, :sources, :payload, :now) "
+    "ON CONFLICT(paper_key) DO UPDATE SET "
+    "sources = excluded.sources, payload = excluded.payload, fetched_at = excluded.fetched_at "
+    "WHERE length(excluded.sources) - length(replace(excluded.sources, ',', '')) >= "
+    "length(indexed_papers.sources) - length(replace(indexed_papers.sources, ',', '')) "
+    "RETURNING id"
+)
+
+
+def upsert_papers(papers: List[dict]) -> int:
+    """Insert or refresh normalized papers in the local index; returns rows written"""
+    now = time.time()
+    written = 0
+    with engine.begin() as conn:
+        for paper in papers:
+            if not paper.get("title"):
+                continue
+            sources = ",".join(paper.get("sources") or [paper.get("source", "")])
+            payload = json.dumps({k: v for k, v in paper.items() if k != "rrf_score"})
+            row_id = conn.execute(
+                _UPSERT, {"key": index_key(paper), "sources": sources, "payload": payload, "now": now}
+            ).scalar()
+            if row_id is None:
+                continue  # kept the existing row with more sources
+            conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": row_id})
+            conn.execute(
+                text(f"INSERT INTO {FTS_TABLE} (rowid, title, authors, abstract) "
+                     "VALUES (:id, :title, :authors, :abstract)"),
+                {
+                    "id": row_id,
+                    "title": paper.get("title") or "",
+                    "authors": paper.get("authors") or "",
+                    "abstract": paper.get("abstract") or "",
+                },
+            )
+            written += 1
+    return written
+
+
+def _match_expression(query: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    return " ".join(f'"{token}"' for token in _TOKEN.findall(query.lower()))
+
+
+def search_local(query: str, limit: int, source_label: Optional[str] = None) -> List[Tuple[dict, float]]:
+    """Best-matching indexed papers (BM25, title weighted highest) with their fetch time"""
+    expression = _match_expression(query)
+    if not expression:
+        return []
+    sql = (
+        f"SELECT d.payload, d.fetched_at FROM {FTS_TABLE} f "
+        "JOIN indexed_papers d ON d.id = f.rowid "
+        f"WHERE {FTS_TABLE} MATCH :expression "
+    )
+    params = {"expression": expression, "limit": limit}
+    if source_label:
+        sql += "AND d.sources LIKE :source "
+        params["source"] = f"%{source_label}%"
+    sql += f"ORDER BY bm25({FTS_TABLE}, 10.0, 2.0, 1.0) LIMIT :limit"
+    with engine.connect() as conn:
+        rows = conn.execute(text(sql), params).fetchall()
+    return [(json.loads(payload), fetched_at) for payload, fetched_at in rows]
+
+
+def index_in_background(papers: List[dict]) -> None:
+    """Upsert papers off the event loop without making the caller wait"""
+    if not papers:
+        return
+
+    async def run():
+        try:
+            await asyncio.to_thread(upsert_papers, papers)
+        except Exception as e:
+            print(f"Local paper index update failed: {e}")
+
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
@@ -0,0 +1,204 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set
+
+RRF_K = 60
+
+# One-permutation MinHash over title shingles, split into LSH bands so only
+# papers sharing a band bucket are ever compared. 16 bins in 8 bands of 2
+# catches pairs with title similarity around 0.8 and up while hashing each
+# shingle once, which keeps merging linear in the number of results.
+NUM_HASHES = 16
+BAND_ROWS = 2
+SHINGLE_SIZE = 4
+TITLE_SIMILARITY = 0.8
+
+_EMPTY_BIN = -1
+
+_DOI_PREFIX = re.compile(r"^(https?://(dx\.)?doi\.org/|doi:)", re.IGNORECASE)
+_ARXIV_ID = re.compile(r"(\d{4}\.\d{4,5}|[a-z\-]+(\.[A-Z]{2})?/\d{7})(v\d+)?$", re.IGNORECASE)
+_ARXIV_DOI = re.compile(r"^10\.48550/arxiv\.(.+)$")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+PLACEHOLDER_ABSTRACTS = {"", "No abstract available"}
+PLACEHOLDER_VENUES = {"", "Unknown"}
+
+
+def normalize_doi(value: Optional[str]) -> str:
+    """Lowercase a DOI and strip any resolver prefix"""
+    if not value:
+        return ""
+    doi = _DOI_PREFIX.sub("", value.strip()).lower()
+    return doi if doi.startswith("10.") else ""
+
+
+def normalize_arxiv_id(value: Optional[str]) -> str:
+    """Reduce an arXiv id, abs URL or arXiv DOI to its bare, unversioned id"""
+    if not value:
+        return ""
+    value = value.strip()
+    arxiv_doi = _ARXIV_DOI.match(normalize_doi(value))
+    if arxiv_doi:
+        value = arxiv_doi.group(1)
+    match = _ARXIV_ID.search(value)
+    return match.group(1).lower() if match else ""
+
+
+def _title_shingles(title: str) -> Set[str]:
+    text = _NON_WORD.sub(" ", (title or "").lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def _minhash(shingles: Set[str]) -> List[int]:
+    # Bin every shingle hash by its low bits and keep the smallest per bin;
+    # iterating largest-first lets the dict keep the minimum without compares
+    hashes = sorted((hash(s) & 0xFFFFFFFFFFFFFFFF for s in shingles), reverse=True)
+    bins = {h % NUM_HASHES: h for h in hashes}
+    return [bins.get(slot, _EMPTY_BIN) for slot in range(NUM_HASHES)]
+
+
+def _first_author_surname(authors) -> str:
+    if isinstance(authors, list):
+        first = authors[0] if authors else ""
+    else:
+        first = (authors or "").split(",")[0]
+    if first.strip() == "Unknown":
+        return ""
+    parts = _NON_WORD.sub(" ", first.lower()).split()
+    return parts[-1] if parts else ""
+
+
+def _jaccard(a: Set[str], b: Set[str]) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def paper_keys(paper: dict) -> Dict[str, str]:
+    """Exact identity keys (DOI and arXiv id) for a normalized paper dict"""
+    doi = normalize_doi(paper.get("doi")) or normalize_doi(paper.get("url"))
+    arxiv_id = normalize_arxiv_id(paper.get("arxiv_id"))
+    if not arxiv_id and paper.get("source") == "arXiv":
+        arxiv_id = normalize_arxiv_id(paper.get("id"))
+    if not arxiv_id:
+        # Only arXiv's own DOIs carry an arXiv id; other DOIs can end in digits that look like one
+        arxiv_doi = _ARXIV_DOI.match(doi)
+        if arxiv_doi:
+            arxiv_id = normalize_arxiv_id(arxiv_doi.group(1))
+    return {"doi": doi, "arxiv_id": arxiv_id}
+
+
+def _merge_group(records: List[dict]) -> dict:
+    """Fold duplicate records into one, starting from the best ranked"""
+    merged = dict(records[0])
+    merged["sources"] = []
+    for record in records:
+        if record.get("source") and record["source"] not in merged["sources"]:
+            merged["sources"].append(record["source"])
+        if (record.get("citation_count") or 0) > (merged.get("citation_count") or 0):
+            merged["citation_count"] = record["citation_count"]
+        abstract = record.get("abstract") or ""
+        current = merged.get("abstract") or ""
+        if abstract not in PLACEHOLDER_ABSTRACTS and (current in PLACEHOLDER_ABSTRACTS or len(abstract) > len(current)):
+            merged["abstract"] = abstract
+        if merged.get("venue") in PLACEHOLDER_VENUES | {"arXiv"} and record.get("venue") not in PLACEHOLDER_VENUES:
+            merged["venue"] = record["venue"]
+        for field in ("doi", "arxiv_id", "publication_date", "url"):
+            if not merged.get(field) and record.get(field):
+                merged[field] = record[field]
+    return merged
+
+
+def merge_results(source_lists: Iterable[List[dict]], k: int = RRF_K) -> List[dict]:
+    """Deduplicate papers across sources and rank them with reciprocal-rank fusion.
+
+    Each input list is one source's results in that source's own relevance
+    order. Duplicates are found by DOI, arXiv id, or near-identical title with
+    the same first author, merged into one record, and scored with
+    sum(1 / (k + rank)) over every source that returned them.
+    """
+    records: List[dict] = []
+    ranks: List[int] = []
+    origins: List[int] = []
+    for origin, papers in enumerate(source_lists):
+        for rank, paper in enumerate(papers, 1):
+            records.append(paper)
+            ranks.append(rank)
+            origins.append(origin)
+
+    uf = _UnionFind(len(records))
+    exact: Dict[str, int] = {}
+    buckets: Dict[tuple, List[int]] = {}
+    shingles: List[Set[str]] = []
+    surnames: List[str] = []
+
+    for i, paper in enumerate(records):
+        for name, value in paper_keys(paper).items():
+            if value:
+                key = f"{name}:{value}"
+                if key in exact:
+                    uf.union(exact[key], i)
+                else:
+                    exact[key] = i
+
+        title_shingles = _title_shingles(paper.get("title", ""))
+        shingles.append(title_shingles)
+        surnames.append(_first_author_surname(paper.get("authors")))
+        if not title_shingles:
+            continue
+        signature = _minhash(title_shingles)
+        for band in range(0, NUM_HASHES, BAND_ROWS):
+            rows = signature[band:band + BAND_ROWS]
+            if _EMPTY_BIN not in rows:
+                buckets.setdefault((band, *rows), []).append(i)
+
+    compared: Set[tuple] = set()
+    for members in buckets.values():
+        if len(members) < 2:
+            continue
+        for pos, i in enumerate(members):
+            for j in members[pos + 1:]:
+                if (i, j) in compared:
+                    continue
+                compared.add((i, j))
+                if uf.find(i) == uf.find(j):
+                    continue
+                if surnames[i] and surnames[j] and surnames[i] != surnames[j]:
+                    continue
+                if _jaccard(shingles[i], shingles[j]) >= TITLE_SIMILARITY:
+                    uf.union(i, j)
+
+    groups: Dict[int, List[int]] = {}
+    for i in range(len(records)):
+        groups.setdefault(uf.find(i), []).append(i)
+
+    merged: List[dict] = []
+    for members in groups.values():
+        members.sort(key=lambda i: (ranks[i], i))
+        paper = _merge_group([records[i] for i in members])
+        # A source that lists the same paper twice only counts its best rank
+        best_ranks: Dict[int, int] = {}
+        for i in members:
+            best_ranks.setdefault(origins[i], ranks[i])
+        paper["rrf_score"] = round(sum(1.0 / (k + rank) for rank in best_ranks.values()), 6)
+        merged.append(paper)
+
+    merged.sort(key=lambda p: (-p["rrf_score"], -(p.get("citation_count") or 0)))
+    return merged
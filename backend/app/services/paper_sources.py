@@ -0,0 +1,329 @@
+import asyncio
+import time
+import xml.etree.ElementTree as ET
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+from app.core.config import settings
+from app.services.http_client import get_session
+from app.services.paper_merge import normalize_arxiv_id, normalize_doi
+from app.services.search_cache import search_cache, source_ttl
+from app.services.source_health import CircuitOpen, SourceHealth, get_health
+from app.services.upstream import RateLimited, TokenBucket, rate_limiters, single_flight
+
+ARXIV_URL = "https://export.arxiv.org/api/query"
+OPENALEX_URL = "https://api.openalex.org/works"
+SEMANTIC_SCHOLAR_URL = "https://api.semanticscholar.org/graph/v1/paper"
+
+ATOM_NS = {
+    "atom": "http://www.w3.org/2005/Atom",
+    "arxiv": "http://arxiv.org/schemas/atom",
+}
+
+SEMANTIC_SCHOLAR_FIELDS = "paperId,title,authors,abstract,year,venue,citationCount,url,publicationDate,externalIds"
+
+
+def _flight_key(method: str, url: str, params: Dict[str, Any], body: Any = None) -> tuple:
+    return (method, url, tuple(sorted((k, str(v)) for k, v in params.items())), repr(body))
+
+
+def _is_upstream_failure(error: BaseException) -> bool:
+    """Client errors such as 404 mean the source is healthy and just said no"""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500 or error.status == 429
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ValueError))
+
+
+async def _send(method: str, url: str, params: Dict[str, Any], headers: Optional[Dict[str, str]],
+                body: Any, as_json: bool, timeout: float) -> Any:
+    session = get_session()
+    async with session.request(method, url, params=params, headers=headers, json=body,
+                               timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        response.raise_for_status()
+        if as_json:
+            return await response.json(content_type=None)
+        return await response.text()
+
+
+async def _hedged(health: SourceHealth, limiter: Optional[TokenBucket],
+                  send: Callable[[], Awaitable[Any]]) -> Any:
+    """Run `send`; if it outlives the source's p95 latency, race a duplicate and take the first answer"""
+    primary = asyncio.ensure_future(send())
+    delay = health.hedge_delay() if settings.HEDGING_ENABLED else None
+    if delay is None:
+        return await primary
+
+    tasks = {primary}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        # Hedges never queue for a rate-limit token; no spare token means no hedge
+        if not done and health.claim_hedge() and (limiter is None or limiter.try_acquire()):
+            tasks.add(asyncio.ensure_future(send()))
+        error: Optional[BaseException] = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        health.hedges_won += 1
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _request(source: str, method: str, url: str, params: Dict[str, Any],
+                   headers: Optional[Dict[str, str]], body: Any, as_json: bool) -> Any:
+    health = get_health(source)
+    if not health.allow():
+        raise CircuitOpen(f"{source} circuit breaker is open")
+    limiter = rate_limiters.get(source)
+    started = time.monotonic()
+    try:
+        if limiter is not None:
+            await limiter.acquire()
+            started = time.monotonic()
+        timeout = health.adaptive_timeout(settings.UPSTREAM_TIMEOUT)
+        send = lambda: _send(method, url, params, headers, body, as_json, timeout)
+        # Only idempotent reads are hedged
+        result = await (_hedged(health, limiter, send) if method == "GET" else send())
+    except BaseException as e:
+        if _is_upstream_failure(e):
+            health.record_failure(time.monotonic() - started, f"{type(e).__name__}: {e}")
+        elif isinstance(e, aiohttp.ClientResponseError):
+            health.record_success(time.monotonic() - started)
+        else:
+            health.release()
+        raise
+    health.record_success(time.monotonic() - started)
+    return result
+
+
+async def fetch_json(source: str, url: str, params: Dict[str, Any],
+                     headers: Optional[Dict[str, str]] = None, body: Any = None) -> Any:
+    """Fetch a JSON document from `source`, rate limited and coalesced with identical in-flight calls"""
+    method = "POST" if body is not None else "GET"
+    return await single_flight.do(
+        _flight_key(method, url, params, body),
+        lambda: _request(source, method, url, params, headers, body, True),
+    )
+
+
+async def fetch_text(source: str, url: str, params: Dict[str, Any]) -> str:
+    """Fetch a text document from `source`, rate limited and coalesced with identical in-flight calls"""
+    return await single_flight.do(
+        _flight_key("GET", url, params),
+        lambda: _request(source, "GET", url, params, None, None, False),
+    )
+
+
+def _clean(text: Optional[str]) -> str:
+    return " ".join((text or "").split())
+
+
+def semantic_scholar_headers() -> Dict[str, str]:
+    if settings.SEMANTIC_SCHOLAR_API_KEY:
+        return {"x-api-key": settings.SEMANTIC_SCHOLAR_API_KEY}
+    return {}
+
+
+def iter_arxiv_entries(feed: str) -> Iterator[Dict[str, Any]]:
+    """Yield the raw fields of each entry in an arXiv Atom feed"""
+    root = ET.fromstring(feed)
+    for entry in root.findall("atom:entry", ATOM_NS):
+        entry_id = _clean(entry.findtext("atom:id", "", ATOM_NS))
+        if not entry_id:
+            continue
+        pdf_links = [link.get("href") for link in entry.findall("atom:link", ATOM_NS) if link.get("title") == "pdf"]
+        yield {
+            "entry_id": entry_id,
+            "title": _clean(entry.findtext("atom:title", "", ATOM_NS)),
+            "authors": [_clean(a.findtext("atom:name", "", ATOM_NS)) for a in entry.findall("atom:author", ATOM_NS)],
+            "summary": _clean(entry.findtext("atom:summary", "", ATOM_NS)),
+            "published": entry.findtext("atom:published", "", ATOM_NS)[:10],
+            "doi": entry.findtext("arxiv:doi", "", ATOM_NS),
+            "pdf_url": pdf_links[0] if pdf_links else None,
+        }
+
+
+def parse_arxiv_feed(feed: str) -> List[dict]:
+    """Normalize an arXiv Atom feed into paper dicts"""
+    papers = []
+    for entry in iter_arxiv_entries(feed):
+        entry_id = entry["entry_id"]
+        papers.append({
+            "id": entry_id.split('/')[-1],
+            "title": entry["title"],
+            "authors": ", ".join(entry["authors"]),
+            "abstract": entry["summary"],
+            "url": entry_id,
+            "publication_date": entry["published"],
+            "venue": "arXiv",
+            "citation_count": 0,
+            "source": "arXiv",
+            "doi": normalize_doi(entry["doi"]),
+            "arxiv_id": normalize_arxiv_id(entry_id.split('/abs/')[-1]),
+        })
+    return papers
+
+
+def _openalex_abstract(work: dict) -> str:
+    """OpenAlex only ships abstracts as an inverted index; rebuild the text"""
+    index = work.get("abstract_inverted_index")
+    if not index:
+        return ""
+    positions = [(pos, word) for word, offsets in index.items() for pos in offsets]
+    return " ".join(word for _, word in sorted(positions))
+
+
+def parse_openalex_work(work: dict) -> dict:
+    """Normalize one OpenAlex work object into a paper dict"""
+    authors = [(authorship.get("author") or {}).get("display_name", "")
+               for authorship in work.get("authorships", [])]
+    source = (work.get("primary_location") or {}).get("source") or {}
+    return {
+        "id": (work.get("id") or "").split('/')[-1],
+        "title": work.get("title") or "Untitled",
+        "authors": ", ".join(authors[:3]) if authors else "Unknown",
+        "abstract": _openalex_abstract(work) or "No abstract available",
+        "url": work.get("doi") or work.get("id") or "",
+        "publication_date": work.get("publication_date") or "",
+        "venue": source.get("display_name") or "Unknown",
+        "citation_count": work.get("cited_by_count") or 0,
+        "source": "OpenAlex",
+        "doi": normalize_doi(work.get("doi")),
+        "arxiv_id": normalize_arxiv_id((work.get("ids") or {}).get("arxiv")),
+    }
+
+
+def parse_semantic_scholar_paper(item: dict) -> dict:
+    """Normalize one Semantic Scholar paper object into a paper dict"""
+    authors_list = [a.get("name", "") for a in item.get("authors") or []]
+    external_ids = item.get("externalIds") or {}
+    return {
+        "id": item.get("paperId") or "",
+        "title": item.get("title") or "Untitled",
+        "authors": ", ".join(authors_list[:3]) if authors_list else "Unknown",
+        "abstract": item.get("abstract") or "No abstract available",
+        "url": item.get("url") or "",
+        "publication_date": item.get("publicationDate") or "",
+        "venue": item.get("venue") or "Unknown",
+        "citation_count": item.get("citationCount") or 0,
+        "source": "Semantic Scholar",
+        "doi": normalize_doi(external_ids.get("DOI")),
+        "arxiv_id": normalize_arxiv_id(external_ids.get("ArXiv")),
+    }
+
+
+async def search_arxiv(query: str, limit: int) -> List[dict]:
+    """Search arXiv papers"""
+    params = {
+        "search_query": query,
+        "start": 0,
+        "max_results": limit,
+        "sortBy": "relevance",
+        "sortOrder": "descending",
+    }
+    feed = await fetch_text("arxiv", ARXIV_URL, params)
+    return parse_arxiv_feed(feed)
+
+
+async def search_openalex(query: str, limit: int) -> List[dict]:
+    """Search OpenAlex papers"""
+    params = {"search": query, "per_page": limit}
+    if settings.OPENALEX_MAILTO:
+        params["mailto"] = settings.OPENALEX_MAILTO
+    if settings.OPENALEX_API_KEY:
+        params["api_key"] = settings.OPENALEX_API_KEY
+    data = await fetch_json("openalex", OPENALEX_URL, params)
+    return [parse_openalex_work(work) for work in data.get("results", [])]
+
+
+async def search_semantic_scholar(query: str, limit: int) -> List[dict]:
+    """Search Semantic Scholar papers"""
+    params = {"query": query, "limit": limit, "fields": SEMANTIC_SCHOLAR_FIELDS}
+    data = await fetch_json("semantic_scholar", f"{SEMANTIC_SCHOLAR_URL}/search", params,
+                            headers=semantic_scholar_headers())
+    return [parse_semantic_scholar_paper(item) for item in data.get("data", [])]
+
+
+SOURCE_LABELS = {
+    "arxiv": "arXiv",
+    "openalex": "OpenAlex",
+    "semantic_scholar": "Semantic Scholar",
+}
+
+SEARCHERS = {
+    "arxiv": search_arxiv,
+    "openalex": search_openalex,
+    "semantic_scholar": search_semantic_scholar,
+}
+
+
+def resolve_sources(source: str) -> List[str]:
+    """Map the `source` query parameter onto the searcher names it selects"""
+    if source == "all":
+        return list(SEARCHERS)
+    return [source] if source in SEARCHERS else []
+
+
+async def search_source(name: str, query: str, limit: int) -> List[dict]:
+    """Search one source through the shared result cache"""
+    key = search_cache.make_key(query, name, limit)
+    return await search_cache.get_or_fetch(key, lambda: SEARCHERS[name](query, limit), source_ttl(name))
+
+
+async def _run_source(name: str, query: str, limit: int, timeout: float) -> Tuple[str, List[dict], str]:
+    try:
+        papers = await asyncio.wait_for(search_source(name, query, limit), timeout)
+        return name, papers, "ok"
+    except asyncio.TimeoutError:
+        print(f"{name} search timed out after {timeout}s")
+        return name, [], "timeout"
+    except RateLimited as e:
+        print(f"{name} search shed: {e}")
+        return name, [], "rate_limited"
+    except CircuitOpen:
+        return name, [], "circuit_open"
+    except Exception as e:
+        print(f"{name} search failed: {e}")
+        return name, [], "error"
+
+
+async def iter_sources(
+    query: str,
+    sources: List[str],
+    limit: int,
+    timeout: Optional[float] = None,
+) -> AsyncIterator[Tuple[str, List[dict], str]]:
+    """Query all sources at once and yield (source, papers, status) as each one answers.
+
+    Every source gets its own deadline, so a slow source costs at most
+    `timeout` seconds and never holds back the ones that already answered.
+    """
+    timeout = timeout or settings.SEARCH_SOURCE_TIMEOUT
+    tasks = [asyncio.create_task(_run_source(name, query, limit, timeout)) for name in sources]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def search_sources(
+    query: str,
+    sources: List[str],
+    limit: int,
+    timeout: Optional[float] = None,
+) -> Tuple[Dict[str, List[dict]], Dict[str, str]]:
+    """Fan out to all sources concurrently; return per-source papers and statuses"""
+    papers: Dict[str, List[dict]] = {}
+    statuses: Dict[str, str] = {}
+    async for name, source_papers, status in iter_sources(query, sources, limit, timeout):
+        papers[name] = source_papers
+        statuses[name] = status
+    return papers, statuses
@@ -0,0 +1,240 @@
+import asyncio
+import hashlib
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set, Tuple
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import PaperSummary
+from app.services.ai_service import SUMMARY_TYPES, summary_prompt
+from app.services.literature_review import load_papers
+from app.services.llm_client import BULK, complete_with_model, llm_configured
+from app.services.model_router import SUMMARY
+from app.services.paper_chunks import load_chunks
+
+# Sections a summary is written from when the paper's full text is stored
+SUMMARY_SECTIONS = {
+    "short": ["abstract", "introduction", "conclusion"],
+    "full": ["abstract", "introduction", "methods", "results", "discussion", "conclusion"],
+    "methods": ["abstract", "methods", "results"],
+}
+
+_slots: Optional[asyncio.Semaphore] = None
+_running: Set[Tuple[str, str]] = set()
+# Refreshes asked for while one was running for the same key, newest paper data last
+_pending: Dict[Tuple[str, str], dict] = {}
+_tasks: Set[asyncio.Task] = set()
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.SUMMARY_CONCURRENCY)
+    return _slots
+
+
+def source_text(paper: dict, summary_type: str, chunks: List) -> str:
+    """What a summary is generated from: title, abstract and the relevant stored chunks"""
+    sections = SUMMARY_SECTIONS.get(summary_type, SUMMARY_SECTIONS["full"])
+    parts = [paper.get("abstract") or ""] + [chunk.text for chunk in chunks if chunk.section in sections]
+    body = "\n".join(part for part in parts if part)[:settings.SUMMARY_INPUT_TOKENS * 4]
+    return f"Title: {paper.get('title') or 'Untitled'}\n{body}" if body else ""
+
+
+def summary_input(paper: dict, summary_type: str, chunks: List) -> str:
+    """source_text, or just the title for a paper with no abstract or stored text"""
+    return source_text(paper, summary_type, chunks) or f"Title: {paper.get('title') or paper['id']}"
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def is_current(stored: Optional[PaperSummary], text: str) -> bool:
+    """Whether a stored summary was written from `text`, i.e. the paper has not changed since"""
+    return stored is not None and stored.source_hash == text_hash(text)
+
+
+def get_summary(paper_id: str, summary_type: str) -> Optional[PaperSummary]:
+    """Stored summary, found through the (paper_id, summary_type) unique index"""
+    db = SessionLocal()
+    try:
+        return db.query(PaperSummary).filter(
+            PaperSummary.paper_id == paper_id, PaperSummary.summary_type == summary_type
+        ).first()
+    finally:
+        db.close()
+
+
+def get_summaries(paper_ids: List[str], summary_type: str) -> Dict[str, PaperSummary]:
+    db = SessionLocal()
+    try:
+        rows = db.query(PaperSummary).filter(
+            PaperSummary.paper_id.in_(paper_ids), PaperSummary.summary_type == summary_type
+        ).all()
+        return {row.paper_id: row for row in rows}
+    finally:
+        db.close()
+
+
+def save_summary(paper_id: str, summary_type: str, source_hash: str, summary: str, model: str) -> None:
+    db = SessionLocal()
+    try:
+        row = db.query(PaperSummary).filter(
+            PaperSummary.paper_id == paper_id, PaperSummary.summary_type == summary_type
+        ).first()
+        if row is None:
+            row = PaperSummary(paper_id=paper_id, summary_type=summary_type)
+            db.add(row)
+        row.source_hash = source_hash
+        row.summary = summary
+        row.model = model
+        row.updated_at = time.time()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def generate(paper: dict, summary_type: str, text: str, user_id=None, lane: str = BULK,
+                   bypass_cache: bool = False) -> str:
+    """Generate and store one summary; raises on LLM errors so nothing bad is stored"""
+    summary, model = await complete_with_model(
+        messages=[{"role": "user", "content": summary_prompt(text, summary_type)}],
+        task=SUMMARY,
+        temperature=0.5,
+        max_tokens=1024,
+        user_id=user_id,
+        lane=lane,
+        cache=True,
+        bypass_cache=bypass_cache,
+    )
+    await asyncio.to_thread(save_summary, paper["id"], summary_type, text_hash(text), summary, model)
+    return summary
+
+
+async def refresh_summaries(paper: dict, summary_types: Sequence[str] = SUMMARY_TYPES) -> Dict[str, str]:
+    """Bring the summaries of `paper` up to date; unchanged source text costs one read each.
+
+    A type already being checked or generated is queued and refreshed again
+    once that run finishes, since it may have started from older text.
+    """
+    results: Dict[str, str] = {}
+    chunks = await asyncio.to_thread(load_chunks, [paper["id"]])
+    for summary_type in summary_types:
+        key = (paper["id"], summary_type)
+        if key in _running:
+            _pending[key] = paper
+            results[summary_type] = "queued"
+            continue
+        _running.add(key)  # before the first await, so a concurrent trigger queues instead
+        try:
+            text = source_text(paper, summary_type, chunks)
+            if not text:
+                continue
+            stored = await asyncio.to_thread(get_summary, *key)
+            if is_current(stored, text):
+                results[summary_type] = "unchanged"
+                continue
+            async with _get_slots():
+                await generate(paper, summary_type, text)
+            results[summary_type] = "generated"
+        except Exception as e:
+            print(f"Summary {summary_type} for paper {paper['id']} failed: {e}")
+            results[summary_type] = "failed"
+        finally:
+            _running.discard(key)
+            queued = _pending.pop(key, None)
+            if queued is not None:
+                summarize_in_background(queued, [summary_type])
+    return results
+
+
+def _retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying a rate-limited call, or None if `error` is not a rate limit"""
+    if type(error).__name__ != "RateLimitError":
+        return None
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), 30.0)
+    except (TypeError, ValueError):
+        return 2.0 ** attempt
+
+
+async def _generate_with_retry(paper: dict, summary_type: str, text: str, user_id, bypass_cache: bool,
+                               slots: asyncio.Semaphore) -> str:
+    """generate() holding one of `slots`; rate-limit backoff waits outside it so other papers proceed"""
+    for attempt in range(settings.SUMMARY_BATCH_RETRIES + 1):
+        try:
+            async with slots:
+                return await generate(paper, summary_type, text, user_id=user_id, bypass_cache=bypass_cache)
+        except Exception as e:
+            delay = _retry_delay(e, attempt)
+            if delay is None or attempt == settings.SUMMARY_BATCH_RETRIES:
+                raise
+        await asyncio.sleep(delay)
+
+
+async def summarize_batch(paper_ids: List[str], summary_type: str, user_id=None, refresh: bool = False,
+                          listed: Optional[Dict[str, dict]] = None) -> AsyncIterator[dict]:
+    """Summaries for many papers as progress events, each one as soon as it is ready.
+
+    Stored summaries come back first without an LLM call (they are kept
+    current when a paper is ingested or added to a workspace); the rest are
+    generated SUMMARY_BATCH_CONCURRENCY at a time on the bulk lane (where the
+    response cache still answers repeats), retrying on rate limits. Closing
+    the iterator cancels the generations still running.
+    """
+    paper_ids = list(dict.fromkeys(paper_ids))
+    total, done, failed = len(paper_ids), 0, 0
+    stored = {} if refresh else await asyncio.to_thread(get_summaries, paper_ids, summary_type)
+    yield {"event": "start", "total": total, "precomputed": len(stored)}
+    for paper_id, row in stored.items():
+        done += 1
+        yield {"event": "summary", "paper_id": paper_id, "summary": row.summary, "precomputed": True,
+               "done": done, "total": total}
+
+    missing = [paper_id for paper_id in paper_ids if paper_id not in stored]
+    if missing:
+        papers = {paper["id"]: paper for paper in await load_papers(missing, listed)}
+        chunks: Dict[str, List] = {}
+        for chunk in await asyncio.to_thread(load_chunks, missing):
+            chunks.setdefault(chunk.paper_id, []).append(chunk)
+        slots = asyncio.Semaphore(settings.SUMMARY_BATCH_CONCURRENCY)
+
+        async def one(paper_id: str) -> Tuple[str, Optional[str], Optional[str]]:
+            paper = papers.get(paper_id)
+            if paper is None:
+                return paper_id, None, "Paper not found"
+            if not llm_configured():
+                return paper_id, None, "AI not configured"
+            paper = {**paper, "id": paper_id}
+            text = summary_input(paper, summary_type, chunks.get(paper_id, []))
+            try:
+                return paper_id, await _generate_with_retry(paper, summary_type, text, user_id, refresh, slots), None
+            except Exception as e:
+                return paper_id, None, str(e)
+
+        tasks = [asyncio.create_task(one(paper_id)) for paper_id in missing]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                paper_id, summary, error = await finished
+                done += 1
+                if error is not None:
+                    failed += 1
+                    yield {"event": "error", "paper_id": paper_id, "detail": error, "done": done, "total": total}
+                else:
+                    yield {"event": "summary", "paper_id": paper_id, "summary": summary, "precomputed": False,
+                           "done": done, "total": total}
+        finally:
+            for task in tasks:
+                task.cancel()
+    yield {"event": "done", "total": total, "succeeded": done - failed, "failed": failed}
+
+
+def summarize_in_background(paper: dict, summary_types: Sequence[str] = SUMMARY_TYPES) -> None:
+    """Queue summary generation for a paper without making the caller wait"""
+    if not llm_configured() or not paper.get("id"):
+        return
+    task = asyncio.create_task(refresh_summaries(paper, summary_types))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
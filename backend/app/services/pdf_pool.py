@@ -0,0 +1,235 @@
+import asyncio
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import pdfplumber
+from PyPDF2 import PdfReader
+
+from app.core.config import settings
+
+
+class ExtractionBusy(Exception):
+    """Raised when the extraction queue is already at PDF_QUEUE_DEPTH documents"""
+
+
+class ExtractionTimeout(Exception):
+    """Raised when a document takes longer than PDF_EXTRACT_TIMEOUT"""
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_admitted = 0
+_recycled = 0
+
+
+# --- worker-side functions (run in the pool's processes) ---
+
+def count_pages(file_path: str) -> int:
+    return len(PdfReader(file_path).pages)
+
+
+def read_metadata(file_path: str) -> Dict[str, str]:
+    """Document info dictionary with the leading slash stripped from keys"""
+    info = PdfReader(file_path).metadata or {}
+    return {str(key).lstrip("/"): str(value) for key, value in info.items()}
+
+
+def looks_garbled(text: str) -> bool:
+    """Heuristic for text layers PyPDF2 decodes badly (missing font maps, CID glyphs)"""
+    stripped = "".join(text.split())
+    if len(stripped) < 20:
+        return False
+    if text.count("(cid:") >= 3:
+        return True
+    bad = sum(1 for ch in stripped if ch == "\ufffd" or not ch.isprintable())
+    letters = sum(1 for ch in stripped if ch.isalpha())
+    return bad / len(stripped) > 0.1 or letters / len(stripped) < 0.3
+
+
+def extract_page_range(file_path: str, start: int, stop: int) -> List[Dict[str, Any]]:
+    """Extract pages [start, stop) of a PDF: fast PyPDF2 pass, pdfplumber only for pages it fails on.
+
+    Returns one {"page", "text", "method"} dict per page, where method is
+    "pypdf2", "pdfplumber", or "none" when neither found any text.
+    """
+    results = []
+    plumber = None
+    try:
+        reader = PdfReader(file_path)
+        for index in range(start, stop):
+            try:
+                text = reader.pages[index].extract_text() or ""
+            except Exception:
+                text = ""
+            method = "pypdf2"
+
+            if not text.strip() or looks_garbled(text):
+                if plumber is None:
+                    plumber = pdfplumber.open(file_path)
+                try:
+                    page = plumber.pages[index]
+                    fallback = page.extract_text() or ""
+                    page.close()
+                except Exception:
+                    fallback = ""
+                if fallback.strip() and (not text.strip() or not looks_garbled(fallback)):
+                    text, method = fallback, "pdfplumber"
+
+            results.append({"page": index + 1, "text": text, "method": method if text.strip() else "none"})
+    finally:
+        if plumber is not None:
+            plumber.close()
+    return results
+
+
+# --- event-loop side ---
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_POOL_SIZE)
+    return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def _recycle_pool(pool: ProcessPoolExecutor) -> None:
+    """Kill the workers of `pool` (a timed-out document would otherwise keep extracting) and start afresh.
+
+    Ranges of other documents running on it fail with BrokenProcessPool and
+    are retried on the new pool by iter_pages.
+    """
+    global _pool, _recycled
+    if _pool is not pool:
+        return  # already recycled
+    _pool = None
+    _recycled += 1
+    # The executor has no public way to stop a running task, so killing its worker processes is the
+    # only way to stop a hung extraction. Should a future CPython drop the private attribute, the
+    # shutdown below still retires the pool, but a hung worker then runs on until it finishes.
+    processes = getattr(pool, "_processes", None)
+    if processes is None:
+        print("PDF pool: cannot reach worker processes to kill them; timed-out work keeps running")
+    else:
+        for process in list(processes.values()):
+            process.kill()
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def queue_stats() -> dict:
+    return {
+        "pool_size": settings.PDF_POOL_SIZE,
+        "documents_in_progress": _admitted,
+        "queue_depth": settings.PDF_QUEUE_DEPTH,
+        "pool_recycles": _recycled,
+    }
+
+
+async def _before(deadline: float, awaitable):
+    remaining = deadline - asyncio.get_running_loop().time()
+    try:
+        return await asyncio.wait_for(awaitable, max(remaining, 0))
+    except asyncio.TimeoutError:
+        raise ExtractionTimeout(f"PDF extraction took longer than {settings.PDF_EXTRACT_TIMEOUT}s")
+
+
+async def iter_pages(file_path: str) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Extract a PDF in the process pool, yielding each page range as soon as it is ready, in page order.
+
+    Large documents are split into PDF_PAGES_PER_TASK-page ranges, at most
+    PDF_MAX_PARALLEL_PER_DOC of which run at once so a single huge file
+    cannot occupy the whole pool (and at most that many ranges are held in
+    memory). The whole document must finish within PDF_EXTRACT_TIMEOUT; on
+    timeout the pool's workers are killed, since cancelling the awaiting
+    future alone leaves the worker extracting. The document keeps its
+    admission slot until none of its work is still running in a worker.
+    """
+    global _admitted
+    if _admitted >= settings.PDF_QUEUE_DEPTH:
+        raise ExtractionBusy("PDF extraction queue is full")
+    _admitted += 1
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.PDF_EXTRACT_TIMEOUT
+    tasks: List[asyncio.Future] = []
+    submitted: List[Future] = []
+
+    async def run(fn, *args):
+        for attempt in range(2):
+            pool = get_pool()
+            future = pool.submit(fn, *args)
+            submitted.append(future)
+            try:
+                return await asyncio.wrap_future(future)
+            except BrokenProcessPool:
+                # Another document's timeout recycled the pool under this range: retry once on the new one
+                if attempt:
+                    raise
+
+    try:
+        page_count = await _before(deadline, run(count_pages, file_path))
+        step = settings.PDF_PAGES_PER_TASK
+        parallel = asyncio.Semaphore(settings.PDF_MAX_PARALLEL_PER_DOC)
+
+        async def run_range(start: int) -> List[Dict[str, Any]]:
+            async with parallel:
+                return await run(extract_page_range, file_path, start, min(start + step, page_count))
+
+        tasks = [asyncio.ensure_future(run_range(start)) for start in range(0, page_count, step)]
+        for task in tasks:
+            yield await _before(deadline, task)
+    except ExtractionTimeout:
+        if _pool is not None and any(future.running() for future in submitted):
+            _recycle_pool(_pool)
+        raise
+    finally:
+        # Ranges not yet handed to a worker are dropped if the caller stops early
+        for task in tasks:
+            task.cancel()
+        for future in submitted:
+            future.cancel()
+        running = [future for future in submitted if not future.done()]
+        if not running:
+            _admitted -= 1
+        else:
+            # Still running in a worker: release the slot only once it is really free.
+            # Callbacks run on the executor's management thread, one at a time.
+            released = []
+
+            def finished(_: Future) -> None:
+                if not released and all(future.done() for future in running):
+                    released.append(True)
+                    try:
+                        loop.call_soon_threadsafe(_release_slot)
+                    except RuntimeError:
+                        _release_slot()  # event loop already closed
+
+            for future in running:
+                future.add_done_callback(finished)
+
+
+def _release_slot() -> None:
+    global _admitted
+    _admitted -= 1
+
+
+async def extract_pages(file_path: str) -> List[Dict[str, Any]]:
+    """Extract every page of a PDF in the process pool; results come back in page order"""
+    return [page async for pages in iter_pages(file_path) for page in pages]
+
+
+def summarize_pages(pages: List[Dict[str, Any]], seconds: float) -> Dict[str, Any]:
+    """Per-page methods and throughput for an extraction result"""
+    methods: Dict[str, int] = {}
+    for page in pages:
+        methods[page["method"]] = methods.get(page["method"], 0) + 1
+    return {
+        "page_count": len(pages),
+        "methods": methods,
+        "pages": [{"page": p["page"], "method": p["method"], "chars": len(p["text"])} for p in pages],
+        "pages_per_second": round(len(pages) / seconds, 1) if seconds > 0 else None,
+    }
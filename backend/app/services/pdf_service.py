@@ -1,57 +1,52 @@
+import asyncio
+import json
 import os
-import uuid
+import time
 from typing import Dict, Any
 import pdfplumber
-from PyPDF2 import PdfReader
+
+from app.core.config import settings
+from app.services.pdf_pool import summarize_pages
+from app.services.pdf_store import extract_stored, file_hash, get_stored, store_pdf, store_upload
 
 
 class PDFService:
     def __init__(self):
-        self.upload_dir = "uploads"
+        self.upload_dir = settings.PDF_STORE_DIR
         os.makedirs(self.upload_dir, exist_ok=True)
 
     async def save_uploaded_pdf(self, content: bytes, filename: str) -> str:
-        """Save uploaded PDF file and return the file path"""
-        file_id = str(uuid.uuid4())
-        file_path = os.path.join(self.upload_dir, f"{file_id}_{filename}")
-        with open(file_path, "wb") as f:
-            f.write(content)
+        """Save uploaded PDF file and return the file path (identical uploads share one file)"""
+        _, file_path = await asyncio.to_thread(store_pdf, content, filename)
+        return file_path
+
+    async def save_upload(self, upload, filename: str) -> str:
+        """Spool an upload to disk in chunks and return the file path (never held in memory whole)"""
+        _, file_path = await store_upload(upload, filename)
         return file_path
 
     async def extract_text(self, file_path: str) -> Dict[str, Any]:
         """Extract text from PDF file"""
         try:
-            # Try pdfplumber first (better for complex layouts)
-            with pdfplumber.open(file_path) as pdf:
-                text = ""
-                page_count = len(pdf.pages)
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                
-                if text.strip():
-                    return {
-                        "success": True,
-                        "text": text.strip(),
-                        "page_count": page_count,
-                        "method": "pdfplumber"
-                    }
-            
-            # Fallback to PyPDF2
-            with open(file_path, "rb") as file:
-                reader = PdfReader(file)
-                text = ""
-                page_count = len(reader.pages)
-                for page in reader.pages:
-                    text += page.extract_text() + "\n"
-                
-                return {
-                    "success": True,
-                    "text": text.strip(),
-                    "page_count": page_count,
-                    "method": "pypdf2"
-                }
+            # One pass per page: PyPDF2 first, pdfplumber only where it comes back empty or garbled.
+            # Results are cached by content hash, so a re-uploaded paper is not parsed again.
+            started = time.perf_counter()
+            digest = await asyncio.to_thread(file_hash, file_path)
+            result = await extract_stored(digest, file_path)
+            pages = result["pages"]
+            summary = summarize_pages(pages, 0 if result["cached"] else time.perf_counter() - started)
+            text = "\n".join(page["text"] for page in pages if page["text"])
+            used = [method for method in summary["methods"] if method != "none"]
+            return {
+                "success": True,
+                "text": text.strip(),
+                "page_count": summary["page_count"],
+                "method": used[0] if len(used) == 1 else "hybrid" if used else "none",
+                "pages": summary["pages"],
+                "pages_per_second": summary["pages_per_second"],
+                "sha256": digest,
+                "cached": result["cached"]
+            }
                 
         except Exception as e:
             return {
@@ -63,6 +58,12 @@ class PDFService:
 
     async def get_pdf_info(self, file_path: str) -> Dict[str, Any]:
         """Get basic information about PDF file"""
+        stored = await asyncio.to_thread(get_stored, file_path)
+        if stored is not None and stored.page_count is not None:
+            return {
+                "page_count": stored.page_count,
+                "metadata": json.loads(stored.pdf_metadata or "{}")
+            }
         try:
             with pdfplumber.open(file_path) as pdf:
                 return {
@@ -71,4 +72,3 @@ class PDFService:
                 }
         except Exception as e:
             return {"error": str(e)}
-
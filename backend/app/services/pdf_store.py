@@ -0,0 +1,302 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import IngestionJob, StoredPdf
+from app.services.pdf_pool import extract_pages, iter_pages, read_metadata
+from app.services.upstream import SingleFlight
+
+# Identical uploads arriving together share one extraction
+_extractions = SingleFlight()
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: str) -> str:
+    """SHA-256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _path_for(digest: str) -> str:
+    return os.path.join(settings.PDF_STORE_DIR, f"{digest}.pdf")
+
+
+def _pages_path(digest: str) -> str:
+    # Extracted pages, one JSON object per line, so they can be written and read back a page at a time
+    return os.path.join(settings.PDF_STORE_DIR, f"{digest}.pages.ndjson")
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_file(digest: str, content: bytes) -> str:
+    path = _path_for(digest)
+    if not os.path.exists(path):
+        os.makedirs(settings.PDF_STORE_DIR, exist_ok=True)
+        # Write then rename so a concurrent reader never sees a partial file
+        partial = f"{path}.{os.getpid()}.part"
+        with open(partial, "wb") as f:
+            f.write(content)
+        os.replace(partial, path)
+    return path
+
+
+def _insert_row(db, digest: str, path: str, size: int, filename: Optional[str] = None) -> None:
+    """Add the row for `digest` unless it exists; identical uploads arriving together both get here"""
+    db.execute(insert(StoredPdf).values(
+        sha256=digest, file_path=path, filename=filename, size_bytes=size, hits=0, last_used_at=time.time()
+    ).on_conflict_do_nothing(index_elements=["sha256"]))
+
+
+def _register(digest: str, path: str, filename: str, size: int) -> None:
+    db = SessionLocal()
+    try:
+        _insert_row(db, digest, path, size, filename)
+        db.commit()
+    finally:
+        db.close()
+
+
+def store_pdf(content: bytes, filename: str) -> Tuple[str, str]:
+    """Store PDF bytes once under their SHA-256; returns (digest, file path)"""
+    digest = content_hash(content)
+    path = _write_file(digest, content)
+    _register(digest, path, filename, len(content))
+    return digest, path
+
+
+async def store_upload(upload, filename: str) -> Tuple[str, str]:
+    """Spool an upload (anything with an async read(size)) into the store chunk by chunk.
+
+    The SHA-256 is computed while writing, so the PDF is never held in memory
+    as a whole. Raises ValueError for an empty upload.
+    """
+    os.makedirs(settings.PDF_STORE_DIR, exist_ok=True)
+    fd, partial = tempfile.mkstemp(suffix=".part", dir=settings.PDF_STORE_DIR)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = await upload.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                size += len(chunk)
+                await asyncio.to_thread(f.write, chunk)
+        if size == 0:
+            raise ValueError("Empty file")
+        path = _path_for(digest.hexdigest())
+        if os.path.exists(path):
+            os.remove(partial)
+        else:
+            os.replace(partial, path)
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+    await asyncio.to_thread(_register, digest.hexdigest(), path, filename, size)
+    return digest.hexdigest(), path
+
+
+def _cached(digest: str) -> Optional[StoredPdf]:
+    """The stored row if its extraction is cached and both files are still on disk; bumps its LRU time"""
+    db = SessionLocal()
+    try:
+        doc = db.query(StoredPdf).filter(StoredPdf.sha256 == digest).first()
+        if doc is None or doc.page_count is None or not os.path.exists(doc.file_path) \
+                or not os.path.exists(_pages_path(digest)):
+            return None
+        doc.hits = (doc.hits or 0) + 1
+        doc.last_used_at = time.time()
+        db.commit()
+        db.refresh(doc)
+        return doc
+    finally:
+        db.close()
+
+
+def _write_pages(digest: str, pages: List[dict]) -> None:
+    partial = f"{_pages_path(digest)}.{os.getpid()}.part"
+    with open(partial, "w", encoding="utf-8") as f:
+        for page in pages:
+            f.write(json.dumps(page) + "\n")
+    os.replace(partial, _pages_path(digest))
+
+
+def read_pages(digest: str) -> Iterator[dict]:
+    """Cached pages of a stored PDF, read from disk one at a time"""
+    with open(_pages_path(digest), encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _save_extraction(digest: str, path: str, page_count: int, metadata: Dict[str, str]) -> StoredPdf:
+    """Record a finished extraction whose pages file is already in place"""
+    db = SessionLocal()
+    try:
+        doc = db.query(StoredPdf).filter(StoredPdf.sha256 == digest).first()
+        if doc is None:
+            # Evicted (or never registered) while extracting: the file is still here, so re-register it
+            _insert_row(db, digest, path, os.path.getsize(path))
+            doc = db.query(StoredPdf).filter(StoredPdf.sha256 == digest).first()
+        doc.pdf_metadata = json.dumps(metadata)
+        doc.page_count = page_count
+        doc.size_bytes = (os.path.getsize(doc.file_path) + os.path.getsize(_pages_path(digest))
+                          + len(doc.pdf_metadata))
+        doc.last_used_at = time.time()
+        db.commit()
+        db.refresh(doc)
+        return doc
+    finally:
+        db.close()
+
+
+def evict(keep: Optional[str] = None) -> int:
+    """Drop least recently used documents until the store fits PDF_STORE_MAX_BYTES.
+
+    Documents not extracted yet (uploads on their way to an extraction or an
+    ingestion job) and those a queued or running ingestion job still reads
+    are never evicted.
+    """
+    db = SessionLocal()
+    removed = 0
+    try:
+        total = db.query(func.coalesce(func.sum(StoredPdf.size_bytes), 0)).scalar()
+        if total <= settings.PDF_STORE_MAX_BYTES:
+            return 0
+        in_use = db.query(IngestionJob.sha256).filter(IngestionJob.status.in_(["queued", "running"]))
+        candidates = db.query(StoredPdf).filter(
+            StoredPdf.page_count.isnot(None), StoredPdf.sha256.notin_(in_use)
+        ).order_by(StoredPdf.last_used_at)
+        for doc in candidates:
+            if total <= settings.PDF_STORE_MAX_BYTES:
+                break
+            if doc.sha256 == keep:
+                continue
+            _remove(doc.file_path)
+            _remove(_pages_path(doc.sha256))
+            total -= doc.size_bytes
+            db.delete(doc)
+            removed += 1
+        db.commit()
+    finally:
+        db.close()
+    _stats["evictions"] += removed
+    return removed
+
+
+def _as_result(doc: StoredPdf, cached: bool) -> Dict[str, Any]:
+    return {
+        "sha256": doc.sha256,
+        "file_path": doc.file_path,
+        "page_count": doc.page_count,
+        "pages": list(read_pages(doc.sha256)),
+        "metadata": json.loads(doc.pdf_metadata or "{}"),
+        "cached": cached,
+    }
+
+
+async def _extract_and_save(digest: str, path: str) -> Dict[str, Any]:
+    pages = await extract_pages(path)
+    metadata = await asyncio.to_thread(read_metadata, path)
+    await asyncio.to_thread(_write_pages, digest, pages)
+    doc = await asyncio.to_thread(_save_extraction, digest, path, len(pages), metadata)
+    await asyncio.to_thread(evict, digest)
+    return {**_as_result(doc, cached=False), "pages": pages}
+
+
+async def extract_stored(digest: str, path: str) -> Dict[str, Any]:
+    """Cached extraction for a stored PDF, extracting it (once) on a miss"""
+    doc = await asyncio.to_thread(_cached, digest)
+    if doc is not None:
+        _stats["hits"] += 1
+        return await asyncio.to_thread(_as_result, doc, True)
+    _stats["misses"] += 1
+    return await _extractions.do(digest, lambda: _extract_and_save(digest, path))
+
+
+async def iter_stored(digest: str, path: str) -> AsyncIterator[Tuple[Dict[str, Any], bool]]:
+    """Yield (page, cached) for a stored PDF page by page, extracting on a miss.
+
+    Either way only one page is held at a time: cached pages are read back
+    line by line, and extracted pages are appended to the cache file as they
+    are yielded. The cache entry is recorded once the document is complete.
+    """
+    doc = await asyncio.to_thread(_cached, digest)
+    if doc is not None:
+        _stats["hits"] += 1
+        pages = read_pages(digest)
+        try:
+            while True:
+                page = await asyncio.to_thread(next, pages, None)
+                if page is None:
+                    return
+                yield page, True
+        finally:
+            pages.close()
+    _stats["misses"] += 1
+    os.makedirs(settings.PDF_STORE_DIR, exist_ok=True)
+    fd, partial = tempfile.mkstemp(suffix=".part", dir=settings.PDF_STORE_DIR)
+    page_count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            async for extracted in iter_pages(path):
+                for page in extracted:
+                    await asyncio.to_thread(f.write, json.dumps(page) + "\n")
+                    page_count += 1
+                    yield page, False
+        os.replace(partial, _pages_path(digest))
+    finally:
+        _remove(partial)
+    metadata = await asyncio.to_thread(read_metadata, path)
+    await asyncio.to_thread(_save_extraction, digest, path, page_count, metadata)
+    await asyncio.to_thread(evict, digest)
+
+
+def get_stored(file_path: str) -> Optional[StoredPdf]:
+    db = SessionLocal()
+    try:
+        return db.query(StoredPdf).filter(StoredPdf.file_path == file_path).first()
+    finally:
+        db.close()
+
+
+def stats() -> Dict[str, Any]:
+    db = SessionLocal()
+    try:
+        documents, stored_bytes = db.query(func.count(StoredPdf.sha256),
+                                           func.coalesce(func.sum(StoredPdf.size_bytes), 0)).one()
+    finally:
+        db.close()
+    lookups = _stats["hits"] + _stats["misses"]
+    return {
+        "documents": documents,
+        "stored_bytes": stored_bytes,
+        "max_bytes": settings.PDF_STORE_MAX_BYTES,
+        **_stats,
+        "coalesced": _extractions.followers,
+        "hit_rate": round(_stats["hits"] / lookups, 4) if lookups else 0.0,
+    }
@@ -1,99 +1,133 @@
-import arxiv
-import aiohttp
 from typing import List, Dict, Any
 import asyncio
 
+from app.services.paper_sources import (
+    ARXIV_URL,
+    OPENALEX_URL,
+    SEMANTIC_SCHOLAR_URL,
+    fetch_json,
+    fetch_text,
+    iter_arxiv_entries,
+    semantic_scholar_headers,
+)
+from app.services.search_cache import search_cache, source_ttl
+
 
 class ResearchAPIService:
     async def search_arxiv(self, query: str, max_results: int = 20) -> List[Dict[str, Any]]:
-        search = arxiv.Search(
-            query=query,
-            max_results=max_results,
-            sort_by=arxiv.SortCriterion.Relevance,
-        )
+        try:
+            return await self._fetch_arxiv(query, max_results)
+        except Exception as e:
+            print(f"Error searching arXiv: {e}")
+            return []
+
+    async def _fetch_arxiv(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        params = {
+            "search_query": query,
+            "start": 0,
+            "max_results": max_results,
+            "sortBy": "relevance",
+            "sortOrder": "descending",
+        }
+        feed = await fetch_text("arxiv", ARXIV_URL, params)
         results: List[Dict[str, Any]] = []
-        for paper in search.results():
+        for paper in iter_arxiv_entries(feed):
             results.append(
                 {
-                    "title": paper.title,
-                    "authors": [author.name for author in paper.authors],
-                    "abstract": paper.summary,
-                    "arxiv_id": paper.entry_id.split("/")[-1],
-                    "publication_date": paper.published.strftime("%Y-%m-%d") if getattr(paper, "published", None) else None,
-                    "pdf_url": paper.pdf_url,
+                    "title": paper["title"],
+                    "authors": paper["authors"],
+                    "abstract": paper["summary"],
+                    "arxiv_id": paper["entry_id"].split("/")[-1],
+                    "publication_date": paper["published"] or None,
+                    "pdf_url": paper["pdf_url"],
                     "source": "arxiv",
                 }
             )
         return results
 
     async def search_semantic_scholar(self, query: str, max_results: int = 20) -> List[Dict[str, Any]]:
-        url = "https://api.semanticscholar.org/graph/v1/paper/search"
+        try:
+            return await self._fetch_semantic_scholar(query, max_results)
+        except Exception as e:
+            print(f"Error searching Semantic Scholar: {e}")
+            return []
+
+    async def _fetch_semantic_scholar(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        url = f"{SEMANTIC_SCHOLAR_URL}/search"
         params = {
             "query": query,
             "limit": max_results,
             "fields": "title,authors,abstract,year,publicationDate,journal,externalIds",
         }
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results: List[Dict[str, Any]] = []
-                        for paper in data.get("data", []):
-                            results.append(
-                                {
-                                    "title": paper.get("title", ""),
-                                    "authors": [a.get("name", "") for a in paper.get("authors", [])],
-                                    "abstract": paper.get("abstract", ""),
-                                    "doi": (paper.get("externalIds") or {}).get("DOI"),
-                                    "publication_date": paper.get("publicationDate"),
-                                    "journal": (paper.get("journal") or {}).get("name"),
-                                    "source": "semantic_scholar",
-                                }
-                            )
-                        return results
-        except Exception as e:
-            print(f"Error searching Semantic Scholar: {e}")
-        return []
+        data = await fetch_json("semantic_scholar", url, params, headers=semantic_scholar_headers())
+        results: List[Dict[str, Any]] = []
+        for paper in data.get("data", []):
+            results.append(
+                {
+                    "title": paper.get("title", ""),
+                    "authors": [a.get("name", "") for a in paper.get("authors", [])],
+                    "abstract": paper.get("abstract", ""),
+                    "doi": (paper.get("externalIds") or {}).get("DOI"),
+                    "publication_date": paper.get("publicationDate"),
+                    "journal": (paper.get("journal") or {}).get("name"),
+                    "source": "semantic_scholar",
+                }
+            )
+        return results
 
     async def search_openalex(self, query: str, max_results: int = 20) -> List[Dict[str, Any]]:
-        url = "https://api.openalex.org/works"
-        params = {"search": query, "per_page": max_results}
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results: List[Dict[str, Any]] = []
-                        for paper in data.get("results", []):
-                            results.append(
-                                {
-                                    "title": paper.get("title", ""),
-                                    "authors": [
-                                        a.get("author", {}).get("display_name", "")
-                                        for a in paper.get("authorships", [])
-                                    ],
-                                    "abstract": paper.get("abstract"),
-                                    "doi": paper.get("doi"),
-                                    "publication_date": paper.get("publication_date"),
-                                    "journal": (paper.get("primary_location") or {}).get("source", {}).get("display_name"),
-                                    "source": "openalex",
-                                }
-                            )
-                        return results
+            return await self._fetch_openalex(query, max_results)
         except Exception as e:
             print(f"Error searching OpenAlex: {e}")
-        return []
+            return []
+
+    async def _fetch_openalex(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        params = {"search": query, "per_page": max_results}
+        data = await fetch_json("openalex", OPENALEX_URL, params)
+        results: List[Dict[str, Any]] = []
+        for paper in data.get("results", []):
+            results.append(
+                {
+                    "title": paper.get("title", ""),
+                    "authors": [
+                        (a.get("author") or {}).get("display_name", "")
+                        for a in paper.get("authorships", [])
+                    ],
+                    "abstract": paper.get("abstract"),
+                    "doi": paper.get("doi"),
+                    "publication_date": paper.get("publication_date"),
+                    "journal": ((paper.get("primary_location") or {}).get("source") or {}).get("display_name"),
+                    "source": "openalex",
+                }
+            )
+        return results
 
     async def search_all(self, query: str, max_results: int = 20) -> List[Dict[str, Any]]:
+        """Search every source, each through the shared cache.
+
+        Sources are cached separately and a failing source raises inside its
+        fetch, so an outage is never cached (or served stale) as an empty result.
+        """
+        fetchers = {
+            "arxiv": self._fetch_arxiv,
+            "semantic_scholar": self._fetch_semantic_scholar,
+            "openalex": self._fetch_openalex,
+        }
+        per_source = max_results // 3
         tasks = [
-            self.search_arxiv(query, max_results // 3),
-            self.search_semantic_scholar(query, max_results // 3),
-            self.search_openalex(query, max_results // 3),
+            search_cache.get_or_fetch(
+                search_cache.make_key(query, f"research_api:{name}", per_source),
+                lambda fetch=fetch: fetch(query, per_source),
+                source_ttl(name),
+            )
+            for name, fetch in fetchers.items()
         ]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         combined: List[Dict[str, Any]] = []
-        for result in results:
+        for name, result in zip(fetchers, results):
             if isinstance(result, list):
                 combined.extend(result)
-        return combined[:max_results]
\ No newline at end of file
+            else:
+                print(f"Error searching {name}: {result}")
+        return combined[:max_results]
@@ -0,0 +1,111 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how in is it its of on or that the their them "
+    "these this those to was were what when where which who why will with".split()
+)
+
+# Sections that answer questions poorly and crowd out useful passages
+SKIPPED_SECTIONS = ("references",)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token for English prose)"""
+    return len(text) // 4 + 1
+
+
+class BM25:
+    """Okapi BM25 over a small in-memory set of passages"""
+
+    def __init__(self, documents: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(document)) for document in documents]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        document_frequency: Counter = Counter()
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+        total = len(documents)
+        self.idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+
+    def scores(self, query: str) -> List[float]:
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        results = []
+        for counts, length in zip(self.term_counts, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self.average_length or 1))
+            score = 0.0
+            for term in terms:
+                frequency = counts.get(term)
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            results.append(score)
+        return results
+
+
+def _pages(passage: dict) -> str:
+    start, end = passage.get("page_start"), passage.get("page_end")
+    if not start:
+        return ""
+    return f", p. {start}" if not end or end == start else f", pp. {start}-{end}"
+
+
+def select_passages(
+    question: str,
+    passages: List[dict],
+    token_budget: Optional[int] = None,
+    max_passages: Optional[int] = None,
+) -> Tuple[str, List[Dict]]:
+    """Rank passages against the question and pack the best into a token budget.
+
+    Each passage is a dict with paper_id, title, section, text and optional
+    page_start/page_end. Returns the context string, with passages labelled
+    [1], [2], ... and a citation list mapping those labels back to papers.
+    """
+    token_budget = token_budget or settings.CHAT_CONTEXT_TOKENS
+    max_passages = max_passages or settings.CHAT_MAX_PASSAGES
+    passages = [p for p in passages if p["text"].strip() and p.get("section") not in SKIPPED_SECTIONS]
+    if not passages:
+        return "", []
+
+    scores = BM25([f"{p['title']} {p['text']}" for p in passages]).scores(question)
+    ranked = sorted(range(len(passages)), key=lambda i: scores[i], reverse=True)
+
+    blocks: List[str] = []
+    citations: List[Dict] = []
+    used = 0
+    for index in ranked:
+        if len(citations) >= max_passages:
+            break
+        passage = passages[index]
+        label = len(citations) + 1
+        header = f"[{label}] {passage['title']} ({passage.get('section') or 'text'}{_pages(passage)})"
+        block = f"{header}\n{passage['text'].strip()}"
+        cost = estimate_tokens(block)
+        if used + cost > token_budget:
+            continue  # a shorter, lower-ranked passage may still fit
+        blocks.append(block)
+        used += cost
+        citations.append({
+            "ref": label,
+            "paper_id": passage["paper_id"],
+            "title": passage["title"],
+            "section": passage.get("section"),
+            "page_start": passage.get("page_start"),
+            "page_end": passage.get("page_end"),
+            "score": round(scores[index], 3),
+        })
+    return "\n\n".join(blocks), citations
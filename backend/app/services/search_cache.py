@@ -0,0 +1,131 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class _Entry:
+    __slots__ = ("value", "stored_at", "ttl")
+
+    def __init__(self, value: Any, ttl: float):
+        self.value = value
+        self.stored_at = time.monotonic()
+        self.ttl = ttl
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+class SearchCache:
+    """Bounded LRU cache with per-entry TTL and stale-while-revalidate.
+
+    Fresh entries are returned as-is. Entries past their TTL but still inside
+    the stale window are returned immediately while one background task
+    refreshes them. Anything older is treated as a miss.
+    """
+
+    def __init__(self, max_entries: int, stale_seconds: float):
+        self.max_entries = max_entries
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._refreshing: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refresh_failures = 0
+
+    @staticmethod
+    def make_key(query: str, source: str, limit: int) -> Tuple[str, str, int]:
+        """Normalize a search into its cache key"""
+        return (" ".join(query.lower().split()), source, limit)
+
+    def get(self, key: Hashable) -> Optional[_Entry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        self._entries[key] = _Entry(value, ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, key: Hashable) -> Any:
+        """Return the value for `key` if it is still fresh, else None"""
+        entry = self.get(key)
+        if entry is not None and entry.age() < entry.ttl:
+            self.hits += 1
+            return entry.value
+        self.misses += 1
+        return None
+
+    async def get_or_fetch(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """Return the cached value for `key`, calling `fetch` on a miss"""
+        entry = self.get(key)
+        if entry is not None:
+            age = entry.age()
+            if age < entry.ttl:
+                self.hits += 1
+                return entry.value
+            if age < entry.ttl + self.stale_seconds:
+                self.stale_hits += 1
+                self._revalidate(key, fetch, ttl)
+                return entry.value
+            del self._entries[key]
+
+        self.misses += 1
+        value = await fetch()
+        self.set(key, value, ttl)
+        return value
+
+    def _revalidate(self, key: Hashable, fetch: Callable[[], Awaitable[Any]], ttl: float) -> None:
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                self.set(key, await fetch(), ttl)
+            except Exception as e:
+                self.refresh_failures += 1
+                print(f"Background refresh failed for {key}: {e}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.create_task(refresh())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshing": len(self._refreshing),
+            "refresh_failures": self.refresh_failures,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def source_ttl(source: str) -> float:
+    """TTL in seconds for results from `source`"""
+    return settings.SEARCH_CACHE_TTLS.get(source, settings.SEARCH_CACHE_DEFAULT_TTL)
+
+
+search_cache = SearchCache(
+    max_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+    stale_seconds=settings.SEARCH_CACHE_STALE_SECONDS,
+)
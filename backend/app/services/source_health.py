@@ -0,0 +1,200 @@
+import math
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[min(len(sorted_values), max(rank, 1)) - 1]
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class SourceHealth:
+    """Rolling error rate, latency and circuit breaker for one upstream source.
+
+    The breaker opens after `failure_threshold` consecutive failures, or when
+    the error rate over the last `window` calls reaches `error_rate_threshold`
+    (once at least `min_calls` have been seen). While open, calls are refused
+    for `open_seconds`; after that one half-open trial call at a time is let
+    through, and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_threshold: int,
+        error_rate_threshold: float,
+        open_seconds: float,
+        min_latency_samples: int = 20,
+        hedge_max_ratio: float = 0.05,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+        self.samples: Deque[Tuple[bool, float]] = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at: Optional[float] = None
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+        self.rejected = 0
+        self.times_opened = 0
+        self.last_error: Optional[str] = None
+        self.min_latency_samples = min_latency_samples
+        self.hedge_max_ratio = hedge_max_ratio
+        self.hedge_eligible = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go out now; claims the trial slot when half-open"""
+        if self.state == OPEN:
+            if time.monotonic() - self.opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self.trial_in_flight:
+                self.rejected += 1
+                return False
+            self.trial_in_flight = True
+        return True
+
+    def record_success(self, latency: float) -> None:
+        self.samples.append((True, latency))
+        self.consecutive_failures = 0
+        if self.state == HALF_OPEN:
+            # The trial succeeded: start the closed state with a clean window
+            self.samples.clear()
+            self.samples.append((True, latency))
+            self.state = CLOSED
+        self.trial_in_flight = False
+
+    def record_failure(self, latency: float, error: str = "") -> None:
+        self.samples.append((False, latency))
+        self.consecutive_failures += 1
+        self.last_error = error or self.last_error
+        if self.state == HALF_OPEN or self._should_trip():
+            self._trip()
+        self.trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a claimed slot when the call never reached the upstream"""
+        self.trial_in_flight = False
+
+    def _should_trip(self) -> bool:
+        if self.consecutive_failures >= self.failure_threshold:
+            return True
+        return len(self.samples) >= self.min_calls and self.error_rate() >= self.error_rate_threshold
+
+    def _trip(self) -> None:
+        if self.state != OPEN:
+            self.times_opened += 1
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+
+    def success_latencies(self) -> List[float]:
+        return sorted(latency for ok, latency in self.samples if ok)
+
+    def adaptive_timeout(self, ceiling: float) -> float:
+        """Per-call timeout from the recent p99 success latency, capped at `ceiling`"""
+        latencies = self.success_latencies()
+        if len(latencies) < self.min_latency_samples:
+            return ceiling
+        timeout = percentile(latencies, 99) * settings.ADAPTIVE_TIMEOUT_MULTIPLIER
+        return min(ceiling, max(settings.ADAPTIVE_TIMEOUT_MIN, timeout))
+
+    def hedge_delay(self) -> Optional[float]:
+        """How long to wait before hedging a request (the p95 success latency), or None"""
+        if self.state != CLOSED:
+            return None
+        self.hedge_eligible += 1
+        latencies = self.success_latencies()
+        if len(latencies) < self.min_latency_samples:
+            return None
+        return percentile(latencies, 95)
+
+    def claim_hedge(self) -> bool:
+        """Reserve a hedge if that keeps hedges within `hedge_max_ratio` of eligible requests"""
+        if self.hedges_sent + 1 > self.hedge_max_ratio * self.hedge_eligible:
+            return False
+        self.hedges_sent += 1
+        return True
+
+    def error_rate(self) -> float:
+        if not self.samples:
+            return 0.0
+        return sum(1 for ok, _ in self.samples if not ok) / len(self.samples)
+
+    def latencies(self) -> List[float]:
+        return sorted(latency for _, latency in self.samples)
+
+    def snapshot(self) -> Dict[str, Any]:
+        latencies = self.latencies()
+        return {
+            "state": self.state,
+            "calls": len(self.samples),
+            "error_rate": round(self.error_rate(), 4),
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "open_for_seconds": round(self.open_seconds - (time.monotonic() - self.opened_at), 1)
+            if self.state == OPEN else 0,
+            "latency_ms": {
+                "p50": _ms(percentile(latencies, 50)),
+                "p90": _ms(percentile(latencies, 90)),
+                "p95": _ms(percentile(latencies, 95)),
+                "p99": _ms(percentile(latencies, 99)),
+            },
+            "timeout_seconds": round(self.adaptive_timeout(settings.UPSTREAM_TIMEOUT), 2),
+            "hedging": {
+                "eligible": self.hedge_eligible,
+                "sent": self.hedges_sent,
+                "won": self.hedges_won,
+                "rate": round(self.hedges_sent / self.hedge_eligible, 4) if self.hedge_eligible else 0.0,
+            },
+            "last_error": self.last_error,
+        }
+
+
+_health: Dict[str, SourceHealth] = {}
+
+
+def get_health(source: str) -> SourceHealth:
+    """Health tracker for `source`, created on first use"""
+    if source not in _health:
+        _health[source] = SourceHealth(
+            source,
+            window=settings.BREAKER_WINDOW,
+            min_calls=settings.BREAKER_MIN_CALLS,
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            error_rate_threshold=settings.BREAKER_ERROR_RATE,
+            open_seconds=settings.BREAKER_OPEN_SECONDS,
+            min_latency_samples=settings.LATENCY_MIN_SAMPLES,
+            hedge_max_ratio=settings.HEDGE_MAX_RATIO,
+        )
+    return _health[source]
+
+
+def health_report() -> Dict[str, Dict[str, Any]]:
+    return {source: health.snapshot() for source, health in _health.items()}
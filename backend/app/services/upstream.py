@@ -0,0 +1,112 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from app.core.config import settings
+
+
+class RateLimited(Exception):
+    """Raised when an upstream's token bucket would queue a call for too long"""
+
+
+class TokenBucket:
+    """Token-bucket limiter that queues callers up to `max_wait` seconds.
+
+    Tokens are reserved on arrival (the balance may go negative), so waiting
+    callers are released in arrival order at the refill rate. A caller whose
+    projected wait exceeds `max_wait` is shed with RateLimited instead.
+    """
+
+    def __init__(self, rate: float, capacity: int, max_wait: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self.granted = 0
+        self.delayed = 0
+        self.shed = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> None:
+        self._refill()
+        wait = max(0.0, (1 - self._tokens) / self.rate)
+        if wait > self.max_wait:
+            self.shed += 1
+            raise RateLimited(f"rate limit queue full ({wait:.1f}s wait)")
+        self._tokens -= 1
+        self.granted += 1
+        if wait > 0:
+            self.delayed += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Timed out or the client went away: give the reserved token back for the callers behind
+                self._tokens += 1
+                self.granted -= 1
+                raise
+
+    def try_acquire(self) -> bool:
+        """Take a token only if one is available right now"""
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        self.granted += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        self._refill()
+        return {
+            "rate_per_second": self.rate,
+            "capacity": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "granted": self.granted,
+            "delayed": self.delayed,
+            "shed": self.shed,
+        }
+
+
+class SingleFlight:
+    """Coalesce concurrent identical calls onto one in-flight task"""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.followers += 1
+        # Shield so one caller timing out does not cancel the call for the rest
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        self._calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every waiter went away
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "coalesced": self.followers}
+
+
+rate_limiters: Dict[str, TokenBucket] = {
+    source: TokenBucket(
+        rate=rate,
+        capacity=settings.SOURCE_RATE_BURSTS.get(source, 1),
+        max_wait=settings.RATE_LIMIT_MAX_WAIT,
+    )
+    for source, rate in settings.SOURCE_RATE_LIMITS.items()
+}
+
+single_flight = SingleFlight()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Compare paper-chat context building: whole text of every paper vs. BM25-selected passages.
+
+    python bench_chat_context.py --synthetic 20
+    python bench_chat_context.py --paper-ids id1 id2 id3 --question "What datasets were used?"
+    python bench_chat_context.py --synthetic 10 --live    # also time the LLM call both ways
+
+Reports prompt size (estimated tokens) and context-building latency for each
+approach; with --live, end-to-end completion latency too (needs GROQ_API_KEY).
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import SessionLocal, create_tables
+from app.models import Paper
+from app.services.paper_chunks import chunk_text, join_pages
+from app.services.retrieval import estimate_tokens, select_passages
+
+SECTIONS = ["Abstract", "1 Introduction", "2 Methods", "3 Results", "4 Discussion", "5 Conclusion", "References"]
+VOCABULARY = (
+    "model training dataset transformer attention graph network accuracy baseline benchmark embedding "
+    "retrieval language vision protein sequence optimization gradient loss evaluation ablation sample "
+    "feature representation learning inference latency throughput memory cluster distribution"
+).split()
+
+
+def synthetic_paper(index: int, rng: random.Random, pages: int = 12) -> dict:
+    words_per_page = 450
+    text_pages = []
+    for page in range(1, pages + 1):
+        words = [rng.choice(VOCABULARY) for _ in range(words_per_page)]
+        sentences = [" ".join(words[i:i + 15]).capitalize() + "." for i in range(0, len(words), 15)]
+        heading = SECTIONS[min((page - 1) * len(SECTIONS) // pages, len(SECTIONS) - 1)]
+        text_pages.append({"page": page, "text": f"{heading}\n" + " ".join(sentences)})
+    full_text, page_starts = join_pages(text_pages)
+    return {
+        "id": f"synthetic-{index}",
+        "title": f"Synthetic paper {index} on {rng.choice(VOCABULARY)} {rng.choice(VOCABULARY)}",
+        "abstract": "",
+        "full_text": full_text,
+        "chunks": chunk_text(full_text, page_starts),
+    }
+
+
+def stored_papers(paper_ids):
+    from app.services.paper_chunks import load_chunks
+    db = SessionLocal()
+    try:
+        query = db.query(Paper).filter(Paper.full_text.isnot(None))
+        if paper_ids:
+            query = query.filter(Paper.id.in_(paper_ids))
+        rows = query.limit(50).all()
+    finally:
+        db.close()
+    chunks = {}
+    for chunk in load_chunks([row.id for row in rows]):
+        chunks.setdefault(chunk.paper_id, []).append({
+            "section": chunk.section, "page_start": chunk.page_start, "page_end": chunk.page_end, "text": chunk.text,
+        })
+    return [
+        {"id": row.id, "title": row.title, "abstract": row.abstract or "", "full_text": row.full_text,
+         "chunks": chunks.get(row.id, [])}
+        for row in rows
+    ]
+
+
+def whole_text_context(papers) -> str:
+    # What api/chatbot.py used to send: every paper's abstract or full text, joined
+    return "\n\n".join(f"Paper: {p['title']}\n{p['abstract'] or p['full_text'] or ''}" for p in papers)
+
+
+def retrieved_context(papers, question: str, budget: int):
+    passages = []
+    for paper in papers:
+        if paper["abstract"]:
+            passages.append({"paper_id": paper["id"], "title": paper["title"], "section": "abstract",
+                             "text": paper["abstract"]})
+        for chunk in paper["chunks"]:
+            passages.append({"paper_id": paper["id"], "title": paper["title"], **chunk})
+    return select_passages(question, passages, budget)
+
+
+def timed(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(samples)
+
+
+async def live_latency(contexts, question: str):
+    from app.services.ai_service import AIService
+    from app.services.llm_client import close_client
+    service = AIService()
+    latencies = []
+    try:
+        for context in contexts:
+            started = time.perf_counter()
+            await service.chat_with_context(context, question, user_id="bench")
+            latencies.append(time.perf_counter() - started)
+    finally:
+        await close_client()
+    return latencies
+
+
+def main(args):
+    if args.synthetic:
+        rng = random.Random(7)
+        papers = [synthetic_paper(i, rng) for i in range(args.synthetic)]
+    else:
+        create_tables()
+        papers = stored_papers(args.paper_ids)
+    if not papers:
+        print("No papers with full text found; try --synthetic N")
+        return
+
+    whole, whole_ms = timed(lambda: whole_text_context(papers), args.repeat)
+    (context, citations), retrieval_ms = timed(lambda: retrieved_context(papers, args.question, args.budget), args.repeat)
+
+    print(f"{len(papers)} papers, {sum(len(p['chunks']) for p in papers)} chunks, question: {args.question!r}")
+    print(f"{'approach':<12} {'prompt tokens':>14} {'build ms':>10}")
+    print(f"{'whole text':<12} {estimate_tokens(whole):>14} {whole_ms:>10.2f}")
+    print(f"{'retrieval':<12} {estimate_tokens(context):>14} {retrieval_ms:>10.2f}   ({len(citations)} passages)")
+
+    if args.live:
+        whole_s, retrieval_s = asyncio.run(live_latency([whole, context], args.question))
+        print(f"LLM latency: whole text {whole_s:.2f}s, retrieval {retrieval_s:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--synthetic", type=int, metavar="N", help="benchmark N generated papers instead of the database")
+    parser.add_argument("--paper-ids", nargs="*", help="papers from the database (default: any with full text)")
+    parser.add_argument("--question", default="Which evaluation benchmark and baseline were used for training the model?")
+    parser.add_argument("--budget", type=int, default=3000, help="context token budget for retrieval")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per approach; the median is reported")
+    parser.add_argument("--live", action="store_true", help="also time one LLM completion per approach")
+    main(parser.parse_args())
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Bulk-harvest papers from OpenAlex or arXiv into the local paper index.
+
+    python harvest.py openalex "graph neural networks" --max 5000
+    python harvest.py --resume <job_id>
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.database import create_tables
+from app.services.harvester import HARVEST_SOURCES, create_harvest, get_harvest, run_harvest
+from app.services.http_client import close_session
+
+
+def print_progress(job):
+    total = f"/{job.total_available}" if job.total_available is not None else ""
+    print(f"[{job.id}] {job.harvested}{total} harvested (limit {job.max_records})")
+
+
+async def main(args):
+    try:
+        if args.resume:
+            job = get_harvest(args.resume)
+            if not job:
+                print(f"No harvest job {args.resume}")
+                return
+            print(f"Resuming {job.source} harvest for '{job.query}' at {job.harvested} records")
+        else:
+            job = create_harvest(args.source, args.query, args.max)
+            print(f"Started {job.source} harvest {job.id} for '{job.query}'")
+
+        job = await run_harvest(job.id, progress=print_progress)
+        print(f"Harvest {job.id} {job.status}: {job.harvested} records" + (f" ({job.error})" if job.error else ""))
+    finally:
+        await close_session()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", choices=HARVEST_SOURCES)
+    parser.add_argument("query", nargs="?")
+    parser.add_argument("--max", type=int, default=1000, help="maximum number of records to harvest")
+    parser.add_argument("--resume", metavar="JOB_ID", help="continue an interrupted harvest from its saved cursor")
+    args = parser.parse_args()
+    if not args.resume and not (args.source and args.query):
+        parser.error("source and query are required unless --resume is given")
+
+    create_tables()
+    asyncio.run(main(args))
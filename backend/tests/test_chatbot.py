@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Paper, Workspace
+from app.security import get_current_user
+from app.services import chat_sessions
+
+
+@pytest.fixture
+def client(db):
+    db.query(Paper).filter(Paper.id.in_(["chat-mine", "chat-theirs"])).delete()
+    db.query(Workspace).filter(Workspace.id.in_([911, 912])).delete()
+    db.add(Workspace(id=911, name="Mine", user_id=1))
+    db.add(Workspace(id=912, name="Theirs", user_id=2))
+    db.add(Paper(id="chat-mine", title="Mine", abstract="Our results.", workspace_id=911))
+    db.add(Paper(id="chat-theirs", title="Theirs", full_text="Private draft.", workspace_id=912))
+    db.commit()
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=1)
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_cannot_chat_about_another_users_paper(client):
+    response = client.post("/chatbot/chat", json={"paper_ids": ["chat-theirs"], "question": "What is it?"})
+    assert response.status_code == 404
+
+
+def test_one_foreign_paper_fails_the_whole_request(client):
+    response = client.post("/chatbot/chat", json={"paper_ids": ["chat-mine", "chat-theirs"], "question": "Compare"})
+    assert response.status_code == 404
+
+
+def test_cannot_open_a_session_on_another_users_paper(client):
+    response = client.post("/ai/chat/sessions", json={"paper_ids": ["chat-mine", "chat-theirs"]})
+    assert response.status_code == 404
+
+
+def test_session_turns_only_read_papers_the_owner_still_has(client, db):
+    session = chat_sessions.create_session(1, ["chat-mine"])
+    db.query(Paper).filter(Paper.id == "chat-mine").update({"workspace_id": 912})
+    db.commit()
+    messages, citations = chat_sessions.prepare_turn(session, "What are the results?")
+    assert citations == []
+    assert "Our results." not in messages[-1]["content"]
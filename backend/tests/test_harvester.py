@@ -0,0 +1,46 @@
+import asyncio
+
+from app.services import harvester
+
+
+def _feed(count, start):
+    entries = "".join(
+        f"<entry><id>http://arxiv.org/abs/2101.{start + i:05d}v1</id><title>Paper {start + i}</title>"
+        "<summary>x</summary><published>2021-01-01T00:00:00Z</published></entry>"
+        for i in range(count)
+    )
+    return f'<feed xmlns="http://www.w3.org/2005/Atom">{entries}</feed>'
+
+
+def test_only_one_worker_claims_a_job(monkeypatch):
+    job = harvester.create_harvest("arxiv", "graphs", 10)
+    monkeypatch.setattr(harvester, "WORKER_ID", "worker-a")
+    assert harvester._claim(job.id)
+    monkeypatch.setattr(harvester, "WORKER_ID", "worker-b")
+    assert not harvester._claim(job.id)
+
+
+def test_arxiv_harvest_pages_oldest_first_one_at_a_time(monkeypatch):
+    requests, in_flight = [], []
+
+    async def fetch_text(source, url, params):
+        in_flight.append(params["start"])
+        assert len(in_flight) == 1
+        requests.append(dict(params))
+        await asyncio.sleep(0)
+        in_flight.pop()
+        count = harvester.ARXIV_PAGE_SIZE if params["start"] == 0 else 5
+        return _feed(count, params["start"])
+
+    async def no_sleep(seconds):
+        pass
+
+    monkeypatch.setattr(harvester, "fetch_text", fetch_text)
+    monkeypatch.setattr(harvester.asyncio, "sleep", no_sleep)
+    job = harvester.create_harvest("arxiv", "graphs", 500)
+    job = asyncio.run(harvester.run_harvest(job.id))
+
+    assert job.status == "completed"
+    assert job.harvested == harvester.ARXIV_PAGE_SIZE + 5
+    assert [r["start"] for r in requests] == [0, harvester.ARXIV_PAGE_SIZE]
+    assert all(r["sortOrder"] == "ascending" for r in requests)
@@ -0,0 +1,44 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models import Paper, Workspace
+from app.security import get_current_user
+
+PDF = ("paper.pdf", b"%PDF-1.4 test", "application/pdf")
+
+
+@pytest.fixture
+def client(db):
+    db.query(Paper).filter(Paper.id.in_(["owned-paper", "orphan-paper"])).delete()
+    db.query(Workspace).filter(Workspace.id == 901).delete()
+    db.add(Workspace(id=901, name="Owner's workspace", user_id=1))
+    db.add(Paper(id="owned-paper", title="Owned", workspace_id=901))
+    db.add(Paper(id="orphan-paper", title="Orphan", workspace_id=None))
+    db.commit()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def as_user(user_id):
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id=user_id)
+
+
+def test_cannot_replace_text_of_another_users_paper(client):
+    as_user(2)
+    response = client.post("/papers/ingest-pdf", files={"file": PDF}, data={"paper_id": "owned-paper"})
+    assert response.status_code == 403
+
+
+def test_cannot_replace_text_of_a_paper_outside_any_workspace(client):
+    as_user(1)
+    response = client.post("/papers/ingest-pdf", files={"file": PDF}, data={"paper_id": "orphan-paper"})
+    assert response.status_code == 403
+
+
+def test_cannot_ingest_into_another_users_workspace(client):
+    as_user(2)
+    response = client.post("/papers/ingest-pdf", files={"file": PDF}, data={"workspace_id": "901"})
+    assert response.status_code == 404
@@ -0,0 +1,85 @@
+import asyncio
+
+from app.services.llm_client import BULK, INTERACTIVE, LLMGovernor
+
+
+async def _hold(governor, user, lane, started, release):
+    async with governor.slot(user, lane):
+        started.append((user, lane))
+        await release.wait()
+
+
+def test_bulk_lane_has_its_own_per_user_allowance():
+    async def run():
+        governor = LLMGovernor(max_concurrency=10, per_user=2, reserved_interactive=2, per_user_bulk=6)
+        started, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(_hold(governor, "alice", BULK, started, release)) for _ in range(8)]
+        tasks.append(asyncio.create_task(_hold(governor, "alice", INTERACTIVE, started, release)))
+        await asyncio.sleep(0.01)
+        # Six bulk calls run at once, and the user's own batch does not block their chat
+        assert started.count(("alice", BULK)) == 6
+        assert ("alice", INTERACTIVE) in started
+        release.set()
+        await asyncio.gather(*tasks)
+        assert governor.stats()["active"] == {INTERACTIVE: 0, BULK: 0}
+
+    asyncio.run(run())
+
+
+async def _call(governor, user, lane, started):
+    async with governor.slot(user, lane):
+        started.append((user, lane))
+        await asyncio.sleep(0)
+
+
+def test_interactive_first_with_bulk_turns_and_round_robin_between_users():
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, per_user=5, reserved_interactive=0)
+        started = []
+        async with governor.slot("holder"):
+            tasks = [asyncio.create_task(_call(governor, user, lane, started)) for user, lane in [
+                ("alice", INTERACTIVE), ("alice", INTERACTIVE), ("alice", INTERACTIVE),
+                ("bob", INTERACTIVE), ("carol", BULK), ("carol", BULK),
+            ]]
+            await asyncio.sleep(0)
+            assert governor.stats()["waiting"] == {INTERACTIVE: 4, BULK: 2}
+        await asyncio.gather(*tasks)
+        # Users alternate within the lane, and every BULK_TURN-th grant goes to a waiting bulk call
+        assert started == [("alice", INTERACTIVE), ("bob", INTERACTIVE), ("carol", BULK),
+                           ("alice", INTERACTIVE), ("alice", INTERACTIVE), ("carol", BULK)]
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, per_user=1, reserved_interactive=0)
+        started = []
+        async with governor.slot("holder"):
+            waiting = asyncio.create_task(_call(governor, "alice", INTERACTIVE, started))
+            await asyncio.sleep(0)
+            waiting.cancel()
+            await asyncio.gather(waiting, return_exceptions=True)
+            assert governor.stats()["waiting"] == {INTERACTIVE: 0, BULK: 0}
+        assert governor.stats()["active"] == {INTERACTIVE: 0, BULK: 0}
+        assert started == []
+
+    asyncio.run(run())
+
+
+def test_slot_granted_while_cancelling_is_released():
+    async def run():
+        governor = LLMGovernor(max_concurrency=1, per_user=1, reserved_interactive=0)
+        started = []
+        async with governor.slot("holder"):
+            granted = asyncio.create_task(_call(governor, "alice", INTERACTIVE, started))
+            after = asyncio.create_task(_call(governor, "bob", INTERACTIVE, started))
+            await asyncio.sleep(0)
+        # Leaving the block granted alice's waiter; cancel before her task gets to run
+        granted.cancel()
+        await asyncio.wait_for(asyncio.gather(granted, after, return_exceptions=True), 5)
+        assert granted.cancelled()
+        assert started == [("bob", INTERACTIVE)]
+        assert governor.stats()["active"] == {INTERACTIVE: 0, BULK: 0}
+
+    asyncio.run(run())
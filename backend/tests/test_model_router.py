@@ -0,0 +1,46 @@
+import pytest
+
+from app.core.config import settings
+from app.services import model_router
+from app.services.model_router import CHAT, DIGEST, SYNTHESIS
+
+
+@pytest.fixture(autouse=True)
+def fresh_router(monkeypatch):
+    monkeypatch.setattr(model_router, "_latencies", {})
+    monkeypatch.setattr(settings, "LATENCY_MIN_SAMPLES", 5)
+    monkeypatch.setattr(settings, "LLM_LATENCY_BUDGETS", {CHAT: 8.0, DIGEST: 15.0, SYNTHESIS: 60.0})
+
+
+def _samples(model, task, latency, count=10):
+    for _ in range(count):
+        model_router._record_latency(model, task, latency)
+
+
+def test_within_budget_until_enough_samples():
+    _samples(settings.LLM_FAST_MODEL, CHAT, 30.0, count=4)
+    assert not model_router._over_budget(settings.LLM_FAST_MODEL, CHAT)
+    model_router._record_latency(settings.LLM_FAST_MODEL, CHAT, 30.0)
+    assert model_router._over_budget(settings.LLM_FAST_MODEL, CHAT)
+
+
+def test_slow_digests_do_not_demote_chat():
+    _samples(settings.LLM_FAST_MODEL, DIGEST, 12.0)
+    _samples(settings.LLM_FAST_MODEL, CHAT, 2.0)
+    assert not model_router._over_budget(settings.LLM_FAST_MODEL, CHAT)
+    assert not model_router._over_budget(settings.LLM_FAST_MODEL, DIGEST)
+    assert model_router.candidates(CHAT, 100)[0][0] == settings.LLM_FAST_MODEL
+
+
+def test_synthesis_is_judged_against_its_own_budget():
+    _samples(settings.LLM_LARGE_MODEL, SYNTHESIS, 30.0)
+    assert not model_router._over_budget(settings.LLM_LARGE_MODEL, SYNTHESIS)
+    assert model_router.candidates(SYNTHESIS, 100)[0][0] == settings.LLM_LARGE_MODEL
+
+
+def test_slow_chat_model_is_demoted_while_the_other_is_within_budget():
+    _samples(settings.LLM_FAST_MODEL, CHAT, 20.0)
+    _samples(settings.LLM_LARGE_MODEL, CHAT, 3.0)
+    order, reason = model_router.candidates(CHAT, 100)
+    assert order == [settings.LLM_LARGE_MODEL, settings.LLM_FAST_MODEL]
+    assert "over latency/error budget" in reason
@@ -0,0 +1,43 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.database import engine
+from app.main import app
+from app.security import get_current_user
+from app.services.paper_index import search_local, upsert_papers
+
+
+def _row(doi):
+    with engine.connect() as conn:
+        return conn.execute(text("SELECT sources, payload FROM indexed_papers WHERE paper_key = :key"),
+                            {"key": f"doi:{doi}"}).one()
+
+
+def test_single_source_payload_does_not_replace_merged_row():
+    merged = {"title": "Quantum walks on graphs", "doi": "10.1/qw", "sources": ["arXiv", "OpenAlex"],
+              "abstract": "merged abstract"}
+    single = {"title": "Quantum walks on graphs", "doi": "10.1/qw", "source": "OpenAlex", "abstract": "short"}
+    assert upsert_papers([merged]) == 1
+    assert upsert_papers([single]) == 0
+    sources, payload = _row("10.1/qw")
+    assert sources == "arXiv,OpenAlex"
+    assert json.loads(payload)["abstract"] == "merged abstract"
+    assert len(search_local("quantum walks", 10)) == 1
+
+
+def test_concurrent_upserts_of_the_same_paper_all_succeed():
+    paper = {"title": "Concurrent indexing", "doi": "10.1/ci", "source": "OpenAlex"}
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: upsert_papers([paper]), range(16)))
+    assert results == [1] * 16
+    assert len(search_local("concurrent indexing", 10)) == 1
+
+
+def test_search_rejects_an_unknown_mode(monkeypatch):
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: SimpleNamespace(id=1))
+    response = TestClient(app).get("/papers/search", params={"query": "graphs", "mode": "ofline"})
+    assert response.status_code == 400
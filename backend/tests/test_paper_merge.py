@@ -0,0 +1,28 @@
+from app.services.paper_merge import merge_results, paper_keys
+
+
+def test_doi_is_normalized():
+    keys = paper_keys({"doi": "https://doi.org/10.1145/ABC.123"})
+    assert keys == {"doi": "10.1145/abc.123", "arxiv_id": ""}
+
+
+def test_arxiv_id_from_arxiv_doi():
+    keys = paper_keys({"doi": "10.48550/arXiv.2101.00001"})
+    assert keys["arxiv_id"] == "2101.00001"
+
+
+def test_other_dois_never_yield_an_arxiv_id():
+    keys = paper_keys({"doi": "10.5555/abc.2101.00001"})
+    assert keys == {"doi": "10.5555/abc.2101.00001", "arxiv_id": ""}
+
+
+def test_arxiv_id_field_and_abs_url_drop_the_version():
+    assert paper_keys({"arxiv_id": "2101.00001v3"})["arxiv_id"] == "2101.00001"
+    assert paper_keys({"source": "arXiv", "id": "http://arxiv.org/abs/hep-th/9901001v2"})["arxiv_id"] == \
+        "hep-th/9901001"
+
+
+def test_unrelated_papers_with_digit_suffixed_dois_are_not_merged():
+    a = {"title": "Graph neural networks for chemistry", "doi": "10.5555/abc.2101.00001", "source": "OpenAlex"}
+    b = {"title": "Sparse attention in protein folding", "arxiv_id": "2101.00001", "source": "arXiv"}
+    assert len(merge_results([[a], [b]])) == 2
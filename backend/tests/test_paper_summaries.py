@@ -0,0 +1,124 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api import ai
+from app.core.config import settings
+from app.main import app
+from app.security import get_current_user
+from app.services import paper_summaries
+from app.services.paper_summaries import get_summary, is_current, save_summary, text_hash
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """Stub completion that records its prompts and answers as the large model"""
+    calls = []
+
+    async def complete_with_model(messages, **kwargs):
+        calls.append(messages[0]["content"])
+        return f"summary {len(calls)}", settings.LLM_LARGE_MODEL
+
+    monkeypatch.setattr(paper_summaries, "complete_with_model", complete_with_model)
+    monkeypatch.setattr(settings, "GROQ_API_KEY", "test")
+    return calls
+
+
+def test_generate_stores_the_model_that_answered(llm):
+    paper = {"id": "sum-model", "title": "Routing", "abstract": "Fast and large models."}
+    asyncio.run(paper_summaries.generate(paper, "short", "Title: Routing\nFast and large models."))
+    assert get_summary("sum-model", "short").model == settings.LLM_LARGE_MODEL
+
+
+def test_refresh_regenerates_only_when_the_text_changed(llm):
+    paper = {"id": "sum-stale", "title": "Caching", "abstract": "First abstract."}
+    assert asyncio.run(paper_summaries.refresh_summaries(paper, ["short"])) == {"short": "generated"}
+    assert asyncio.run(paper_summaries.refresh_summaries(paper, ["short"])) == {"short": "unchanged"}
+
+    changed = {**paper, "abstract": "Revised abstract."}
+    stored = get_summary("sum-stale", "short")
+    assert not is_current(stored, paper_summaries.summary_input(changed, "short", []))
+    assert asyncio.run(paper_summaries.refresh_summaries(changed, ["short"])) == {"short": "generated"}
+    assert len(llm) == 2
+
+
+def test_refresh_while_running_is_queued_and_rerun(llm, monkeypatch):
+    paper = {"id": "sum-queued", "title": "Queues", "abstract": "Old abstract."}
+    revised = {**paper, "abstract": "New abstract."}
+    rerun = []
+    monkeypatch.setattr(paper_summaries, "summarize_in_background",
+                        lambda queued, summary_types: rerun.append((queued, list(summary_types))))
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_complete(messages, **kwargs):
+            await release.wait()
+            return "summary", settings.LLM_LARGE_MODEL
+
+        monkeypatch.setattr(paper_summaries, "complete_with_model", slow_complete)
+        first = asyncio.create_task(paper_summaries.refresh_summaries(paper, ["short"]))
+        while ("sum-queued", "short") not in paper_summaries._running:
+            await asyncio.sleep(0.01)
+        queued = await paper_summaries.refresh_summaries(revised, ["short"])
+        release.set()
+        return queued, await first
+
+    queued, first = asyncio.run(scenario())
+    assert queued == {"short": "queued"}
+    assert first == {"short": "generated"}
+    assert rerun == [(revised, ["short"])]
+    assert not paper_summaries._pending
+
+
+def test_concurrent_triggers_generate_once(llm, monkeypatch):
+    paper = {"id": "sum-race", "title": "Races", "abstract": "Added to two workspaces at once."}
+    rerun = []
+    monkeypatch.setattr(paper_summaries, "summarize_in_background",
+                        lambda queued, summary_types: rerun.append(list(summary_types)))
+
+    async def both():
+        return await asyncio.gather(paper_summaries.refresh_summaries(paper, ["short"]),
+                                    paper_summaries.refresh_summaries(paper, ["short"]))
+
+    results = asyncio.run(both())
+    assert sorted(result["short"] for result in results) == ["generated", "queued"]
+    assert len(llm) == 1 and rerun == [["short"]]
+    assert not paper_summaries._running
+
+
+def test_batch_serves_stored_summaries_without_loading_papers(llm, monkeypatch):
+    listed = {"sum-b2": {"id": "sum-b2", "title": "Listed", "abstract": "From the workspace entry."}}
+    loaded = []
+
+    async def load_papers(paper_ids, known=None):
+        loaded.extend(paper_ids)
+        return [known[paper_id] for paper_id in paper_ids if paper_id in known]
+
+    monkeypatch.setattr(paper_summaries, "load_papers", load_papers)
+    save_summary("sum-b1", "short", text_hash("anything"), "stored", settings.LLM_FAST_MODEL)
+
+    async def collect():
+        return [event async for event in paper_summaries.summarize_batch(["sum-b1", "sum-b2"], "short",
+                                                                          listed=listed)]
+
+    summaries = {event["paper_id"]: event for event in asyncio.run(collect()) if event["event"] == "summary"}
+    assert summaries["sum-b1"]["precomputed"] and summaries["sum-b1"]["summary"] == "stored"
+    assert not summaries["sum-b2"]["precomputed"]
+    assert loaded == ["sum-b2"]
+    # Hashed from the workspace entry, so the precompute on add finds it current
+    text = paper_summaries.summary_input(listed["sum-b2"], "short", [])
+    assert is_current(get_summary("sum-b2", "short"), text)
+
+
+def test_stored_summary_is_served_without_looking_the_paper_up(monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise AssertionError("paper looked up although a summary is stored")
+
+    monkeypatch.setattr(ai, "load_papers", unavailable)
+    monkeypatch.setitem(app.dependency_overrides, get_current_user, lambda: SimpleNamespace(id=1))
+    save_summary("sum-click", "short", text_hash("anything"), "Stored summary.", settings.LLM_FAST_MODEL)
+    response = TestClient(app).post("/ai/summarize/sum-click", params={"summary_type": "short"})
+    assert response.json()["summary"] == "Stored summary."
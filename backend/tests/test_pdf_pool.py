@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import pdf_pool
+
+
+def slow_count_pages(file_path):
+    time.sleep(30)
+    return 1
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "PDF_POOL_SIZE", 1)
+    pdf_pool.shutdown_pool()
+    yield
+    pdf_pool.shutdown_pool()
+
+
+def test_timeout_kills_the_worker_and_frees_the_slot(pool, monkeypatch):
+    monkeypatch.setattr(pdf_pool, "count_pages", slow_count_pages)
+    monkeypatch.setattr(settings, "PDF_EXTRACT_TIMEOUT", 1.0)
+    recycled = pdf_pool.queue_stats()["pool_recycles"]
+
+    async def run():
+        started = time.monotonic()
+        with pytest.raises(pdf_pool.ExtractionTimeout):
+            await pdf_pool.extract_pages("unused.pdf")
+        assert time.monotonic() - started < 5
+        for _ in range(50):
+            if pdf_pool.queue_stats()["documents_in_progress"] == 0:
+                break
+            await asyncio.sleep(0.1)
+
+    asyncio.run(run())
+    stats = pdf_pool.queue_stats()
+    assert stats["pool_recycles"] == recycled + 1
+    assert stats["documents_in_progress"] == 0
@@ -0,0 +1,111 @@
+import asyncio
+import os
+import threading
+import time
+
+from app.core.config import settings
+from app.models import IngestionJob, StoredPdf
+from app.services import pdf_store
+
+
+def _stored(db, digest, size, page_count=0, age=0.0):
+    os.makedirs(settings.PDF_STORE_DIR, exist_ok=True)
+    path = os.path.join(settings.PDF_STORE_DIR, f"{digest}.pdf")
+    with open(path, "wb") as f:
+        f.write(b"%PDF")
+    if page_count is not None:
+        pdf_store._write_pages(digest, [])
+    db.add(StoredPdf(sha256=digest, file_path=path, size_bytes=size, page_count=page_count, hits=0,
+                     last_used_at=time.time() - age))
+    db.commit()
+    return path
+
+
+def _clear(db):
+    db.query(IngestionJob).delete()
+    db.query(StoredPdf).delete()
+    db.commit()
+
+
+def test_evict_drops_least_recently_used_first(db, monkeypatch):
+    _clear(db)
+    monkeypatch.setattr(settings, "PDF_STORE_MAX_BYTES", 250)
+    oldest = _stored(db, "a" * 64, 100, age=30)
+    _stored(db, "b" * 64, 100, age=20)
+    _stored(db, "c" * 64, 100, age=10)
+
+    assert pdf_store.evict() == 1
+    assert not os.path.exists(oldest)
+    assert {row.sha256[0] for row in db.query(StoredPdf)} == {"b", "c"}
+
+
+def test_evict_keeps_unextracted_and_ingesting_documents(db, monkeypatch):
+    _clear(db)
+    monkeypatch.setattr(settings, "PDF_STORE_MAX_BYTES", 100)
+    pending = _stored(db, "d" * 64, 100, page_count=None, age=30)
+    ingesting = _stored(db, "e" * 64, 100, age=20)
+    _stored(db, "f" * 64, 100, age=10)
+    db.add(IngestionJob(id="job-1", user_id=1, paper_id="p", sha256="e" * 64, file_path=ingesting,
+                        status="running"))
+    db.commit()
+
+    assert pdf_store.evict() == 1
+    assert os.path.exists(pending) and os.path.exists(ingesting)
+    assert {row.sha256[0] for row in db.query(StoredPdf)} == {"d", "e"}
+
+
+def test_save_extraction_reinserts_an_evicted_row(db):
+    _clear(db)
+    path = _stored(db, "g" * 64, 4, page_count=None)
+    db.query(StoredPdf).delete()
+    db.commit()
+
+    pdf_store._write_pages("g" * 64, [{"page": 1, "text": "x", "method": "pypdf2"}])
+    doc = pdf_store._save_extraction("g" * 64, path, 1, {})
+    assert doc.page_count == 1
+    assert db.query(StoredPdf).filter(StoredPdf.sha256 == "g" * 64).count() == 1
+
+
+def test_iter_stored_caches_pages_and_reads_them_back(db, monkeypatch):
+    _clear(db)
+    digest = "h" * 64
+    path = _stored(db, digest, 4, page_count=None)
+    extracted = [{"page": n, "text": f"page {n}", "method": "pypdf2"} for n in range(1, 4)]
+
+    async def iter_pages(file_path):
+        for page in extracted:
+            yield [page]
+
+    monkeypatch.setattr(pdf_store, "iter_pages", iter_pages)
+    monkeypatch.setattr(pdf_store, "read_metadata", lambda file_path: {})
+
+    async def collect():
+        return [item async for item in pdf_store.iter_stored(digest, path)]
+
+    first = asyncio.run(collect())
+    assert first == [(page, False) for page in extracted]
+    second = asyncio.run(collect())
+    assert second == [(page, True) for page in extracted]
+    assert db.query(StoredPdf).filter(StoredPdf.sha256 == digest).one().page_count == 3
+
+
+def test_identical_uploads_registering_together_keep_one_row(db):
+    _clear(db)
+    digest = "r" * 64
+    barrier = threading.Barrier(4)
+    errors = []
+
+    def register():
+        barrier.wait()
+        try:
+            pdf_store._register(digest, "/tmp/same.pdf", "same.pdf", 4)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=register) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert db.query(StoredPdf).filter(StoredPdf.sha256 == digest).count() == 1
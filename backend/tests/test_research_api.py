@@ -0,0 +1,44 @@
+import asyncio
+
+from app.core.config import settings
+from app.services import research_api
+from app.services.search_cache import search_cache
+
+
+def test_failed_source_is_not_cached(monkeypatch):
+    search_cache.clear()
+    calls = {"openalex": 0}
+
+    async def fetch_json(source, url, params, headers=None, body=None):
+        if source == "openalex":
+            calls["openalex"] += 1
+            if calls["openalex"] == 1:
+                raise RuntimeError("OpenAlex down")
+            return {"results": [{"title": "From OpenAlex"}]}
+        return {"data": [{"title": "From S2"}]}
+
+    async def fetch_text(source, url, params):
+        return '<feed xmlns="http://www.w3.org/2005/Atom"></feed>'
+
+    monkeypatch.setattr(research_api, "fetch_json", fetch_json)
+    monkeypatch.setattr(research_api, "fetch_text", fetch_text)
+    service = research_api.ResearchAPIService()
+
+    first = asyncio.run(service.search_all("graphs", 9))
+    assert [paper["title"] for paper in first] == ["From S2"]
+    second = asyncio.run(service.search_all("graphs", 9))
+    assert sorted(paper["title"] for paper in second) == ["From OpenAlex", "From S2"]
+    assert calls["openalex"] == 2
+
+
+def test_semantic_scholar_sends_api_key(monkeypatch):
+    sent = {}
+
+    async def fetch_json(source, url, params, headers=None, body=None):
+        sent["headers"] = headers
+        return {"data": []}
+
+    monkeypatch.setattr(research_api, "fetch_json", fetch_json)
+    monkeypatch.setattr(settings, "SEMANTIC_SCHOLAR_API_KEY", "secret")
+    asyncio.run(research_api.ResearchAPIService().search_semantic_scholar("graphs"))
+    assert sent["headers"] == {"x-api-key": "secret"}
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from app.services.upstream import RateLimited, TokenBucket
+
+
+def test_cancelled_waiters_give_their_tokens_back():
+    async def run():
+        bucket = TokenBucket(rate=1.0, capacity=1, max_wait=5.0)
+        await bucket.acquire()
+        for _ in range(20):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(bucket.acquire(), 0.01)
+        # Without the refunds the balance would be 20 tokens short and later callers shed
+        assert bucket.stats()["tokens"] > -1
+        assert bucket.granted == 1
+
+    asyncio.run(run())
+
+
+def test_caller_is_shed_when_the_wait_is_too_long():
+    async def run():
+        bucket = TokenBucket(rate=1.0, capacity=1, max_wait=0.5)
+        await bucket.acquire()
+        with pytest.raises(RateLimited):
+            await bucket.acquire()
+
+    asyncio.run(run())